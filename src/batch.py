@@ -0,0 +1,164 @@
+#########################################
+# batched position encoding and evaluation with NumPy
+# packs many boards into arrays in one pass and scores the
+# whole batch with array operations instead of a Python loop
+# per position (self-play data, game database analysis)
+#
+#	encode_codes(boards)      (N, 64) uint8 piece codes
+#	encode(boards)            (N, 12, 64) uint8 one-hot piece planes
+#	encode_bitboards(boards)  (N, 12) uint64 piece bitboards
+#	evaluate(boards)          (N,) int32 scores
+#
+# planes are ordered white pawn, knight, bishop, rook, queen, king,
+# then the same for black, and bit/column i is square i (0 = a8)
+# boards can be any mix of Board and BitBoard
+#########################################
+
+import numpy as np
+from piece import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK
+from evaluation import SCORES
+
+# piece code of each plane
+PLANE_CODES = np.array([color | piece_type for color in (WHITE, BLACK)
+	for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING)], dtype=np.uint8)
+
+# material + piece-square score indexed by piece code, then square (white positive)
+SCORE_TABLE = np.array(SCORES, dtype=np.int32)
+
+# centipawns per square a piece type attacks that isn't occupied by its own side
+MOBILITY_WEIGHTS = {KNIGHT: 4, BISHOP: 5, ROOK: 2, QUEEN: 1}
+
+
+####################
+# ENCODING METHODS #
+####################
+
+
+def encode_codes(boards):
+	# board squares are a bytearray (Board) or a list of codes (BitBoard)
+	data = b''.join(bytes(b.squares) for b in boards)
+	return np.frombuffer(data, dtype=np.uint8).reshape(-1, 64)
+
+
+def white_to_move(boards):
+	return np.array([b.turn == 'w' for b in boards], dtype=bool)
+
+
+def encode(boards):
+	codes = encode_codes(boards)
+	return (codes[:, None, :] == PLANE_CODES[None, :, None]).astype(np.uint8)
+
+
+def encode_bitboards(boards):
+	return codes_to_bitboards(encode_codes(boards))
+
+
+def codes_to_bitboards(codes):
+	bitboards = np.empty((len(codes), len(PLANE_CODES)), dtype=np.uint64)
+	for plane, code in enumerate(PLANE_CODES):
+		# little bit order puts square i at bit i of the 64-bit word
+		packed = np.packbits(codes == code, axis=1, bitorder='little')
+		bitboards[:, plane] = packed.view('<u8')[:, 0]
+
+	return bitboards
+
+
+######################
+# EVALUATION METHODS #
+######################
+
+
+def evaluate(boards):
+	return evaluate_codes(encode_codes(boards), white_to_move(boards))
+
+
+# material, piece-square tables and mobility
+# scores are from white's point of view, or the side to move's if white_to_move is given
+# (same convention as board.evaluate())
+def evaluate_codes(codes, white_to_move=None):
+	scores = SCORE_TABLE[codes, np.arange(64)].sum(axis=1, dtype=np.int32)
+	scores += mobility(codes_to_bitboards(codes))
+
+	if white_to_move is not None:
+		scores = np.where(white_to_move, scores, -scores)
+
+	return scores
+
+
+def mobility(bitboards):
+	white = bitboards[:, :6]
+	black = bitboards[:, 6:]
+	white_occupied = np.bitwise_or.reduce(white, axis=1)
+	black_occupied = np.bitwise_or.reduce(black, axis=1)
+	empty = ~(white_occupied | black_occupied)
+
+	scores = np.zeros(len(bitboards), dtype=np.int32)
+	for piece_type, weight in MOBILITY_WEIGHTS.items():
+		plane = piece_type - 1
+		white_attacks = attacks(piece_type, white[:, plane], empty) & ~white_occupied
+		black_attacks = attacks(piece_type, black[:, plane], empty) & ~black_occupied
+		scores += weight * (popcount(white_attacks) - popcount(black_attacks))
+
+	return scores
+
+
+#####################
+# ATTACK GENERATION #
+#####################
+
+
+# attacks are generated for all pieces of a type at once by shifting
+# their bitboards, so each union counts a square only once
+# (simple mobility rather than exact move counts)
+A_FILE = 0x0101010101010101
+B_FILE = A_FILE << 1
+G_FILE = A_FILE << 6
+H_FILE = A_FILE << 7
+
+# (index offset, squares the shifted pieces may land on)
+# the masks drop pieces that wrapped around to the other edge of the board
+KNIGHT_SHIFTS = [
+	(17, ~A_FILE), (15, ~H_FILE), (10, ~(A_FILE | B_FILE)), (6, ~(G_FILE | H_FILE)),
+	(-6, ~(A_FILE | B_FILE)), (-10, ~(G_FILE | H_FILE)), (-15, ~A_FILE), (-17, ~H_FILE),
+]
+BISHOP_SHIFTS = [(9, ~A_FILE), (7, ~H_FILE), (-7, ~A_FILE), (-9, ~H_FILE)]
+ROOK_SHIFTS = [(1, ~A_FILE), (-1, ~H_FILE), (8, -1), (-8, -1)]
+SLIDER_SHIFTS = {BISHOP: BISHOP_SHIFTS, ROOK: ROOK_SHIFTS, QUEEN: BISHOP_SHIFTS + ROOK_SHIFTS}
+
+
+def shift(bitboards, offset, mask):
+	if offset > 0:
+		shifted = bitboards << np.uint64(offset)
+	else:
+		shifted = bitboards >> np.uint64(-offset)
+
+	return shifted & np.uint64(mask & 0xFFFFFFFFFFFFFFFF)
+
+
+def attacks(piece_type, pieces, empty):
+	if piece_type == KNIGHT:
+		result = np.zeros_like(pieces)
+		for offset, mask in KNIGHT_SHIFTS:
+			result |= shift(pieces, offset, mask)
+		return result
+
+	# rays are extended one square at a time through empty squares,
+	# the first blocker is included as an attacked square
+	result = np.zeros_like(pieces)
+	for offset, mask in SLIDER_SHIFTS[piece_type]:
+		ray = pieces
+		for _ in range(7):
+			ray = shift(ray, offset, mask)
+			result |= ray
+			ray = ray & empty
+
+	return result
+
+
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bitboards):
+	# count set bits byte by byte
+	octets = np.ascontiguousarray(bitboards).view(np.uint8).reshape(-1, 8)
+	return POPCOUNT_TABLE[octets].sum(axis=1, dtype=np.int32)
@@ -0,0 +1,237 @@
+#########################################
+# perft benchmark suite
+# runs the well-known perft positions, checks node counts
+# against the published values and reports nodes, wall time,
+# nodes/s and peak RSS per position as JSON
+#
+# a summary table goes to stderr, the JSON to stdout or --output
+#
+# usage: python benchmark.py --output baseline.json
+#        python benchmark.py --baseline baseline.json --threshold 0.1
+# exits with status 1 if a node count is wrong or nodes/s drops
+# more than the threshold below the baseline for any position,
+# or if the baseline was run on the other backend or shares no
+# positions (name, FEN and depth) with this run
+#########################################
+
+import argparse
+import json
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from perft import perft, BACKENDS
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+
+# published node counts by depth (index 0 = depth 1)
+# https://www.chessprogramming.org/Perft_Results
+POSITIONS = [
+	{
+		'name': 'start',
+		'fen': 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1',
+		'counts': [20, 400, 8902, 197281, 4865609, 119060324],
+		'depth': 4,
+	},
+	{
+		'name': 'kiwipete',
+		'fen': 'r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1',
+		'counts': [48, 2039, 97862, 4085603, 193690690],
+		'depth': 3,
+	},
+	# en passant, discovered checks along the rank
+	{
+		'name': 'position3',
+		'fen': '8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1',
+		'counts': [14, 191, 2812, 43238, 674624, 11030083],
+		'depth': 4,
+	},
+	# promotions and castling out of check
+	{
+		'name': 'position4',
+		'fen': 'r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1',
+		'counts': [6, 264, 9467, 422333, 15833292],
+		'depth': 3,
+	},
+	{
+		'name': 'position4_mirrored',
+		'fen': 'r2q1rk1/pP1p2pp/Q4n2/bbp1p3/Np6/1B3NBn/pPPP1PPP/R3K2R b KQ - 0 1',
+		'counts': [6, 264, 9467, 422333, 15833292],
+		'depth': 3,
+	},
+	{
+		'name': 'position5',
+		'fen': 'rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8',
+		'counts': [44, 1486, 62379, 2103487, 89941194],
+		'depth': 3,
+	},
+	{
+		'name': 'position6',
+		'fen': 'r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10',
+		'counts': [46, 2079, 89890, 3894594, 164075551],
+		'depth': 3,
+	},
+	# not a published position: the largest halfmove clock a FEN may give,
+	# which the moves after it push past 16 bits in the undo stack
+	{
+		'name': 'max_clock',
+		'fen': '4k3/8/8/8/8/8/8/4K3 w - - 65535 1',
+		'counts': [5, 25, 170, 1156, 7922],
+		'depth': 4,
+	},
+]
+
+
+# peak resident set size of the current process in KB
+def peak_rss():
+	if resource is None:
+		return None
+
+	rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# macOS reports bytes, Linux reports KB
+	return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def run_position(backend, fen, depth):
+	b = BACKENDS[backend](fen)
+	start = time.perf_counter()
+	nodes = perft(depth, b)
+	elapsed = time.perf_counter() - start
+
+	return nodes, elapsed, peak_rss()
+
+
+# every position runs in a fresh process so its peak RSS isn't
+# inflated by the positions that ran before it
+def run_suite(backend='board', depth=None, names=None):
+	results = []
+	for position in POSITIONS:
+		if names and position['name'] not in names:
+			continue
+
+		counts = position['counts']
+		position_depth = min(depth, len(counts)) if depth else position['depth']
+		with ProcessPoolExecutor(1) as pool:
+			nodes, elapsed, rss = pool.submit(run_position, backend, position['fen'], position_depth).result()
+
+		expected = counts[position_depth - 1]
+		results.append({
+			'name': position['name'],
+			'fen': position['fen'],
+			'depth': position_depth,
+			'nodes': nodes,
+			'expected': expected,
+			'correct': nodes == expected,
+			'time': round(elapsed, 4),
+			'nps': round(nodes / elapsed) if elapsed else 0,
+			'peak_rss_kb': rss,
+		})
+
+	return results
+
+
+def position_key(result):
+	return result['name'], result['fen'], result['depth']
+
+
+def baseline_positions(baseline):
+	return {position_key(result): result for result in baseline['results']}
+
+
+# reason the baseline can't be compared with this run, None if it can
+# nodes/s of the two backends differ several times over, so comparing across them means nothing
+def baseline_mismatch(report, baseline):
+	if baseline.get('backend') != report['backend']:
+		return f'baseline was run on the {baseline.get("backend")} backend, this run on {report["backend"]}'
+
+	compared = baseline_positions(baseline)
+	if not any(position_key(result) in compared for result in report['results']):
+		return 'baseline has none of the positions of this run (same name, FEN and depth)'
+
+	return None
+
+
+# positions whose nodes/s dropped more than threshold below the baseline
+# positions are only compared if they were run from the same FEN at the same depth
+def find_regressions(results, baseline, threshold):
+	baseline_results = baseline_positions(baseline)
+
+	regressions = []
+	for result in results:
+		base = baseline_results.get(position_key(result))
+		if base is None or not base['nps']:
+			continue
+
+		change = result['nps'] / base['nps'] - 1
+		if change < -threshold:
+			regressions.append((result['name'], base['nps'], result['nps'], change))
+
+	return regressions
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Run the standard perft positions and report throughput.')
+	parser.add_argument('--depth', type=int,
+		help='depth for every position, capped at the deepest published count (default: per position)')
+	parser.add_argument('--positions', nargs='*', choices=[p['name'] for p in POSITIONS],
+		help='positions to run (default: all)')
+	parser.add_argument('--backend', choices=BACKENDS, default='board')
+	parser.add_argument('--output', help='write the JSON results to this file instead of stdout')
+	parser.add_argument('--baseline', help='JSON results of an earlier run to compare nodes/s against')
+	parser.add_argument('--threshold', type=float, default=0.1,
+		help='allowed nodes/s drop relative to the baseline, as a fraction (default: 0.1)')
+	args = parser.parse_args()
+
+	if args.depth is not None and args.depth < 1:
+		parser.error('depth must be at least 1')
+
+	results = run_suite(args.backend, args.depth, args.positions)
+
+	for r in results:
+		status = 'ok' if r['correct'] else f'FAIL (expected {r["expected"]})'
+		print(f'{r["name"]:<20} depth {r["depth"]}  {r["nodes"]:>10} nodes  {r["time"]:>8.3f}s  '
+			f'{r["nps"]:>8} nodes/s  {r["peak_rss_kb"]} KB  {status}', file=sys.stderr)
+
+	report = {
+		'backend': args.backend,
+		'python': platform.python_version(),
+		'platform': platform.platform(),
+		'results': results,
+	}
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			json.dump(report, f, indent=2)
+	else:
+		print(json.dumps(report, indent=2))
+
+	failed = not all(r['correct'] for r in results)
+
+	if args.baseline:
+		with open(args.baseline) as f:
+			baseline = json.load(f)
+
+		# an incomparable baseline fails the run, so a check meant to catch regressions can't pass silently
+		mismatch = baseline_mismatch(report, baseline)
+		if mismatch:
+			print(f'BASELINE NOT COMPARED: {mismatch}', file=sys.stderr)
+			failed = True
+		else:
+			compared = baseline_positions(baseline)
+			for result in results:
+				if position_key(result) not in compared:
+					print(f'not in baseline: {result["name"]} (depth {result["depth"]})', file=sys.stderr)
+
+			for name, before, after, change in find_regressions(results, baseline, args.threshold):
+				print(f'REGRESSION {name}: {before} -> {after} nodes/s ({change:.1%})', file=sys.stderr)
+				failed = True
+
+	sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,699 @@
+from piece import Piece, EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, SYMBOLS, CODES
+from move import Move, encode_move, move_list, CASTLE, EN_PASSANT, PROMOTION
+from zobrist import PIECE_KEYS, CASTLING_MASK_KEYS, EN_PASSANT_KEYS, SIDE_KEY
+from fen import START_FEN, parse_fen, format_fen
+from evaluation import compute_totals, tapered_score
+import notation
+
+
+########################
+# PRECOMPUTED TABLES #
+########################
+
+# squares are indexed the same way as Board: 0 = a8, 63 = h1
+# bit n of a bitboard is set if square n is occupied
+
+KNIGHT_DIRECTIONS = [
+	(-2, -1), (-1, -2), (-2, 1), (-1, 2),
+	(1, -2), (2, -1), (2, 1), (1, 2)
+]
+KING_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1), (1, 0), (-1, 0), (0, 1), (0, -1)]
+
+
+def _step_attacks(directions):
+	attacks = []
+	for index in range(64):
+		row, col = index // 8, index % 8
+		bb = 0
+		for row_direction, col_direction in directions:
+			r, c = row + row_direction, col + col_direction
+			if 0 <= r < 8 and 0 <= c < 8:
+				bb |= 1 << (r * 8 + c)
+		attacks.append(bb)
+
+	return attacks
+
+
+def _rays(row_direction, col_direction):
+	rays = []
+	for index in range(64):
+		r, c = index // 8 + row_direction, index % 8 + col_direction
+		ray = 0
+		while 0 <= r < 8 and 0 <= c < 8:
+			ray |= 1 << (r * 8 + c)
+			r, c = r + row_direction, c + col_direction
+		rays.append(ray)
+
+	return rays
+
+
+KNIGHT_ATTACKS = _step_attacks(KNIGHT_DIRECTIONS)
+KING_ATTACKS = _step_attacks(KING_DIRECTIONS)
+
+# squares attacked by a pawn of the given side (0 = white, 1 = black)
+PAWN_ATTACKS = (_step_attacks([(-1, -1), (-1, 1)]), _step_attacks([(1, -1), (1, 1)]))
+
+# rays towards higher indices are blocked by their lowest set bit,
+# rays towards lower indices by their highest set bit
+ROOK_RAYS_UP = [_rays(1, 0), _rays(0, 1)]
+ROOK_RAYS_DOWN = [_rays(-1, 0), _rays(0, -1)]
+BISHOP_RAYS_UP = [_rays(1, -1), _rays(1, 1)]
+BISHOP_RAYS_DOWN = [_rays(-1, 1), _rays(-1, -1)]
+
+ROOK_LINES = [sum(rays[i] for rays in ROOK_RAYS_UP + ROOK_RAYS_DOWN) for i in range(64)]
+BISHOP_LINES = [sum(rays[i] for rays in BISHOP_RAYS_UP + BISHOP_RAYS_DOWN) for i in range(64)]
+
+
+def _between_and_lines():
+	between = [[0] * 64 for _ in range(64)]
+	lines = [[0] * 64 for _ in range(64)]
+
+	for index in range(64):
+		for row_direction, col_direction in KING_DIRECTIONS:
+			ray = _rays(row_direction, col_direction)[index]
+			opposite = _rays(-row_direction, -col_direction)[index]
+			squares = 0
+			r, c = index // 8 + row_direction, index % 8 + col_direction
+			while 0 <= r < 8 and 0 <= c < 8:
+				target = r * 8 + c
+				between[index][target] = squares
+				lines[index][target] = ray | opposite | (1 << index)
+				squares |= 1 << target
+				r, c = r + row_direction, c + col_direction
+
+	return between, lines
+
+
+# squares strictly between two aligned squares, and the full line through them
+BETWEEN, LINES = _between_and_lines()
+
+# castling rights kept as a bitmask, cleared when a king or rook square is touched
+W_SHORT, W_LONG, B_SHORT, B_LONG = 1, 2, 4, 8
+CASTLING_MASK = [15] * 64
+CASTLING_MASK[0] = 15 ^ B_LONG
+CASTLING_MASK[7] = 15 ^ B_SHORT
+CASTLING_MASK[4] = 15 ^ B_LONG ^ B_SHORT
+CASTLING_MASK[56] = 15 ^ W_LONG
+CASTLING_MASK[63] = 15 ^ W_SHORT
+CASTLING_MASK[60] = 15 ^ W_LONG ^ W_SHORT
+CASTLING_RIGHT_BITS = {'w_short': W_SHORT, 'w_long': W_LONG, 'b_short': B_SHORT, 'b_long': B_LONG}
+
+# promotion pieces in generation order, queen first so the GUI picks a queen
+PROMOTIONS = (3, 2, 1, 0)
+
+RANK_1 = 0xFF << 56
+RANK_8 = 0xFF
+ALL_SQUARES = (1 << 64) - 1
+
+
+def bishop_attacks(index, occupied):
+	attacks = 0
+	for rays in BISHOP_RAYS_UP:
+		ray = rays[index]
+		blockers = ray & occupied
+		if blockers:
+			ray ^= rays[(blockers & -blockers).bit_length() - 1]
+		attacks |= ray
+
+	for rays in BISHOP_RAYS_DOWN:
+		ray = rays[index]
+		blockers = ray & occupied
+		if blockers:
+			ray ^= rays[blockers.bit_length() - 1]
+		attacks |= ray
+
+	return attacks
+
+
+def rook_attacks(index, occupied):
+	attacks = 0
+	for rays in ROOK_RAYS_UP:
+		ray = rays[index]
+		blockers = ray & occupied
+		if blockers:
+			ray ^= rays[(blockers & -blockers).bit_length() - 1]
+		attacks |= ray
+
+	for rays in ROOK_RAYS_DOWN:
+		ray = rays[index]
+		blockers = ray & occupied
+		if blockers:
+			ray ^= rays[blockers.bit_length() - 1]
+		attacks |= ray
+
+	return attacks
+
+
+class BitBoard:
+	SIDES = {'w': 0, 'b': 1}
+
+
+	def __init__(self, fen=START_FEN, debug=False):
+		self.debug = debug
+		symbols, turn, castling_rights, ep_square, halfmove_clock, fullmove_number = parse_fen(fen)
+
+		self.set_squares(symbols)
+		self.moves = []
+		self.history = []
+		self.castling_rights = 0
+		for right, bit in CASTLING_RIGHT_BITS.items():
+			if castling_rights[right]:
+				self.castling_rights |= bit
+
+		# full game state, as in FEN
+		self.turn = turn
+		self.ep_square = ep_square
+		self.halfmove_clock = halfmove_clock
+		self.fullmove_number = fullmove_number
+
+		self.checks = {'w': False, 'b': False}
+		self.update_checks()
+		self.key = self.compute_key()
+		# legal move index for notation, built on first use
+		self.move_index = None
+
+
+	@classmethod
+	def from_fen(cls, fen, debug=False):
+		return cls(fen, debug)
+
+
+	def to_fen(self):
+		symbols = [SYMBOLS[code] for code in self.squares]
+		castling_rights = {right: bool(self.castling_rights & bit)
+			for right, bit in CASTLING_RIGHT_BITS.items()}
+		return format_fen(symbols, self.turn, castling_rights, self.ep_square,
+			self.halfmove_clock, self.fullmove_number)
+
+
+	def set_squares(self, symbols):
+		# one bitboard per piece code, one occupancy bitboard per color
+		self.bitboards = [0] * 15
+		self.colors = [0, 0]
+		self.squares = [EMPTY] * 64
+		self.king_index = {}
+
+		for index, symbol in enumerate(symbols):
+			if symbol == '00':
+				continue
+
+			code = CODES[symbol]
+			self.squares[index] = code
+			self.bitboards[code] |= 1 << index
+			self.colors[code >> 3] |= 1 << index
+			if code & 7 == KING:
+				self.king_index[symbol[0]] = index
+
+
+##############################
+# MAKE AND UNDO MOVE METHODS #
+##############################
+
+
+	def make_move(self, move):
+		from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+		squares = self.squares
+
+		if flag == EN_PASSANT:
+			captured_index = to_index + 8 if squares[from_index] < 8 else to_index - 8
+		else:
+			captured_index = to_index
+		captured = squares[captured_index] if flag != CASTLE else EMPTY
+
+		self.moves.append(move)
+		self.history.append((self.castling_rights, self.ep_square, self.halfmove_clock,
+			self.checks['w'], self.checks['b'], self.key, captured))
+
+		key = self.key ^ SIDE_KEY ^ CASTLING_MASK_KEYS[self.castling_rights]
+		if self.ep_square is not None:
+			key ^= EN_PASSANT_KEYS[self.ep_square % 8]
+		self.castling_rights &= CASTLING_MASK[from_index] & CASTLING_MASK[to_index]
+		key ^= CASTLING_MASK_KEYS[self.castling_rights]
+		self.ep_square = None
+		self.halfmove_clock = 0 if captured else self.halfmove_clock + 1
+		if self.turn == 'b':
+			self.fullmove_number += 1
+		self.turn = 'b' if self.turn == 'w' else 'w'
+
+		if flag == CASTLE:
+			king_pos, rook_pos = self.castling_squares(move)
+			king = squares[from_index]
+			rook = squares[to_index]
+			key ^= PIECE_KEYS[king][from_index] ^ PIECE_KEYS[king][king_pos]
+			key ^= PIECE_KEYS[rook][to_index] ^ PIECE_KEYS[rook][rook_pos]
+			self.castle(move)
+		else:
+			bitboards = self.bitboards
+			piece = squares[from_index]
+			side = piece >> 3
+			from_to = (1 << from_index) | (1 << to_index)
+
+			# update capture
+			if captured:
+				squares[captured_index] = EMPTY
+				bitboards[captured] ^= 1 << captured_index
+				self.colors[side ^ 1] ^= 1 << captured_index
+				key ^= PIECE_KEYS[captured][captured_index]
+
+			bitboards[piece] ^= from_to
+			key ^= PIECE_KEYS[piece][from_index] ^ PIECE_KEYS[piece][to_index]
+			self.colors[side] ^= from_to
+			squares[from_index] = EMPTY
+			squares[to_index] = piece
+
+			piece_type = piece & 7
+			if piece_type == PAWN:
+				self.halfmove_clock = 0
+				if flag == PROMOTION:
+					promoted = (piece & 8) | (KNIGHT + (move >> 14))
+					bitboards[piece] ^= 1 << to_index
+					bitboards[promoted] |= 1 << to_index
+					squares[to_index] = promoted
+					key ^= PIECE_KEYS[piece][to_index] ^ PIECE_KEYS[promoted][to_index]
+				elif to_index - from_index in (16, -16):
+					self.ep_square = (from_index + to_index) // 2
+					key ^= EN_PASSANT_KEYS[to_index % 8]
+
+			elif piece_type == KING:
+				self.king_index['b' if side else 'w'] = to_index
+
+		self.key = key
+		self.update_checks()
+
+		if self.debug:
+			assert self.key == self.compute_key()
+
+
+	def castle(self, move):
+		from_index, to_index = move & 63, move >> 6 & 63
+		king_pos, rook_pos = self.castling_squares(move)
+		king = self.squares[from_index]
+		rook = self.squares[to_index]
+		side = king >> 3
+
+		king_from_to = (1 << from_index) | (1 << king_pos)
+		rook_from_to = (1 << to_index) | (1 << rook_pos)
+		self.bitboards[king] ^= king_from_to
+		self.bitboards[rook] ^= rook_from_to
+		self.colors[side] ^= king_from_to ^ rook_from_to
+
+		self.squares[from_index] = EMPTY
+		self.squares[to_index] = EMPTY
+		self.squares[king_pos] = king
+		self.squares[rook_pos] = rook
+
+		self.king_index['b' if side else 'w'] = king_pos
+
+
+	def undo_move(self):
+		move = self.moves.pop()
+		castling_rights, ep_square, halfmove_clock, w_check, b_check, key, captured = self.history.pop()
+		self.key = key
+		self.castling_rights = castling_rights
+		self.ep_square = ep_square
+		self.halfmove_clock = halfmove_clock
+		self.turn = 'b' if self.turn == 'w' else 'w'
+		if self.turn == 'b':
+			self.fullmove_number -= 1
+		self.checks['w'] = w_check
+		self.checks['b'] = b_check
+
+		from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+		if flag == CASTLE:
+			self.undo_castle(move)
+			return
+
+		bitboards = self.bitboards
+		squares = self.squares
+		piece = squares[to_index]
+		side = piece >> 3
+
+		if flag == PROMOTION:
+			pawn = (piece & 8) | PAWN
+			bitboards[piece] ^= 1 << to_index
+			bitboards[pawn] |= 1 << to_index
+			piece = pawn
+
+		from_to = (1 << from_index) | (1 << to_index)
+		bitboards[piece] ^= from_to
+		self.colors[side] ^= from_to
+		squares[from_index] = piece
+		squares[to_index] = EMPTY
+
+		# undo capture
+		if captured:
+			captured_index = to_index
+			if flag == EN_PASSANT:
+				captured_index = to_index + 8 if side == 0 else to_index - 8
+			squares[captured_index] = captured
+			bitboards[captured] |= 1 << captured_index
+			self.colors[side ^ 1] |= 1 << captured_index
+
+		if piece & 7 == KING:
+			self.king_index['b' if side else 'w'] = from_index
+
+
+	def undo_castle(self, move):
+		from_index, to_index = move & 63, move >> 6 & 63
+		king_pos, rook_pos = self.castling_squares(move)
+		king = self.squares[king_pos]
+		rook = self.squares[rook_pos]
+		side = king >> 3
+
+		king_from_to = (1 << from_index) | (1 << king_pos)
+		rook_from_to = (1 << to_index) | (1 << rook_pos)
+		self.bitboards[king] ^= king_from_to
+		self.bitboards[rook] ^= rook_from_to
+		self.colors[side] ^= king_from_to ^ rook_from_to
+
+		self.squares[king_pos] = EMPTY
+		self.squares[rook_pos] = EMPTY
+		self.squares[from_index] = king
+		self.squares[to_index] = rook
+
+		self.king_index['b' if side else 'w'] = from_index
+
+
+###########################
+# MOVE GENERATION METHODS #
+###########################
+
+
+	# legal moves as a flat array of packed moves
+	# side defaults to the side to move
+	def generate_moves(self, side=None):
+		if side is None:
+			side = self.turn
+
+		us = BitBoard.SIDES[side]
+		them = us ^ 1
+		color = us << 3
+		bitboards = self.bitboards
+		own = self.colors[us]
+		occupied = own | self.colors[them]
+		not_own = ALL_SQUARES ^ own
+		king = self.king_index[side]
+
+		checkers = self.attackers(king, them, occupied)
+		pinned = self.pinned(king, us, occupied)
+
+		# non-king moves have to capture the checker or block the check
+		if not checkers:
+			check_mask = ALL_SQUARES
+		elif checkers & (checkers - 1):
+			check_mask = 0
+		else:
+			check_mask = checkers | BETWEEN[king][checkers.bit_length() - 1]
+
+		valid_moves = move_list()
+
+		if check_mask:
+			self.generate_pawn_moves(valid_moves, us, king, pinned, check_mask, occupied)
+
+			for piece_type in (KNIGHT, BISHOP, ROOK, QUEEN):
+				pieces = bitboards[color | piece_type]
+				while pieces:
+					bit = pieces & -pieces
+					pieces ^= bit
+					from_index = bit.bit_length() - 1
+
+					if piece_type == KNIGHT:
+						# a pinned knight can never move
+						if bit & pinned:
+							continue
+						targets = KNIGHT_ATTACKS[from_index]
+					elif piece_type == BISHOP:
+						targets = bishop_attacks(from_index, occupied)
+					elif piece_type == ROOK:
+						targets = rook_attacks(from_index, occupied)
+					else:
+						targets = bishop_attacks(from_index, occupied) | rook_attacks(from_index, occupied)
+
+					targets &= not_own & check_mask
+					if bit & pinned:
+						targets &= LINES[king][from_index]
+
+					while targets:
+						to_bit = targets & -targets
+						targets ^= to_bit
+						valid_moves.append(from_index | (to_bit.bit_length() - 1) << 6)
+
+		self.generate_king_moves(valid_moves, us, king, checkers, occupied)
+
+		return valid_moves
+
+
+	# compatibility adapter for the GUI: legal moves grouped by from index
+	def get_valid_moves(self, side=None):
+		valid_moves = {}
+		for move in self.generate_moves(side):
+			valid_moves.setdefault(move & 63, []).append(Move(move))
+
+		return valid_moves
+
+
+	def generate_pawn_moves(self, valid_moves, us, king, pinned, check_mask, occupied):
+		color = us << 3
+		pawn = color | PAWN
+		enemy = self.colors[us ^ 1]
+		empty = ALL_SQUARES ^ occupied
+		attacks = PAWN_ATTACKS[us]
+		last_rank = RANK_8 if us == 0 else RANK_1
+		push = -8 if us == 0 else 8
+		starting_row = 6 if us == 0 else 1
+
+		pawns = self.bitboards[pawn]
+		while pawns:
+			bit = pawns & -pawns
+			pawns ^= bit
+			from_index = bit.bit_length() - 1
+
+			targets = 0
+			north_index = from_index + push
+			if empty >> north_index & 1:
+				targets |= 1 << north_index
+				north_north_index = north_index + push
+				if from_index // 8 == starting_row and empty >> north_north_index & 1:
+					targets |= 1 << north_north_index
+
+			targets |= attacks[from_index] & enemy
+			targets &= check_mask
+			if bit & pinned:
+				targets &= LINES[king][from_index]
+
+			while targets:
+				to_bit = targets & -targets
+				targets ^= to_bit
+				to_index = to_bit.bit_length() - 1
+				if to_bit & last_rank:
+					for promotion in PROMOTIONS:
+						valid_moves.append(encode_move(from_index, to_index, PROMOTION, promotion))
+				else:
+					valid_moves.append(from_index | to_index << 6)
+
+			# en passant can expose the king along the rank of both pawns,
+			# so it is verified by testing the resulting occupancy directly
+			ep_square = self.ep_square
+			if ep_square is not None and attacks[from_index] >> ep_square & 1:
+				captured_index = ep_square - push
+				after = occupied ^ bit ^ (1 << captured_index) | (1 << ep_square)
+				if not self.attackers(king, us ^ 1, after, 1 << captured_index):
+					valid_moves.append(encode_move(from_index, ep_square, EN_PASSANT))
+
+
+	def generate_king_moves(self, valid_moves, us, king, checkers, occupied):
+		color = us << 3
+		them = us ^ 1
+		squares = self.squares
+
+		# the king can't hide behind itself from a slider
+		without_king = occupied ^ (1 << king)
+		targets = KING_ATTACKS[king] & ~self.colors[us]
+		while targets:
+			to_bit = targets & -targets
+			targets ^= to_bit
+			to_index = to_bit.bit_length() - 1
+			if not self.attackers(to_index, them, without_king):
+				valid_moves.append(king | to_index << 6)
+
+		# castling moves are encoded as king takes own rook, like Board
+		if not checkers and self.castling_rights:
+			if us == 0:
+				rights = ((W_SHORT, 63, 61, 62), (W_LONG, 56, 59, 58))
+			else:
+				rights = ((B_SHORT, 7, 5, 6), (B_LONG, 0, 3, 2))
+
+			for right, rook_index, pass_index, king_pos in rights:
+				if (self.castling_rights & right and squares[rook_index] == color | ROOK and
+						not BETWEEN[king][rook_index] & occupied and
+						not self.attackers(pass_index, them, occupied) and
+						not self.attackers(king_pos, them, occupied)):
+					valid_moves.append(encode_move(king, rook_index, CASTLE))
+
+
+#######################
+# BOARD STATE METHODS #
+#######################
+
+
+	def attackers(self, index, by, occupied, removed=0):
+		# removed is a mask of pieces captured in a hypothetical position
+		bitboards = self.bitboards
+		color = by << 3
+		enemy = ALL_SQUARES ^ removed
+
+		attackers = PAWN_ATTACKS[by ^ 1][index] & bitboards[color | PAWN]
+		attackers |= KNIGHT_ATTACKS[index] & bitboards[color | KNIGHT]
+		attackers |= KING_ATTACKS[index] & bitboards[color | KING]
+
+		queens = bitboards[color | QUEEN]
+		diagonal = bitboards[color | BISHOP] | queens
+		if diagonal & BISHOP_LINES[index]:
+			attackers |= bishop_attacks(index, occupied) & diagonal
+
+		straight = bitboards[color | ROOK] | queens
+		if straight & ROOK_LINES[index]:
+			attackers |= rook_attacks(index, occupied) & straight
+
+		return attackers & enemy
+
+
+	def pinned(self, king, us, occupied):
+		them = us ^ 1
+		color = them << 3
+		bitboards = self.bitboards
+		queens = bitboards[color | QUEEN]
+
+		# enemy sliders that would attack the king on an empty board
+		snipers = ((ROOK_LINES[king] & (bitboards[color | ROOK] | queens)) |
+			(BISHOP_LINES[king] & (bitboards[color | BISHOP] | queens)))
+
+		pinned = 0
+		own = self.colors[us]
+		while snipers:
+			bit = snipers & -snipers
+			snipers ^= bit
+			blockers = BETWEEN[king][bit.bit_length() - 1] & occupied
+			if blockers and not blockers & (blockers - 1) and blockers & own:
+				pinned |= blockers
+
+		return pinned
+
+
+	def compute_key(self):
+		key = CASTLING_MASK_KEYS[self.castling_rights]
+		for index, code in enumerate(self.squares):
+			if code:
+				key ^= PIECE_KEYS[code][index]
+
+		if self.ep_square is not None:
+			key ^= EN_PASSANT_KEYS[self.ep_square % 8]
+
+		if self.turn == 'b':
+			key ^= SIDE_KEY
+
+		return key
+
+
+	def update_checks(self):
+		occupied = self.colors[0] | self.colors[1]
+		self.checks['w'] = bool(self.attackers(self.king_index['w'], 1, occupied))
+		self.checks['b'] = bool(self.attackers(self.king_index['b'], 0, occupied))
+
+
+	# whether the current position occurred at least count times before,
+	# scanning the keys in the history back to the last capture or pawn move
+	def is_repetition(self, count=1):
+		key = self.key
+		history = self.history
+		oldest = max(len(history) - self.halfmove_clock, 0)
+		for ply in range(len(history) - 4, oldest - 1, -2):
+			if history[ply][5] == key:
+				count -= 1
+				if count == 0:
+					return True
+
+		return False
+
+
+	def is_fifty_move_draw(self):
+		return self.halfmove_clock >= 100
+
+
+	# threefold repetition or the fifty-move rule
+	def is_draw(self):
+		return self.halfmove_clock >= 100 or self.is_repetition(2)
+
+
+	# static evaluation from the side to move's point of view
+	# bitboards keep no running totals, so the squares are summed every time
+	def evaluate(self):
+		return tapered_score(*compute_totals(self.squares), self.turn)
+
+
+	def in_check(self, side):
+		occupied = self.colors[0] | self.colors[1]
+		return bool(self.attackers(self.king_index[side], BitBoard.SIDES[side] ^ 1, occupied))
+
+
+####################
+# NOTATION METHODS #
+####################
+
+
+	# legal moves of the position are indexed once and reused by
+	# every lookup until a move changes the position (see notation.py)
+	def parse_san(self, san):
+		return notation.parse_san(self, san)
+
+
+	def parse_uci(self, uci):
+		return notation.parse_uci(self, uci)
+
+
+	def to_san(self, move):
+		return notation.to_san(self, move)
+
+
+##################
+# HELPER METHODS #
+##################
+
+
+	def castling_squares(self, move):
+		from_index, to_index = move & 63, move >> 6 & 63
+		# long castle
+		if to_index == 0 or to_index == 56:
+			return from_index - 2, to_index + 3
+		# short castle
+		return from_index + 2, to_index - 2
+
+
+	# Piece objects are only materialized for the GUI
+	@property
+	def board(self):
+		return [Piece.from_code(code, index) for index, code in enumerate(self.squares)]
+
+
+	@property
+	def captured_pieces(self):
+		captured_pieces = {'w': [], 'b': []}
+		for *_, captured in self.history:
+			if captured:
+				piece = Piece.from_code(captured, None)
+				captured_pieces[piece.color].append(piece)
+
+		return captured_pieces
+
+
+	def __repr__(self):
+		s = '\n'
+		for row in range(8):
+			s += f'\n\t{row + 1} | '
+			for col in range(8):
+				index = row * 8 + col
+				s += f'{SYMBOLS[self.squares[index]]} '
+
+		s += '\n\t    a  b  c  d  e  f  g  h\n'
+
+		return s
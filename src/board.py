@@ -1,52 +1,203 @@
-from piece import Piece
-from move import Move
+from array import array
+from piece import Piece, EMPTY, PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, WHITE, BLACK, SYMBOLS, CODES
+from move import Move, encode_move, move_list, CASTLE, EN_PASSANT, PROMOTION
+from zobrist import PIECE_KEYS, CASTLING_KEYS, EN_PASSANT_KEYS, SIDE_KEY
+from fen import START_FEN, parse_fen, format_fen
+from evaluation import MATERIAL, PHASE, MIDGAME, ENDGAME, compute_totals, tapered_score
+import notation
+
+
+BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
+ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+KING_QUEEN_DIRECTIONS = BISHOP_DIRECTIONS + ROOK_DIRECTIONS
+KNIGHT_DIRECTIONS = [
+	(-2, -1), (-1, -2), (-2, 1), (-1, 2),
+	(1, -2), (2, -1), (2, 1), (1, 2)
+]
+
+
+######################
+# PRECOMPUTED TABLES #
+######################
+
+# built once at import so move generation never has to
+# check for wrapping around the edge of the board
+
+
+def one_step_targets(directions):
+	targets = []
+	for index in range(64):
+		row, col = index // 8, index % 8
+		squares = []
+		for row_direction, col_direction in directions:
+			r, c = row + row_direction, col + col_direction
+			if 0 <= r <= 7 and 0 <= c <= 7:
+				squares.append(r * 8 + c)
+		targets.append(squares)
+
+	return targets
+
+
+# rays are ordered outwards from the square, so the first piece
+# on a ray is the one that blocks it
+def sliding_rays(directions):
+	rays = []
+	for index in range(64):
+		row, col = index // 8, index % 8
+		square_rays = []
+		for row_direction, col_direction in directions:
+			ray = []
+			r, c = row + row_direction, col + col_direction
+			while 0 <= r <= 7 and 0 <= c <= 7:
+				ray.append(r * 8 + c)
+				r, c = r + row_direction, c + col_direction
+			if ray:
+				square_rays.append(ray)
+		rays.append(square_rays)
+
+	return rays
+
+
+KNIGHT_TARGETS = one_step_targets(KNIGHT_DIRECTIONS)
+KING_TARGETS = one_step_targets(KING_QUEEN_DIRECTIONS)
+
+# squares attacked by a pawn of the given color standing on a square
+PAWN_ATTACKS = {
+	'w': one_step_targets([(-1, -1), (-1, 1)]),
+	'b': one_step_targets([(1, -1), (1, 1)]),
+}
+
+BISHOP_RAYS = sliding_rays(BISHOP_DIRECTIONS)
+ROOK_RAYS = sliding_rays(ROOK_DIRECTIONS)
+QUEEN_RAYS = [BISHOP_RAYS[i] + ROOK_RAYS[i] for i in range(64)]
+
+# attack maps are kept as bitmasks with one bit per square
+BITS = [1 << index for index in range(64)]
+ALL_SQUARES = (1 << 64) - 1
+
+
+def target_masks(targets):
+	return [sum(BITS[index] for index in squares) for squares in targets]
+
+
+KNIGHT_MASKS = target_masks(KNIGHT_TARGETS)
+KING_MASKS = target_masks(KING_TARGETS)
+# indexed by color >> 3
+PAWN_MASKS = (target_masks(PAWN_ATTACKS['w']), target_masks(PAWN_ATTACKS['b']))
+# indexed by piece type
+SLIDER_RAYS = [None, None, None, BISHOP_RAYS, ROOK_RAYS, QUEEN_RAYS, None]
+
+# bit of each castling right in the revoked rights recorded per move
+CASTLING_RIGHTS = ['w_short', 'w_long', 'b_short', 'b_long']
+CASTLING_BITS = {right: 1 << bit for bit, right in enumerate(CASTLING_RIGHTS)}
+CASTLING_INDICES = {0: 'b_long', 7: 'b_short', 56: 'w_long', 63: 'w_short'}
+KING_CASTLING_BITS = {WHITE: 0b0011, BLACK: 0b1100}
+
+# promotion pieces in generation order, queen first so the GUI picks a queen
+PROMOTIONS = (3, 2, 1, 0)
+
+SIDE_COLORS = {'w': WHITE, 'b': BLACK}
+COLOR_SIDES = {WHITE: 'w', BLACK: 'b'}
+
+# initial size of the undo stack, doubled whenever it fills up
+STACK_SIZE = 256
 
 
 class Board:
-	BISHOP_DIRECTIONS = [(-1, -1), (-1, 1), (1, -1), (1, 1)]
-	ROOK_DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
-	KING_QUEEN_DIRECTIONS = BISHOP_DIRECTIONS + ROOK_DIRECTIONS
-	KNIGHT_DIRECTIONS = [
-    	(-2, -1), (-1, -2), (-2, 1), (-1, 2),
-    	(1, -2), (2, -1), (2, 1), (1, 2)
-	]
-
-
-	def __init__(self):
-		self.initialize_board_and_pieces()
-		self.moves = []
+	BISHOP_DIRECTIONS = BISHOP_DIRECTIONS
+	ROOK_DIRECTIONS = ROOK_DIRECTIONS
+	KING_QUEEN_DIRECTIONS = KING_QUEEN_DIRECTIONS
+	KNIGHT_DIRECTIONS = KNIGHT_DIRECTIONS
+
+
+	# debug recomputes the position key from scratch after every
+	# make/undo and asserts that it matches the incremental key
+	def __init__(self, fen=START_FEN, debug=False):
+		self.debug = debug
+		symbols, turn, castling_rights, ep_square, halfmove_clock, fullmove_number = parse_fen(fen)
+
+		self.initialize_board_and_pieces(symbols)
+		self.initialize_attacks()
+		self.initialize_stacks()
 		self.undone_moves = []
-		self.captured_pieces = {'w': [], 'b': []}
-		self.king_index = {'w': 60, 'b': 4}
-		self.checks = {'w': False, 'b': False}
-		self.castling_rights = {
-			'w_short': True,
-			'w_long': True,
-			'b_short': True,
-			'b_long': True
-		}
-
-
-	def initialize_board_and_pieces(self):
-		self.pieces = {'w': [], 'b': []}
-		self.board = [
-			'br', 'bn', 'bb', 'bq', 'bk', 'bb', 'bn', 'br',
-			'bp', 'bp', 'bp', 'bp', 'bp', 'bp', 'bp', 'bp',
-			'00', '00', '00', '00', '00', '00', '00', '00',
-			'00', '00', '00', '00', '00', '00', '00', '00',
-			'00', '00', '00', '00', '00', '00', '00', '00',
-			'00', '00', '00', '00', '00', '00', '00', '00',
-			'wp', 'wp', 'wp', 'wp', 'wp', 'wp', 'wp', 'wp',
-			'wr', 'wn', 'wb', 'wq', 'wk', 'wb', 'wn', 'wr',
-		]
-
-		# board consists of Piece objects
-		# empty squares are Piece objects with no color or type
-		for i, piece in enumerate(self.board):
-			piece = Piece(piece[0], piece[1], i, piece)
-			self.board[i] = piece
-			if not piece.is_empty():
-				self.pieces[piece.color].append(piece)
+		self.king_index = {'w': symbols.index('wk'), 'b': symbols.index('bk')}
+		self.castling_rights = castling_rights
+
+		# full game state, as in FEN
+		self.turn = turn
+		self.ep_square = ep_square
+		self.halfmove_clock = halfmove_clock
+		self.fullmove_number = fullmove_number
+
+		self.key = self.compute_key()
+		# legal move index for notation, built on first use
+		self.move_index = None
+
+
+	@classmethod
+	def from_fen(cls, fen, debug=False):
+		return cls(fen, debug)
+
+
+	def to_fen(self):
+		symbols = [SYMBOLS[piece] for piece in self.squares]
+		return format_fen(symbols, self.turn, self.castling_rights, self.ep_square,
+			self.halfmove_clock, self.fullmove_number)
+
+
+	def initialize_board_and_pieces(self, symbols):
+		# board consists of integer piece codes (color | type), 0 is empty
+		# piece lists hold the indices of each color's pieces, and
+		# piece_slots maps an index back to its position in the list
+		self.squares = bytearray(64)
+		self.piece_lists = ([], [])
+		self.piece_slots = bytearray(64)
+
+		# running evaluation totals per color, updated along with the piece lists
+		self.material = [0, 0]
+		self.midgame = [0, 0]
+		self.endgame = [0, 0]
+		self.phase = [0, 0]
+
+		for i, symbol in enumerate(symbols):
+			if symbol != '00':
+				self.squares[i] = CODES[symbol]
+				self.add_piece(i)
+
+
+	# attacks[index] is the bitmask of squares attacked by the piece on index,
+	# and attacked holds the union of those for each color (indexed by color >> 3)
+	# make/undo only record the squares they changed in dirty, and the maps are
+	# brought up to date the next time they're read, so the make/undo pairs of
+	# a search or perft that never look at them don't pay for them
+	def initialize_attacks(self):
+		self.attacks = [0] * 64
+		self.attacked = [0, 0]
+		self.dirty = ALL_SQUARES
+
+
+	# undo information lives on preallocated board-side stacks indexed by ply,
+	# so moves themselves are just packed integers
+	def initialize_stacks(self):
+		self.ply = 0
+		self.move_stack = array('H', [0]) * STACK_SIZE
+		self.captured_stack = array('B', [0]) * STACK_SIZE
+		self.rights_stack = array('B', [0]) * STACK_SIZE
+		# en passant square before the move, -1 if there was none
+		self.ep_stack = array('b', [0]) * STACK_SIZE
+		# halfmove clock before the move, wide enough for any clock a FEN can give plus the moves after it
+		self.clock_stack = array('L', [0]) * STACK_SIZE
+		# position key before the move, for repetition detection
+		self.key_stack = array('Q', [0]) * STACK_SIZE
+
+
+	def grow_stacks(self):
+		self.move_stack.extend(array('H', [0]) * len(self.move_stack))
+		self.captured_stack.extend(array('B', [0]) * len(self.captured_stack))
+		self.rights_stack.extend(array('B', [0]) * len(self.rights_stack))
+		self.ep_stack.extend(array('b', [0]) * len(self.ep_stack))
+		self.clock_stack.extend(array('L', [0]) * len(self.clock_stack))
+		self.key_stack.extend(array('Q', [0]) * len(self.key_stack))
 
 
 ##############################
@@ -55,117 +206,207 @@ class Board:
 
 
 	def make_move(self, move):
-		self.moves.append(move)
+		from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+
+		ply = self.ply
+		if ply == len(self.move_stack):
+			self.grow_stacks()
+
+		self.key_stack[ply] = self.key
+		self.key ^= SIDE_KEY ^ self.en_passant_key()
+		self.move_stack[ply] = move
+		self.ep_stack[ply] = -1 if self.ep_square is None else self.ep_square
+		self.clock_stack[ply] = self.halfmove_clock
+		self.ply = ply + 1
 		self.update_castling_rights(move)
 
-		if move.special_move == 'castle':
-			self.castle(move)
-		else:
+		self.ep_square = None
+		self.halfmove_clock += 1
+		if self.turn == 'b':
+			self.fullmove_number += 1
+		self.turn = 'b' if self.turn == 'w' else 'w'
 
-			move.piece.index = move.to_index
-			self.board[move.to_index] = move.piece
-			self.set_empty_square(move.from_index)
+		if flag == CASTLE:
+			self.captured_stack[ply] = EMPTY
+			changed = self.castle(move)
+		else:
+			squares = self.squares
+			piece = squares[from_index]
+			color = piece & 8
+			changed = BITS[from_index] | BITS[to_index]
 
 			# update capture
-			if move.captured_piece:
-				self.captured_pieces[move.captured_piece.color].append(move.captured_piece)
-				self.pieces[move.captured_piece.color].remove(move.captured_piece)
-
-				if move.special_move == 'en_passant':
-					self.set_empty_square(move.captured_piece.index)
+			captured_index = to_index
+			if flag == EN_PASSANT:
+				captured_index = to_index + 8 if color == WHITE else to_index - 8
+				changed |= BITS[captured_index]
+			captured = squares[captured_index]
+			self.captured_stack[ply] = captured
+
+			if captured:
+				self.key ^= PIECE_KEYS[captured][captured_index]
+				squares[captured_index] = EMPTY
+				self.remove_piece(captured_index, captured)
+				self.halfmove_clock = 0
+
+			piece_keys = PIECE_KEYS[piece]
+			self.key ^= piece_keys[from_index] ^ piece_keys[to_index]
+			squares[to_index] = piece
+			squares[from_index] = EMPTY
+			self.move_piece(from_index, to_index, piece)
 
 			# update king index
 			# handled separately in castle method
-			if move.piece.type == 'k':
-				self.king_index[move.piece.color] = move.to_index
+			if piece & 7 == KING:
+				self.king_index[COLOR_SIDES[color]] = to_index
 
-			if move.special_move == 'promotion':
-				self.board[move.to_index].type = 'q'
-				self.board[move.to_index].symbol = 'wq'
+			elif piece & 7 == PAWN:
+				self.halfmove_clock = 0
+				if to_index - from_index in (16, -16):
+					self.ep_square = (from_index + to_index) // 2
 
-		self.update_checks()
+			if flag == PROMOTION:
+				promoted = color | (KNIGHT + (move >> 14))
+				squares[to_index] = promoted
+				self.change_piece(to_index, piece, promoted)
+				self.key ^= piece_keys[to_index] ^ PIECE_KEYS[promoted][to_index]
+
+		self.key ^= self.en_passant_key()
+		self.dirty |= changed
+
+		if self.debug:
+			assert self.key == self.compute_key()
+			self.refresh_attacks()
+			assert self.attacked == self.compute_attacked()
+			assert (self.material, self.midgame, self.endgame, self.phase) == compute_totals(self.squares)
 
 
 	def castle(self, move):
+		from_index, to_index = move & 63, move >> 6 & 63
+
 		# long castle
-		if move.to_index == 0 or move.to_index == 56:
-			king_pos = move.from_index - 2
-			rook_pos = move.to_index + 3
+		if to_index == 0 or to_index == 56:
+			king_pos = from_index - 2
+			rook_pos = to_index + 3
 		# short castle
 		else:
-			king_pos = move.from_index + 2
-			rook_pos = move.to_index - 2
+			king_pos = from_index + 2
+			rook_pos = to_index - 2
+
+		squares = self.squares
+		king = squares[from_index]
+		rook = squares[to_index]
 
-		king = self.board[move.from_index]
-		rook = self.board[move.to_index]
+		# update key
+		self.key ^= PIECE_KEYS[king][from_index] ^ PIECE_KEYS[king][king_pos]
+		self.key ^= PIECE_KEYS[rook][to_index] ^ PIECE_KEYS[rook][rook_pos]
 
 		# update board
-		king.index = king_pos
-		rook.index = rook_pos
-		self.board[king_pos] = king
-		self.board[rook_pos] = rook
-		self.set_empty_square(move.from_index)
-		self.set_empty_square(move.to_index)
+		squares[from_index] = EMPTY
+		squares[to_index] = EMPTY
+		squares[king_pos] = king
+		squares[rook_pos] = rook
+		self.move_piece(from_index, king_pos, king)
+		self.move_piece(to_index, rook_pos, rook)
 
 		# update king index
-		self.king_index[king.color] = king_pos
+		self.king_index[COLOR_SIDES[king & 8]] = king_pos
+
+		return BITS[from_index] | BITS[to_index] | BITS[king_pos] | BITS[rook_pos]
 
 
 	def undo_move(self):
-		move = self.moves.pop()
-		self.update_castling_rights(move, undo=True)
+		self.key ^= SIDE_KEY ^ self.en_passant_key()
+		self.update_castling_rights(self.move_stack[self.ply - 1], undo=True)
+
+		self.ply -= 1
+		move = self.move_stack[self.ply]
+		from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
 
-		if move.special_move == 'castle':
-			self.undo_castle(move)
+		if flag == CASTLE:
+			changed = self.undo_castle(move)
 		else:
-			move.piece.index = move.from_index
-			self.board[move.from_index] = move.piece
+			squares = self.squares
+			piece = squares[to_index]
+			color = piece & 8
+			changed = BITS[from_index] | BITS[to_index]
+
+			if flag == PROMOTION:
+				self.key ^= PIECE_KEYS[piece][to_index] ^ PIECE_KEYS[color | PAWN][to_index]
+				self.change_piece(to_index, piece, color | PAWN)
+				piece = color | PAWN
+
+			piece_keys = PIECE_KEYS[piece]
+			self.key ^= piece_keys[from_index] ^ piece_keys[to_index]
+			squares[from_index] = piece
+			squares[to_index] = EMPTY
+			self.move_piece(to_index, from_index, piece)
 
 			# undo capture
-			if move.captured_piece:
-				self.board[move.captured_piece.index] = move.captured_piece
-				self.captured_pieces[move.captured_piece.color].remove(move.captured_piece)
-				self.pieces[move.captured_piece.color].append(move.captured_piece)
-
-				if move.special_move == 'en_passant':
-					self.set_empty_square(move.to_index)
-			else:
-				self.set_empty_square(move.to_index)
-
-			if move.special_move == 'promotion':
-				move.piece.type = 'p'
-				move.piece.symbol = 'wp'
-
-		# undo king index 
-		# works regardless of whether or not the previous move was a castle
-		if move.piece.type == 'k':
-			self.king_index[move.piece.color] = move.from_index
-
-		self.update_checks()
+			captured = self.captured_stack[self.ply]
+			if captured:
+				captured_index = to_index
+				if flag == EN_PASSANT:
+					captured_index = to_index + 8 if color == WHITE else to_index - 8
+					changed |= BITS[captured_index]
+
+				self.key ^= PIECE_KEYS[captured][captured_index]
+				squares[captured_index] = captured
+				self.add_piece(captured_index)
+
+			# undo king index
+			if piece & 7 == KING:
+				self.king_index[COLOR_SIDES[color]] = from_index
+
+		ep_square = self.ep_stack[self.ply]
+		self.ep_square = None if ep_square < 0 else ep_square
+		self.halfmove_clock = self.clock_stack[self.ply]
+		self.turn = 'b' if self.turn == 'w' else 'w'
+		if self.turn == 'b':
+			self.fullmove_number -= 1
+
+		self.key ^= self.en_passant_key()
+		self.dirty |= changed
+
+		if self.debug:
+			assert self.key == self.compute_key()
+			self.refresh_attacks()
+			assert self.attacked == self.compute_attacked()
+			assert (self.material, self.midgame, self.endgame, self.phase) == compute_totals(self.squares)
 
 
 	def undo_castle(self, move):
+		from_index, to_index = move & 63, move >> 6 & 63
+
 		# long castle
-		if move.to_index == 0 or move.to_index == 56:
-			in_between = range(move.to_index + 1, move.from_index)
-			rook_pos = move.to_index + 3
+		if to_index == 0 or to_index == 56:
+			king_pos = from_index - 2
+			rook_pos = to_index + 3
 		# short castle
 		else:
-			in_between = range(move.from_index + 1, move.to_index)
-			rook_pos = move.to_index - 2
+			king_pos = from_index + 2
+			rook_pos = to_index - 2
+
+		squares = self.squares
+		king = squares[king_pos]
+		rook = squares[rook_pos]
 
-		# update king pos
-		move.piece.index = move.from_index
-		self.board[move.from_index] = move.piece
+		# update key
+		self.key ^= PIECE_KEYS[king][from_index] ^ PIECE_KEYS[king][king_pos]
+		self.key ^= PIECE_KEYS[rook][to_index] ^ PIECE_KEYS[rook][rook_pos]
 
-		# update rook pos
-		rook = self.board[rook_pos]
-		rook.index = move.to_index
-		self.board[move.to_index] = rook
+		# update board
+		squares[king_pos] = EMPTY
+		squares[rook_pos] = EMPTY
+		squares[from_index] = king
+		squares[to_index] = rook
+		self.move_piece(king_pos, from_index, king)
+		self.move_piece(rook_pos, to_index, rook)
+
+		# undo king index
+		self.king_index[COLOR_SIDES[king & 8]] = from_index
 
-		# set empty squares in between
-		for index in in_between:
-			self.set_empty_square(index)
+		return BITS[from_index] | BITS[to_index] | BITS[king_pos] | BITS[rook_pos]
 
 
 ###########################
@@ -173,7 +414,64 @@ class Board:
 ###########################
 
 
-	def get_valid_moves(self, side):
+	# legal moves as a flat array of packed moves
+	# side defaults to the side to move
+	def generate_moves(self, side=None):
+		if side is None:
+			side = self.turn
+
+		checkers, block_squares, pins = self.find_checks_and_pins(side)
+		king_index = self.king_index[side]
+		double_check = len(checkers) > 1
+		self.refresh_attacks()
+		attacked = self.attacked[SIDE_COLORS[side] >> 3 ^ 1]
+		xray_squares = self.xray_squares(checkers, king_index)
+
+		valid_moves = move_list()
+		for move in self.generate_pseudo_legal_moves(side):
+			from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+
+			if from_index == king_index:
+				if flag == CASTLE:
+					if not checkers and self.can_castle_through(move, side):
+						valid_moves.append(move)
+				elif not attacked & BITS[to_index] and to_index not in xray_squares:
+					valid_moves.append(move)
+
+			# only the king can move out of a double check
+			elif double_check:
+				continue
+
+			# en passant removes two pieces from the same rank, which can
+			# uncover a check the pin scan doesn't see
+			elif flag == EN_PASSANT:
+				self.make_move(move)
+				if not self.in_check(side):
+					valid_moves.append(move)
+				self.undo_move()
+
+			else:
+				if checkers and to_index not in block_squares:
+					continue
+				if from_index in pins and to_index not in pins[from_index]:
+					continue
+				valid_moves.append(move)
+
+		return valid_moves
+
+
+	# compatibility adapter for the GUI: legal moves grouped by from index
+	def get_valid_moves(self, side=None):
+		valid_moves = {}
+		for move in self.generate_moves(side):
+			valid_moves.setdefault(move & 63, []).append(Move(move))
+
+		return valid_moves
+
+
+	# legalizes pseudo-legal moves by making them and testing for check
+	# much slower than generate_moves, kept as a reference to test it against
+	def generate_moves_reference(self, side):
 
 		def is_valid_move(move, side):
 			is_valid = False
@@ -185,242 +483,234 @@ class Board:
 
 			return is_valid
 
-		valid_moves = {}
-		moves = self.generate_pseudo_legal_moves(side)
-
-		for from_index, move_list in moves.items():
-			if not move_list:
-				continue
-
-			valid_move_list = []
-			for move in move_list:
-				if move.special_move == 'castle':
-					# make sure king isn't in check and doesn't end up in check after castling
-					king_in_check = self.in_check(side)
-					king_in_check_after_castling = not is_valid_move(move, side)
+		valid_moves = move_list()
+		king_index = self.king_index[side]
 
-					if not king_in_check and not king_in_check_after_castling:
+		for move in self.generate_pseudo_legal_moves(side):
+			if move >> 12 & 3 == CASTLE:
+				# make sure king isn't in check and doesn't end up in check after castling
+				king_in_check = self.in_check(side)
+				king_in_check_after_castling = not is_valid_move(move, side)
 
-						# king can't castle if path is attacked
-						if move.to_index == 7 or move.to_index == 63:
-							king_index = self.king_index[move.piece.color]
-							king = self.board[king_index]
-							m = Move(king_index, king_index + 1, king)
-							if is_valid_move(m, side):
-								valid_move_list.append(move)
+				if not king_in_check and not king_in_check_after_castling:
 
-						elif move.to_index == 0 or move.to_index == 56:
-							king_index = self.king_index[move.piece.color]
-							king = self.board[king_index]
-							m = Move(king_index, king_index - 1, king)
-							if is_valid_move(m, side):
-								valid_move_list.append(move)
+					# king can't castle if path is attacked
+					to_index = move >> 6 & 63
+					if to_index == 7 or to_index == 63:
+						m = encode_move(king_index, king_index + 1)
+						if is_valid_move(m, side):
+							valid_moves.append(move)
 
-				elif is_valid_move(move, side):
-					valid_move_list.append(move)
+					elif to_index == 0 or to_index == 56:
+						m = encode_move(king_index, king_index - 1)
+						if is_valid_move(m, side):
+							valid_moves.append(move)
 
-			if valid_move_list:
-				valid_moves[from_index] = valid_move_list
+			elif is_valid_move(move, side):
+				valid_moves.append(move)
 
 		return valid_moves
 
 
-	def generate_pseudo_legal_moves(self, side):
-		moves = {}
-
-		for piece in self.pieces[side]:
-			if piece.type == 'p':
-				moves[piece.index] = self.generate_pawn_moves(piece)
-			elif piece.type == 'b':
-				moves[piece.index] = self.generate_sliding_moves(piece, Board.BISHOP_DIRECTIONS)
-			elif piece.type == 'n':
-				moves[piece.index] = self.generate_one_step_moves(piece, Board.KNIGHT_DIRECTIONS)
-			elif piece.type == 'r':
-				moves[piece.index] = self.generate_sliding_moves(piece, Board.ROOK_DIRECTIONS)
-			elif piece.type == 'q':
-				moves[piece.index] = self.generate_sliding_moves(piece, Board.KING_QUEEN_DIRECTIONS)
-			elif piece.type == 'k':
-				normal_moves = self.generate_one_step_moves(piece, Board.KING_QUEEN_DIRECTIONS)
-				castling_moves = self.generate_castling_moves(piece)
-				moves[piece.index] = normal_moves + castling_moves
-
-		return moves
-
-
-	def generate_pawn_moves(self, piece):
-		moves = []
-		row, col = piece.index // 8, piece.index % 8
-		is_white = piece.is_white()
-		is_black = piece.is_black()
+	def find_checks_and_pins(self, side):
+		king_index = self.king_index[side]
+		squares = self.squares
+		color = SIDE_COLORS[side]
+		enemy = color ^ 8
+
+		checkers = []
+		# squares that resolve a single check by capture or block
+		block_squares = set()
+		# pinned piece index -> squares it can move to without leaving the pin
+		pins = {}
+
+		for slider, rays in ((enemy | BISHOP, BISHOP_RAYS), (enemy | ROOK, ROOK_RAYS)):
+			queen = enemy | QUEEN
+			for ray in rays[king_index]:
+				pinned_index = None
+
+				for distance, index in enumerate(ray):
+					piece = squares[index]
+					if not piece:
+						continue
+
+					if piece & 8 == color:
+						# a second piece of our own color shields the king
+						if pinned_index is not None:
+							break
+						pinned_index = index
+						continue
+
+					if piece == slider or piece == queen:
+						if pinned_index is None:
+							checkers.append(index)
+							block_squares.update(ray[:distance + 1])
+						else:
+							pins[pinned_index] = set(ray[:distance + 1])
+					break
 
-		# TODO: implement promotions - pawn can never be on last rank
-		if (is_white and row == 0) or (is_black and row == 7):
-			return moves
+		# knights and pawns can only be checkers, so they aren't looked for out of check
+		if self.in_check(side):
+			knight = enemy | KNIGHT
+			for index in KNIGHT_TARGETS[king_index]:
+				if squares[index] == knight:
+					checkers.append(index)
+					block_squares.add(index)
 
-		# set directions based on pawn perspective
-		north_direction = -1 if is_white else 1
-		east_direction = 1 if is_white else -1
-		west_direction = -1 if is_white else 1
+			# enemy pawns attack the king from the squares the king would attack as a pawn
+			pawn = enemy | PAWN
+			for index in PAWN_ATTACKS[side][king_index]:
+				if squares[index] == pawn:
+					checkers.append(index)
+					block_squares.add(index)
 
-		row_north = row + north_direction
-		row_north_north = row_north + north_direction
-		col_east = col + east_direction
-		col_west = col + west_direction
+		return checkers, block_squares, pins
 
-		last_rank = 0 if is_white else 7
 
-		# check if pawn can move 1 square north
-		north_index = row_north * 8 + col
-		m = Move(piece.index, north_index, piece)
-		if self.in_bounds(m, 0) and self.board[north_index].is_empty():
-			if row_north == last_rank:
-				m.special_move = 'promotion'
-			moves.append(m)
+	# the king blocks a checking slider's ray, so the attack maps don't
+	# show the square behind the king as attacked, but it is once the king steps there
+	def xray_squares(self, checkers, king_index):
+		xray_squares = []
+		king_row, king_col = king_index // 8, king_index % 8
 
-			# check if pawn can move two squares north
-			north_north_index = row_north_north * 8 + col
-			m = Move(piece.index, north_north_index, piece)
-			if self.in_bounds(m, 0) and self.board[north_north_index].is_empty():
-				starting_rank = 6 if is_white else 1
-				if is_white and row == starting_rank:
-					moves.append(m)
-				elif is_black and row == starting_rank:
-					moves.append(m)
-
-		# check if pawn can take northwest
-		northwest_index = row_north * 8 + col_west
-		m = Move(piece.index, northwest_index, piece)
-		if (self.in_bounds(m, west_direction) and
-				piece.diff_colors(self.board[northwest_index])):
-			m.captured_piece = self.board[northwest_index]
-			if row_north == last_rank:
-				m.special_move = 'promotion'
-			moves.append(m)
-
-		# check if pawn can take northeast
-		northeast_index = row_north * 8 + col_east
-		m = Move(piece.index, northeast_index, piece)
-		if (self.in_bounds(m, east_direction) and
-				piece.diff_colors(self.board[northeast_index])):
-			m.captured_piece = self.board[northeast_index]
-			if row_north == last_rank:
-				m.special_move = 'promotion'
-			moves.append(m)
+		for index in checkers:
+			if SLIDER_RAYS[self.squares[index] & 7] is None:
+				continue
 
-		# en passant
-		if moves:
-			prev_move = moves[-1]
-			prev_move_from_row = prev_move.from_index // 8
-			prev_move_to_row = prev_move.to_index // 8
-			prev_move_to_col = prev_move.to_index % 8
-
-			move_two_squares = abs(prev_move_to_row - prev_move_from_row) == 2
-			if (prev_move.piece.type == 'p' and piece.diff_colors(prev_move.piece) and 
-					move_two_squares):
-				to_index = None
-
-				# take northwest
-				if row == prev_move_to_row and col_west == prev_move_to_col:
-					to_index = northwest_index
-				# take northeast
-				elif row == prev_move_to_row and col_east == prev_move_to_col:
-					to_index = northeast_index
-
-				# can take en passant
-				if to_index:
-					captured_piece_index = to_index + 8 if is_white else to_index - 8
-					m = Move(piece.index, to_index, piece, self.board[captured_piece_index], 
-						special_move='en_passant')
-					moves.append(m)
+			row, col = index // 8, index % 8
+			r = king_row + (king_row > row) - (king_row < row)
+			c = king_col + (king_col > col) - (king_col < col)
+			if 0 <= r <= 7 and 0 <= c <= 7:
+				xray_squares.append(r * 8 + c)
 
-		return moves
+		return xray_squares
 
 
-	def generate_one_step_moves(self, piece, directions):
-		moves = []
+	def can_castle_through(self, move, side):
+		# the king can't pass through or land on an attacked square
+		king_index, to_index = move & 63, move >> 6 & 63
+		step = 1 if to_index > king_index else -1
+		self.refresh_attacks()
+		attacked = self.attacked[SIDE_COLORS[side] >> 3 ^ 1]
+		return not attacked & (BITS[king_index + step] | BITS[king_index + 2 * step])
 
-		for row_direction, col_direction in directions:
-			cur_index = piece.index
-			move_index = cur_index + row_direction * 8 + col_direction
-			m = Move(cur_index, move_index, piece)
-			if self.is_pseudo_legal_move(m, col_direction):
-				if not self.board[move_index].is_empty():
-					m.captured_piece = self.board[move_index]
 
-				moves.append(m)
+	def generate_pseudo_legal_moves(self, side):
+		moves = move_list()
+		color = SIDE_COLORS[side]
+		squares = self.squares
+
+		for index in self.piece_lists[color >> 3]:
+			piece_type = squares[index] & 7
+			if piece_type == PAWN:
+				self.generate_pawn_moves(index, color, moves)
+			elif piece_type == BISHOP:
+				self.generate_sliding_moves(index, color, BISHOP_RAYS, moves)
+			elif piece_type == KNIGHT:
+				self.generate_one_step_moves(index, color, KNIGHT_TARGETS, moves)
+			elif piece_type == ROOK:
+				self.generate_sliding_moves(index, color, ROOK_RAYS, moves)
+			elif piece_type == QUEEN:
+				self.generate_sliding_moves(index, color, QUEEN_RAYS, moves)
+			elif piece_type == KING:
+				self.generate_one_step_moves(index, color, KING_TARGETS, moves)
+				self.generate_castling_moves(color, moves)
 
 		return moves
 
 
-	def generate_sliding_moves(self, piece, directions):
-		moves = []
+	# generators append packed moves to the given move list
+	# a plain move is just from_index | to_index << 6
+	def generate_pawn_moves(self, index, color, moves):
+		squares = self.squares
+		row = index // 8
+		is_white = color == WHITE
 
-		for row_direction, col_direction in directions:
-			cur_index = piece.index
-			move_index = cur_index + row_direction * 8 + col_direction
-			m = Move(cur_index, move_index, piece)
+		# pawn can never be on last rank
+		if (is_white and row == 0) or (not is_white and row == 7):
+			return
+
+		north_index = index - 8 if is_white else index + 8
+		last_rank = 0 if is_white else 7
+		promotes = north_index // 8 == last_rank
 
-			while self.is_pseudo_legal_move(m, col_direction):
-				# reset from_index to original index 
-				m.from_index = piece.index
-				moves.append(m)
+		# check if pawn can move 1 square north
+		if not squares[north_index]:
+			if promotes:
+				for promotion in PROMOTIONS:
+					moves.append(encode_move(index, north_index, PROMOTION, promotion))
+			else:
+				moves.append(index | north_index << 6)
 
-				# if capture, then break (blocks ray)
-				if piece.diff_colors(self.board[m.to_index]):
-					m.captured_piece = self.board[m.to_index]
-					break
+			# check if pawn can move two squares north
+			starting_rank = 6 if is_white else 1
+			north_north_index = north_index - 8 if is_white else north_index + 8
+			if row == starting_rank and not squares[north_north_index]:
+				moves.append(index | north_north_index << 6)
+
+		# check if pawn can take northwest or northeast
+		for capture_index in PAWN_ATTACKS[COLOR_SIDES[color]][index]:
+			target = squares[capture_index]
+			if target and target & 8 != color:
+				if promotes:
+					for promotion in PROMOTIONS:
+						moves.append(encode_move(index, capture_index, PROMOTION, promotion))
+				else:
+					moves.append(index | capture_index << 6)
 
-				# increment in respective direction
-				cur_index = move_index
-				move_index += row_direction * 8 + col_direction
-				m = Move(cur_index, move_index, piece)
+		# en passant
+		ep_square = self.ep_square
+		if ep_square is not None and ep_square in PAWN_ATTACKS[COLOR_SIDES[color]][index]:
+			moves.append(encode_move(index, ep_square, EN_PASSANT))
 
 
-		return moves
+	def generate_one_step_moves(self, index, color, targets, moves):
+		squares = self.squares
+		for move_index in targets[index]:
+			target = squares[move_index]
+			if not target or target & 8 != color:
+				moves.append(index | move_index << 6)
 
 
-	def generate_castling_moves(self, piece):
+	def generate_sliding_moves(self, index, color, rays, moves):
+		squares = self.squares
+		for ray in rays[index]:
+			for move_index in ray:
+				target = squares[move_index]
+				if not target:
+					moves.append(index | move_index << 6)
+					continue
 
-		def empty_squares(squares):
-			for piece in squares:
-				if not piece.is_empty():
-					return False
+				# if capture, then break (blocks ray)
+				if target & 8 != color:
+					moves.append(index | move_index << 6)
+				break
 
-			return True
 
-		moves = []
+	def generate_castling_moves(self, color, moves):
+		squares = self.squares
 
-		if piece.is_black():
+		if color == BLACK:
 			# top left black rook
 			if self.castling_rights['b_long']:
-				in_between = self.board[1:4]
-				if empty_squares(in_between):
-					m = Move(4, 0, piece, special_move='castle')
-					moves.append(m)
+				if not (squares[1] or squares[2] or squares[3]):
+					moves.append(encode_move(4, 0, CASTLE))
 
 			# top right black rook
 			if self.castling_rights['b_short']:
-				in_between = self.board[5:7]
-				if empty_squares(in_between):
-					m = Move(4, 7, piece, special_move='castle')
-					moves.append(m)
+				if not (squares[5] or squares[6]):
+					moves.append(encode_move(4, 7, CASTLE))
 
 		else:
 			# bottom left white rook
 			if self.castling_rights['w_long']:
-				in_between = self.board[57:60]
-				if empty_squares(in_between):
-					m = Move(60, 56, piece, special_move='castle')
-					moves.append(m)
+				if not (squares[57] or squares[58] or squares[59]):
+					moves.append(encode_move(60, 56, CASTLE))
 
 			# bottom right white rook
 			if self.castling_rights['w_short']:
-				in_between = self.board[61:63]
-				if empty_squares(in_between):
-					m = Move(60, 63, piece, special_move='castle')
-					moves.append(m)
-
-		return moves
+				if not (squares[61] or squares[62]):
+					moves.append(encode_move(60, 63, CASTLE))
 
 
 #######################
@@ -428,161 +718,283 @@ class Board:
 #######################
 
 
+	# revoked rights are recorded as a bitmask on the rights stack
+	# at the ply of the move, so undoing the move can restore them
 	def update_castling_rights(self, move, undo=False):
+		ply = self.ply - 1
+
 		if undo:
-			if move.updated_castling_rights:
-				for right in move.updated_castling_rights:
-					self.castling_rights[right] = True
-				move.updated_castling_rights = []
+			revoked = self.rights_stack[ply]
+			if revoked:
+				for right in CASTLING_RIGHTS:
+					if revoked & CASTLING_BITS[right]:
+						self.castling_rights[right] = True
+						self.key ^= CASTLING_KEYS[right]
 			return
-			
-		rights = []
-		castling_indices = {0: 'b_long', 7: 'b_short', 56: 'w_long', 63: 'w_short'}
+
+		from_index, to_index = move & 63, move >> 6 & 63
+		revoked = 0
 
 		# revoke castling rights if rook moves
-		if move.from_index in castling_indices:
-			rights.append(castling_indices[move.from_index])
+		if from_index in CASTLING_INDICES:
+			revoked |= CASTLING_BITS[CASTLING_INDICES[from_index]]
 
 		# revoke castling rights if rook gets captured
-		if move.to_index in castling_indices:
-			rights.append(castling_indices[move.to_index])
+		if to_index in CASTLING_INDICES:
+			revoked |= CASTLING_BITS[CASTLING_INDICES[to_index]]
 
 		# revoke castling rights if king moves
-		if move.piece.symbol == 'bk' or move.piece.symbol == 'wk':
-			color = move.piece.color
-			rights.extend([f'{color}_long', f'{color}_short'])
+		piece = self.squares[from_index]
+		if piece & 7 == KING:
+			revoked |= KING_CASTLING_BITS[piece & 8]
 
 		# only set castling rights to False if they were previously True
-		for right in rights:
-			if self.castling_rights[right]:
-				self.castling_rights[right] = False
-				move.updated_castling_rights.append(right)
+		if revoked:
+			for right in CASTLING_RIGHTS:
+				if revoked & CASTLING_BITS[right]:
+					if self.castling_rights[right]:
+						self.castling_rights[right] = False
+						self.key ^= CASTLING_KEYS[right]
+					else:
+						revoked ^= CASTLING_BITS[right]
 
+		self.rights_stack[ply] = revoked
 
-	def update_checks(self):
-		self.checks['w'] = self.in_check('w')
-		self.checks['b'] = self.in_check('b')
 
+	def compute_key(self):
+		key = 0
+		for index, piece in enumerate(self.squares):
+			if piece:
+				key ^= PIECE_KEYS[piece][index]
 
-	def in_check(self, side):
-		king = self.board[self.king_index[side]]
-		king_row, king_col = king.index // 8, king.index % 8
-
-		# straight rays
-		for row_direction, col_direction in Board.ROOK_DIRECTIONS:
-			prev_index = king.index
-			ray_index = king.index + row_direction * 8 + col_direction
-			ray_move = Move(prev_index, ray_index, None)
-
-			while self.in_bounds(ray_move, col_direction):
-				piece = self.board[ray_index]
-
-				# break if the ray runs into a piece
-				# return True if the king is attacked
-				if not piece.is_empty():
-					if piece.diff_colors(king) and piece.type in 'rq':
-						return True
-					break
+		for right, allowed in self.castling_rights.items():
+			if allowed:
+				key ^= CASTLING_KEYS[right]
 
-				# increment
-				prev_index = ray_index
-				ray_index += row_direction * 8 + col_direction
-				ray_move = Move(prev_index, ray_index, None)
-
-		# diagnal rays
-		for row_direction, col_direction in Board.BISHOP_DIRECTIONS:
-			prev_index = king.index
-			ray_index = king.index + row_direction * 8 + col_direction
-			ray_move = Move(prev_index, ray_index, None)
-
-			while self.in_bounds(ray_move, col_direction):
-				piece = self.board[ray_index]
-
-				# break if the ray runs into a piece
-				# return True if the king is attacked
-				if not piece.is_empty():
-					if piece.diff_colors(king) and piece.type in 'bq':
-						return True
-					break
+		key ^= self.en_passant_key()
 
-				# increment
-				prev_index = ray_index
-				ray_index += row_direction * 8 + col_direction
-				ray_move = Move(prev_index, ray_index, None)
+		if self.turn == 'b':
+			key ^= SIDE_KEY
 
-		# pawn
-		if king.color == 'w':
-			east, west = 1, -1
-			northeast = king.index - 7
-			northwest = king.index - 9
-		else:
-			east, west = -1, 1
-			northeast = king.index + 7
-			northwest = king.index + 9
-
-		ne_ray_move = Move(king.index, northeast, None)
-		nw_ray_move = Move(king.index, northwest, None)
-
-		if self.in_bounds(ne_ray_move, east):
-			ne_piece = self.board[northeast]
-			if ne_piece.diff_colors(king) and ne_piece.type == 'p':
-				return True
-
-		if self.in_bounds(nw_ray_move, west):
-			nw_piece = self.board[northwest]
-			if nw_piece.diff_colors(king) and nw_piece.type == 'p':
-				return True
-
-		# knight
-		for row_direction, col_direction in Board.KNIGHT_DIRECTIONS:
-			ray_index = king.index + row_direction * 8 + col_direction
-			ray_move = Move(king.index, ray_index, None)
-
-			if self.in_bounds(ray_move, col_direction):
-				piece = self.board[ray_index]
-				if piece.diff_colors(king) and piece.type == 'n':
-					return True
+		return key
 
-		# enemy king
-		for row_direction, col_direction in Board.KING_QUEEN_DIRECTIONS:
-			ray_index = king.index + row_direction * 8 + col_direction
-			ray_move = Move(king.index, ray_index, None)
 
-			if self.in_bounds(ray_move, col_direction):
-				piece = self.board[ray_index]
-				if piece.diff_colors(king) and piece.type == 'k':
+	def en_passant_key(self):
+		# the en passant file is only part of the key right after a double pawn push
+		if self.ep_square is None:
+			return 0
+
+		return EN_PASSANT_KEYS[self.ep_square % 8]
+
+
+	# whether the current position occurred at least count times before
+	# only positions since the last capture or pawn move can repeat, and only
+	# every other one has the same side to move, so this stops after
+	# halfmove_clock / 2 keys at most
+	def is_repetition(self, count=1):
+		key = self.key
+		key_stack = self.key_stack
+		oldest = max(self.ply - self.halfmove_clock, 0)
+		for ply in range(self.ply - 4, oldest - 1, -2):
+			if key_stack[ply] == key:
+				count -= 1
+				if count == 0:
 					return True
 
 		return False
 
 
+	def is_fifty_move_draw(self):
+		return self.halfmove_clock >= 100
+
+
+	# threefold repetition or the fifty-move rule
+	def is_draw(self):
+		return self.halfmove_clock >= 100 or self.is_repetition(2)
+
+
+	# static evaluation from the side to move's point of view, read off the running totals
+	def evaluate(self):
+		return tapered_score(self.material, self.midgame, self.endgame, self.phase, self.turn)
+
+
+	# checks are read straight from the attack maps
+	@property
+	def checks(self):
+		return {'w': self.in_check('w'), 'b': self.in_check('b')}
+
+
+	def in_check(self, side):
+		return self.is_attacked(self.king_index[side], 'b' if side == 'w' else 'w')
+
+
+	# whether any piece of the side by attacks the square
+	def is_attacked(self, index, by):
+		if self.dirty:
+			self.refresh_attacks()
+		return bool(self.attacked[SIDE_COLORS[by] >> 3] & BITS[index])
+
+
+	# indices of the pieces attacking the square, of both sides unless by is given
+	def attackers_to(self, index, by=None):
+		self.refresh_attacks()
+		bit = BITS[index]
+		attacks = self.attacks
+		colors = (0, 1) if by is None else (SIDE_COLORS[by] >> 3,)
+		return [i for color in colors for i in self.piece_lists[color] if attacks[i] & bit]
+
+
+	# changed is a bitmask of the squares whose contents changed since the last refresh
+	# only the pieces on those squares and the pieces whose attacks reached one
+	# of them (sliders whose rays now stop earlier or run further) are recomputed
+	def refresh_attacks(self):
+		changed = self.dirty
+		if not changed:
+			return
+
+		self.dirty = 0
+		attacks = self.attacks
+		for color in (0, 1):
+			attacked = 0
+			for index in self.piece_lists[color]:
+				mask = attacks[index]
+				if (mask | BITS[index]) & changed:
+					mask = attacks[index] = self.piece_attacks(index)
+				attacked |= mask
+			self.attacked[color] = attacked
+
+
+	def piece_attacks(self, index):
+		squares = self.squares
+		piece = squares[index]
+		piece_type = piece & 7
+
+		if piece_type == PAWN:
+			return PAWN_MASKS[piece >> 3][index]
+		if piece_type == KNIGHT:
+			return KNIGHT_MASKS[index]
+		if piece_type == KING:
+			return KING_MASKS[index]
+
+		mask = 0
+		for ray in SLIDER_RAYS[piece_type][index]:
+			for ray_index in ray:
+				mask |= BITS[ray_index]
+				if squares[ray_index]:
+					break
+
+		return mask
+
+
+	# attack maps built from scratch, to check the incremental ones against
+	def compute_attacked(self):
+		attacked = [0, 0]
+		for color in (0, 1):
+			for index in self.piece_lists[color]:
+				attacked[color] |= self.piece_attacks(index)
+
+		return attacked
+
+
+####################
+# NOTATION METHODS #
+####################
+
+
+	# legal moves of the position are indexed once and reused by
+	# every lookup until a move changes the position (see notation.py)
+	def parse_san(self, san):
+		return notation.parse_san(self, san)
+
+
+	def parse_uci(self, uci):
+		return notation.parse_uci(self, uci)
+
+
+	def to_san(self, move):
+		return notation.to_san(self, move)
+
+
 ##################
 # HELPER METHODS #
 ##################
 
 
-	def set_empty_square(self, index):
-		self.board[index] = Piece('0', '0', index, '00')
+	# the piece list helpers also update the evaluation totals by the
+	# difference the piece makes, so make/undo (castling included) keep
+	# them current without ever looking at the rest of the board
+	def add_piece(self, index):
+		piece = self.squares[index]
+		side = piece >> 3
+		piece_list = self.piece_lists[side]
+		self.piece_slots[index] = len(piece_list)
+		piece_list.append(index)
 
+		self.material[side] += MATERIAL[piece]
+		self.midgame[side] += MIDGAME[piece][index]
+		self.endgame[side] += ENDGAME[piece][index]
+		self.phase[side] += PHASE[piece]
 
-	def in_bounds(self, move, horiz_direction):
-		in_vertical_bounds = (0 <= move.to_index <= 63)
 
-		# check for wrapping
-		from_col = move.from_index % 8
-		to_col = move.to_index % 8
-		in_horizontal_bounds = (to_col == (from_col + horiz_direction))
+	def remove_piece(self, index, piece):
+		# swap the last index of the list into the removed slot
+		side = piece >> 3
+		piece_list = self.piece_lists[side]
+		slot = self.piece_slots[index]
+		last = piece_list.pop()
+		if last != index:
+			piece_list[slot] = last
+			self.piece_slots[last] = slot
 
-		return in_vertical_bounds and in_horizontal_bounds
+		self.material[side] -= MATERIAL[piece]
+		self.midgame[side] -= MIDGAME[piece][index]
+		self.endgame[side] -= ENDGAME[piece][index]
+		self.phase[side] -= PHASE[piece]
 
 
-	def is_pseudo_legal_move(self, move, horiz_direction):
-		if self.in_bounds(move, horiz_direction):
-			from_piece = move.piece
-			to_piece = self.board[move.to_index]
-			return from_piece.diff_colors_or_empty(to_piece)
+	def move_piece(self, from_index, to_index, piece):
+		side = piece >> 3
+		slot = self.piece_slots[from_index]
+		self.piece_lists[side][slot] = to_index
+		self.piece_slots[to_index] = slot
 
-		return False
+		midgame = MIDGAME[piece]
+		endgame = ENDGAME[piece]
+		self.midgame[side] += midgame[to_index] - midgame[from_index]
+		self.endgame[side] += endgame[to_index] - endgame[from_index]
+
+
+	# promotion and its undo, the piece stays in the same list slot
+	def change_piece(self, index, piece, new_piece):
+		side = piece >> 3
+		self.material[side] += MATERIAL[new_piece] - MATERIAL[piece]
+		self.midgame[side] += MIDGAME[new_piece][index] - MIDGAME[piece][index]
+		self.endgame[side] += ENDGAME[new_piece][index] - ENDGAME[piece][index]
+		self.phase[side] += PHASE[new_piece] - PHASE[piece]
+
+
+	# Piece objects are only materialized for the GUI
+	@property
+	def board(self):
+		return [Piece.from_code(code, index) for index, code in enumerate(self.squares)]
+
+
+	@property
+	def captured_pieces(self):
+		captured_pieces = {'w': [], 'b': []}
+		for ply in range(self.ply):
+			captured = self.captured_stack[ply]
+			if captured:
+				piece = Piece.from_code(captured, None)
+				captured_pieces[piece.color].append(piece)
+
+		return captured_pieces
+
+
+	# moves played so far, only used by the GUI
+	@property
+	def moves(self):
+		return [Move(move) for move in self.move_stack[:self.ply]]
 
 
 	def __repr__(self):
@@ -591,7 +1003,7 @@ class Board:
 			s += f'\n\t{row + 1} | '
 			for col in range(8):
 				index = row * 8 + col
-				s += f'{self.board[index].symbol} '
+				s += f'{SYMBOLS[self.squares[index]]} '
 
 		s += '\n\t    a  b  c  d  e  f  g  h\n'
 
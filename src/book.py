@@ -0,0 +1,240 @@
+#########################################
+# opening book
+# a book is a file of 16-byte records in the Polyglot layout
+# (big-endian 64-bit key, 16-bit move, 16-bit weight and a
+# 32-bit learn field), sorted by key
+# it's read through mmap with a binary search on the key, so
+# processes using the same book share its pages through the
+# page cache instead of each loading it into memory
+# keys are this program's zobrist keys (see zobrist.py), not
+# Polyglot's, so books have to be built with this module
+#
+# usage: python book.py build games.pgn.gz book.bin --plies 24
+#        python book.py probe book.bin --fen "<fen>"
+#########################################
+
+import argparse
+import mmap
+import os
+import random
+import struct
+import time
+from collections import defaultdict
+from board import Board
+from fen import START_FEN
+from move import PROMOTION, PROMOTION_TYPES, move_to_uci
+from pgn import read_games, parse_movetext
+import notation
+
+RECORD = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+MAX_WEIGHT = 0xFFFF
+
+# points for the side that played the move, by game result
+RESULT_POINTS = {
+	'1-0': {'w': 2, 'b': 0},
+	'0-1': {'w': 0, 'b': 2},
+	'1/2-1/2': {'w': 1, 'b': 1},
+}
+# unfinished or unknown results count as draws
+DEFAULT_POINTS = {'w': 1, 'b': 1}
+
+
+#########################
+# MOVE ENCODING METHODS #
+#########################
+
+
+# Polyglot moves are to file (bits 0-2), to row (3-5), from file (6-8),
+# from row (9-11) and promotion (12-14, 0 for none, then n, b, r, q)
+# rows count from rank 1, and castling is king takes rook like our moves
+def encode_book_move(move):
+	from_index, to_index = move & 63, move >> 6 & 63
+	book_move = (to_index % 8 | (7 - to_index // 8) << 3 |
+		(from_index % 8) << 6 | (7 - from_index // 8) << 9)
+
+	if move >> 12 & 3 == PROMOTION:
+		book_move |= ((move >> 14) + 1) << 12
+
+	return book_move
+
+
+# (from, to, promotion) as used by the notation index
+def decode_book_move(book_move):
+	to_index = (7 - (book_move >> 3 & 7)) * 8 + (book_move & 7)
+	from_index = (7 - (book_move >> 9 & 7)) * 8 + (book_move >> 6 & 7)
+	promotion = book_move >> 12 & 7
+	return from_index, to_index, PROMOTION_TYPES[promotion - 1] if promotion else None
+
+
+##########################
+# OPENING BOOK (READING) #
+##########################
+
+
+class OpeningBook:
+
+	def __init__(self, path):
+		self.path = path
+		self.file = open(path, 'rb')
+		size = os.fstat(self.file.fileno()).st_size
+
+		# empty files can't be memory-mapped
+		self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+		self.size = size // RECORD.size
+
+
+	# pickled as its path, so a book passed to worker processes is mapped
+	# again in each of them and its pages are shared rather than copied
+	def __reduce__(self):
+		return OpeningBook, (self.path,)
+
+
+	def close(self):
+		if isinstance(self.data, mmap.mmap):
+			self.data.close()
+		self.file.close()
+
+
+	def key_at(self, i):
+		return KEY.unpack_from(self.data, i * RECORD.size)[0]
+
+
+	# (book move, weight) of every record for the key
+	def entries(self, key):
+		# binary search for the first record with the key
+		low, high = 0, self.size
+		while low < high:
+			middle = (low + high) // 2
+			if self.key_at(middle) < key:
+				low = middle + 1
+			else:
+				high = middle
+
+		entries = []
+		for i in range(low, self.size):
+			record_key, book_move, weight, _ = RECORD.unpack_from(self.data, i * RECORD.size)
+			if record_key != key:
+				break
+			entries.append((book_move, weight))
+
+		return entries
+
+
+	# (Move, weight) of the legal book moves of the position
+	# moves that aren't legal (a key collision or a book from another program) are skipped
+	def moves(self, b):
+		coordinates = notation.move_index(b).coordinates
+
+		moves = []
+		for book_move, weight in self.entries(b.key):
+			move = coordinates.get(decode_book_move(book_move))
+			if move is not None and weight:
+				moves.append((move, weight))
+
+		return moves
+
+
+	# a book move picked at random in proportion to its weight, None if the position isn't in the book
+	def choose(self, b, rng=random):
+		moves = self.moves(b)
+		if not moves:
+			return None
+
+		return rng.choices([move for move, _ in moves], [weight for _, weight in moves])[0]
+
+
+	def __len__(self):
+		return self.size
+
+
+	def __repr__(self):
+		return f'OpeningBook({self.path!r}, {self.size} entries)'
+
+
+###########################
+# OPENING BOOK (BUILDING) #
+###########################
+
+
+# replays the first plies of every game and scores each (position, move)
+# by the results of the games it was played in
+# returns the number of games read and the number of records written
+def build_book(pgn_path, book_path, plies=24, min_games=1):
+	weights = defaultdict(int)
+	counts = defaultdict(int)
+	games = 0
+
+	for headers, movetext in read_games(pgn_path):
+		try:
+			b = Board(headers.get('FEN', START_FEN))
+		except ValueError:
+			continue
+
+		games += 1
+		points = RESULT_POINTS.get(headers.get('Result'), DEFAULT_POINTS)
+		for san in parse_movetext(movetext)[:plies]:
+			try:
+				move = b.parse_san(san)
+			except ValueError:
+				break
+
+			entry = (b.key, encode_book_move(move))
+			weights[entry] += points[b.turn]
+			counts[entry] += 1
+			b.make_move(move)
+
+	records = sorted((key, book_move, weight) for (key, book_move), weight in weights.items()
+		if counts[key, book_move] >= min_games and weight > 0)
+
+	# weights only need to keep their proportions, so they're scaled into 16 bits
+	largest = max((weight for *_, weight in records), default=0)
+	scale = MAX_WEIGHT / largest if largest > MAX_WEIGHT else 1
+
+	with open(book_path, 'wb') as f:
+		for key, book_move, weight in records:
+			f.write(RECORD.pack(key, book_move, max(1, int(weight * scale)), 0))
+
+	return games, len(records)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Build or probe an opening book.')
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	build = commands.add_parser('build', help='build a book from a PGN file')
+	build.add_argument('pgn', help='PGN file, optionally gzip-compressed (.gz)')
+	build.add_argument('book', help='book file to write')
+	build.add_argument('--plies', type=int, default=24, help='plies of every game to include (default: 24)')
+	build.add_argument('--min-games', type=int, default=1,
+		help='leave out moves played in fewer games than this (default: 1)')
+
+	probe = commands.add_parser('probe', help='list the book moves of a position')
+	probe.add_argument('book')
+	probe.add_argument('--fen', default=START_FEN)
+	args = parser.parse_args()
+
+	if args.command == 'build':
+		start = time.time()
+		games, records = build_book(args.pgn, args.book, args.plies, args.min_games)
+		print(f'{records} entries from {games} games written to {args.book} in {time.time() - start:.3f}s')
+		return
+
+	try:
+		b = Board(args.fen)
+	except ValueError as e:
+		parser.error(str(e))
+
+	book = OpeningBook(args.book)
+	moves = book.moves(b)
+	total = sum(weight for _, weight in moves)
+	for move, weight in sorted(moves, key=lambda entry: -entry[1]):
+		print(f'{b.to_san(move):8}{move_to_uci(move):8}{weight:6}  {100 * weight / total:5.1f}%')
+
+	if not moves:
+		print('position not in book')
+	book.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,110 @@
+#########################################
+# runs the engine in the background for the GUI
+# the engine searches a copy of the game (passed as a FEN and moves)
+# in a separate process, so the pygame loop keeps running at
+# full frame rate however long it thinks
+# every completed iteration is streamed back over a queue,
+# and a search can be cancelled at any time by killing the process
+#
+# a subprocess is used rather than multiprocessing, since spawned
+# multiprocessing children re-run main.py (and open a second window)
+#########################################
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+
+ENGINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'engine.py')
+
+
+class ComputerPlayer:
+
+	def __init__(self, time_limit=3, hash_mb=16, book=None, tablebase=None):
+		self.time_limit = time_limit
+		self.hash_mb = hash_mb
+		self.book = book
+		self.tablebase = tablebase
+		self.process = None
+		self.queue = None
+		self.thinking = False
+		# set when the engine exits without a best move, until the next start
+		self.error = None
+
+
+	# the game is passed as its starting position and the moves played since,
+	# so the engine knows which positions would be repetitions
+	def start(self, fen, moves=()):
+		self.cancel()
+		self.error = None
+
+		command = [sys.executable, ENGINE_PATH, '--fen', fen, '--time', str(self.time_limit),
+			'--hash', str(self.hash_mb), '--json']
+		if moves:
+			command += ['--moves', *moves]
+		if self.book:
+			command += ['--book', self.book]
+		if self.tablebase:
+			command += ['--tablebase', self.tablebase]
+
+		self.process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+
+		# a fresh queue per search, so output of a cancelled search can't leak into the next one
+		self.queue = queue.Queue()
+		reader = threading.Thread(target=read_output, args=(self.process, self.queue), daemon=True)
+		reader.start()
+		self.thinking = True
+
+
+	# returns the messages received since the last poll without blocking
+	# each message is a dict with move, score, depth, nodes, nps and pv,
+	# and the final one also has bestmove set
+	# thinking is cleared once the search is over, and error is set if it failed
+	def poll(self):
+		messages = []
+		if self.queue is None:
+			return messages
+
+		while True:
+			try:
+				message = self.queue.get_nowait()
+			except queue.Empty:
+				break
+
+			# the reader thread puts None if the process exits without a best move
+			if message is not None:
+				messages.append(message)
+
+			if message is None or message.get('bestmove'):
+				self.thinking = False
+				returncode = self.process.wait()
+				if message is None:
+					self.error = f'engine exited with code {returncode} without a move'
+				self.process = None
+				self.queue = None
+				break
+
+		return messages
+
+
+	def cancel(self):
+		if self.process is not None:
+			self.process.kill()
+			self.process.wait()
+
+		self.process = None
+		self.queue = None
+		self.thinking = False
+
+
+def read_output(process, messages):
+	for line in process.stdout:
+		try:
+			messages.put(json.loads(line))
+		except ValueError:
+			continue
+
+	process.stdout.close()
+	messages.put(None)
@@ -0,0 +1,473 @@
+#########################################
+# search engine
+# negamax alpha-beta search with iterative deepening, a
+# quiescence search on captures and a transposition table
+# moves are ordered by: hash move, captures (MVV-LVA) and
+# promotions, killer moves, then the history heuristic
+# leaves are scored by the board's evaluate() (see evaluation.py)
+# works with both Board and BitBoard
+#
+# usage: python engine.py --time 5
+#        python engine.py --fen "<fen>" --depth 6
+#        python engine.py --moves e2e4 e7e5 g1f3   (moves played from --fen)
+#        python engine.py --book book.bin          (plays a book move if there is one)
+#        python engine.py --tablebase tables       (plays from the endgame tables if they cover the position)
+#        python engine.py --depth 5 --profile      (per-method breakdown of the search)
+#        python engine.py --fen "<fen>" --json   (one JSON object per line, used by the GUI)
+#########################################
+
+import argparse
+import json
+import sys
+import time
+from collections import namedtuple
+from piece import PAWN
+from move import CASTLE, EN_PASSANT, PROMOTION, move_to_uci
+from hashtable import SearchTable, EXACT, LOWER, UPPER
+from fen import START_FEN
+from profiling import board_profiler, run_with_cprofile
+
+MAX_PLY = 128
+INFINITY = 1000000
+MATE = 100000
+# scores beyond this are mates, counted in plies from the root
+MATE_BOUND = MATE - MAX_PLY
+
+# the search checks its time and node limits every this many nodes
+CHECK_INTERVAL = 1024
+
+SearchResult = namedtuple('SearchResult', 'move score depth nodes time nps pv')
+
+
+#################
+# MOVE ORDERING #
+#################
+
+
+HASH_MOVE_SCORE = 1 << 30
+CAPTURE_SCORE = 1 << 24
+KILLER_SCORE = 1 << 22
+# history scores are halved once one reaches this, so they stay below the killers
+HISTORY_LIMIT = 1 << 20
+
+
+# type of the piece a move captures, 0 for quiet moves
+# castling is stored as king takes rook, so it's never a capture
+def captured_type(squares, move):
+	flag = move >> 12 & 3
+	if flag == EN_PASSANT:
+		return PAWN
+	if flag == CASTLE:
+		return 0
+	return squares[move >> 6 & 63] & 7
+
+
+# mate scores are stored relative to the position, not the root
+def score_to_table(score, ply):
+	if score > MATE_BOUND:
+		return score + ply
+	if score < -MATE_BOUND:
+		return score - ply
+	return score
+
+
+def score_from_table(score, ply):
+	if score > MATE_BOUND:
+		return score - ply
+	if score < -MATE_BOUND:
+		return score + ply
+	return score
+
+
+class Engine:
+
+	def __init__(self, hash_mb=16):
+		self.table = SearchTable(hash_mb)
+		self.stopped = False
+		self.nodes = 0
+		self.history = [0] * 4096
+		self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+
+
+	def new_game(self):
+		self.table.clear()
+		self.history = [0] * 4096
+
+
+	# can be called from another thread to end the search early
+	# the result of the last completed iteration is returned
+	def stop(self):
+		self.stopped = True
+
+
+	# iterative deepening up to depth, or until the time (seconds) or node limit is hit
+	# callback is called with the SearchResult of every completed iteration
+	def search(self, b, depth=MAX_PLY, time_limit=None, node_limit=None, callback=None):
+		self.stopped = False
+		self.nodes = 0
+		self.node_limit = node_limit
+		self.start = time.perf_counter()
+		self.deadline = self.start + time_limit if time_limit else None
+		self.killers = [[0, 0] for _ in range(MAX_PLY + 1)]
+
+		moves = b.generate_moves()
+		if not moves:
+			score = -MATE if b.in_check(b.turn) else 0
+			return SearchResult(None, score, 0, 0, 0.0, 0, [])
+
+		entry = self.table.probe(b.key)
+		moves = self.order_moves(b, moves, entry[3] if entry else 0, 0)
+		result = SearchResult(moves[0], 0, 0, 0, 0.0, 0, [moves[0]])
+
+		for d in range(1, min(depth, MAX_PLY) + 1):
+			move, score = self.search_root(b, d, moves)
+			if self.stopped:
+				break
+
+			# search the best move first in the next iteration
+			moves.remove(move)
+			moves.insert(0, move)
+
+			elapsed = time.perf_counter() - self.start
+			nps = round(self.nodes / elapsed) if elapsed else 0
+			result = SearchResult(move, score, d, self.nodes, elapsed, nps, self.principal_variation(b, d))
+			if callback:
+				callback(result)
+
+			# a deeper search won't find a shorter mate
+			if abs(score) > MATE_BOUND:
+				break
+
+			# the next iteration would most likely not finish in time
+			if self.deadline and time.perf_counter() > self.start + time_limit / 2:
+				break
+
+		elapsed = time.perf_counter() - self.start
+		nps = round(self.nodes / elapsed) if elapsed else 0
+		return result._replace(nodes=self.nodes, time=elapsed, nps=nps)
+
+
+##################
+# SEARCH METHODS #
+##################
+
+
+	def search_root(self, b, depth, moves):
+		alpha = -INFINITY
+		best_move = moves[0]
+
+		for move in moves:
+			b.make_move(move)
+			score = -self.negamax(b, depth - 1, -INFINITY, -alpha, 1)
+			b.undo_move()
+
+			if self.stopped:
+				break
+
+			if score > alpha:
+				alpha = score
+				best_move = move
+
+		if not self.stopped:
+			self.table.store(b.key, depth, score_to_table(alpha, 0), EXACT, best_move)
+
+		return best_move, alpha
+
+
+	def negamax(self, b, depth, alpha, beta, ply):
+		if depth <= 0 or ply >= MAX_PLY:
+			return self.quiesce(b, alpha, beta, ply)
+
+		self.nodes += 1
+		if self.nodes % CHECK_INTERVAL == 0:
+			self.check_limits()
+
+		# a position that already occurred in the game or the search is scored as
+		# a draw, since a side that could do better would have done so the first time
+		if b.is_repetition():
+			return 0
+
+		# a checkmate on the hundredth halfmove still wins, as in the GUI
+		if b.halfmove_clock >= 100:
+			return -MATE + ply if not b.generate_moves() and b.in_check(b.turn) else 0
+
+		key = b.key
+		hash_move = 0
+		entry = self.table.probe(key)
+		if entry is not None:
+			entry_depth, entry_score, bound, hash_move = entry
+			if entry_depth >= depth:
+				score = score_from_table(entry_score, ply)
+				if (bound == EXACT or (bound == LOWER and score >= beta) or
+						(bound == UPPER and score <= alpha)):
+					return score
+
+		moves = b.generate_moves()
+		in_check = b.in_check(b.turn)
+		if not moves:
+			return -MATE + ply if in_check else 0
+
+		# check extension
+		if in_check:
+			depth += 1
+
+		original_alpha = alpha
+		best_score = -INFINITY
+		best_move = 0
+		squares = b.squares
+
+		for move in self.order_moves(b, moves, hash_move, ply):
+			b.make_move(move)
+			score = -self.negamax(b, depth - 1, -beta, -alpha, ply + 1)
+			b.undo_move()
+
+			if self.stopped:
+				return 0
+
+			if score > best_score:
+				best_score = score
+				best_move = move
+
+				if score > alpha:
+					alpha = score
+
+					if score >= beta:
+						# remember quiet moves that caused a cutoff
+						if not captured_type(squares, move) and move >> 12 & 3 != PROMOTION:
+							self.update_killers_and_history(move, depth, ply)
+						break
+
+		if best_score >= beta:
+			bound = LOWER
+		elif best_score > original_alpha:
+			bound = EXACT
+		else:
+			bound = UPPER
+		self.table.store(key, depth, score_to_table(best_score, ply), bound, best_move)
+
+		return best_score
+
+
+	# only captures and promotions are searched (every evasion when in check),
+	# so the evaluation isn't taken in the middle of an exchange
+	def quiesce(self, b, alpha, beta, ply):
+		self.nodes += 1
+		if self.nodes % CHECK_INTERVAL == 0:
+			self.check_limits()
+
+		# all moves are generated anyway, so mate and stalemate are scored here as in negamax
+		moves = b.generate_moves()
+		in_check = b.in_check(b.turn)
+		if not moves:
+			return -MATE + ply if in_check else 0
+		if ply >= MAX_PLY:
+			return b.evaluate()
+
+		# in check there's no standing pat, since the quiet evasions may all lose,
+		# so every evasion is searched
+		if in_check:
+			candidates = moves
+		else:
+			# the side to move can usually do at least as well as standing pat
+			stand_pat = b.evaluate()
+			if stand_pat >= beta:
+				return stand_pat
+			if stand_pat > alpha:
+				alpha = stand_pat
+
+			squares = b.squares
+			candidates = [move for move in moves
+				if captured_type(squares, move) or move >> 12 & 3 == PROMOTION]
+
+		for move in self.order_moves(b, candidates, 0, ply):
+			b.make_move(move)
+			score = -self.quiesce(b, -beta, -alpha, ply + 1)
+			b.undo_move()
+
+			if self.stopped:
+				return 0
+
+			if score >= beta:
+				return score
+			if score > alpha:
+				alpha = score
+
+		return alpha
+
+
+	def check_limits(self):
+		if self.node_limit and self.nodes >= self.node_limit:
+			self.stopped = True
+		elif self.deadline and time.perf_counter() >= self.deadline:
+			self.stopped = True
+
+
+##################
+# HELPER METHODS #
+##################
+
+
+	def order_moves(self, b, moves, hash_move, ply):
+		squares = b.squares
+		killers = self.killers[ply]
+		history = self.history
+
+		scored = []
+		for move in moves:
+			if move == hash_move:
+				score = HASH_MOVE_SCORE
+			else:
+				victim = captured_type(squares, move)
+				if victim:
+					# most valuable victim, least valuable attacker
+					score = CAPTURE_SCORE + (victim << 3) - (squares[move & 63] & 7)
+				elif move >> 12 & 3 == PROMOTION:
+					score = CAPTURE_SCORE + (move >> 14)
+				elif move == killers[0]:
+					score = KILLER_SCORE + 1
+				elif move == killers[1]:
+					score = KILLER_SCORE
+				else:
+					score = history[move & 4095]
+			scored.append((score, move))
+
+		scored.sort(reverse=True)
+		return [move for _, move in scored]
+
+
+	def update_killers_and_history(self, move, depth, ply):
+		killers = self.killers[ply]
+		if killers[0] != move:
+			killers[1] = killers[0]
+			killers[0] = move
+
+		# history is indexed by from and to square
+		history = self.history
+		history[move & 4095] += depth * depth
+		if history[move & 4095] >= HISTORY_LIMIT:
+			self.history = [score >> 1 for score in history]
+
+
+	# follows the best moves stored in the transposition table
+	def principal_variation(self, b, depth):
+		pv = []
+		for _ in range(depth):
+			entry = self.table.probe(b.key)
+			if entry is None or entry[3] not in b.generate_moves():
+				break
+
+			pv.append(entry[3])
+			b.make_move(entry[3])
+
+		for _ in pv:
+			b.undo_move()
+
+		return pv
+
+
+def main():
+	from perft import BACKENDS, setup_position
+
+	parser = argparse.ArgumentParser(description='Search a position for the best move.')
+	parser.add_argument('--fen', default=START_FEN)
+	parser.add_argument('--moves', nargs='*', default=[], metavar='UCI',
+		help='moves played from the position, so the search knows the game history for repetitions')
+	parser.add_argument('--depth', type=int, default=MAX_PLY)
+	parser.add_argument('--time', type=float, default=5, help='time limit in seconds (default: 5)')
+	parser.add_argument('--nodes', type=int, help='node limit')
+	parser.add_argument('--hash', type=int, default=16, metavar='MB', help='hash table size in MB (default: 16)')
+	parser.add_argument('--backend', choices=BACKENDS, default='board')
+	parser.add_argument('--book', help='opening book to play from before searching (see book.py)')
+	parser.add_argument('--tablebase', metavar='DIRECTORY',
+		help='endgame tables to play from instead of searching (see tablebase.py)')
+	parser.add_argument('--profile', action='store_true',
+		help='count calls, time and allocations per board method and node')
+	parser.add_argument('--pstats', metavar='FILE', help='run the search under cProfile and dump the stats to FILE')
+	parser.add_argument('--json', action='store_true',
+		help='print every iteration and the best move as a JSON object per line')
+	args = parser.parse_args()
+
+	try:
+		b = setup_position(args.backend, args.fen, args.moves)
+	except ValueError as e:
+		parser.error(str(e))
+
+	def to_dict(result):
+		return {
+			'move': move_to_uci(result.move) if result.move is not None else None,
+			'score': result.score,
+			'depth': result.depth,
+			'nodes': result.nodes,
+			'nps': result.nps,
+			'pv': [move_to_uci(move) for move in result.pv],
+		}
+
+	def report(result):
+		if args.json:
+			# flushed right away so a reading process sees every iteration as it finishes
+			print(json.dumps(to_dict(result)), flush=True)
+		else:
+			print(f'depth {result.depth}  score {result.score}  nodes {result.nodes}  '
+				f'{result.nps} nodes/s  pv {" ".join(move_to_uci(move) for move in result.pv)}')
+
+	# book moves are played without a search
+	if args.book:
+		from book import OpeningBook
+
+		book = OpeningBook(args.book)
+		move = book.choose(b)
+		book.close()
+
+		if move is not None:
+			if args.json:
+				print(json.dumps({'move': move_to_uci(move), 'score': 0, 'depth': 0, 'nodes': 0, 'nps': 0,
+					'pv': [move_to_uci(move)], 'book': True, 'bestmove': True}), flush=True)
+			else:
+				print(f'book move {move_to_uci(move)}')
+			return
+
+	# covered endgames are played perfectly from the tables
+	if args.tablebase:
+		from tablebase import Tablebase
+
+		tablebase = Tablebase(args.tablebase)
+		best = tablebase.best_move(b)
+		tablebase.close()
+
+		if best is not None:
+			move, wdl, plies = best
+			score = 0 if wdl == 0 else wdl * (MATE - plies)
+			if args.json:
+				print(json.dumps({'move': move_to_uci(move), 'score': score, 'depth': 0, 'nodes': 0, 'nps': 0,
+					'pv': [move_to_uci(move)], 'tablebase': True, 'bestmove': True}), flush=True)
+			else:
+				print(f'tablebase move {move_to_uci(move)}  score {score}')
+			return
+
+	engine = Engine(args.hash)
+	profiler = board_profiler(type(b)) if args.profile else None
+
+	def search():
+		return engine.search(b, args.depth, args.time, args.nodes, report)
+
+	try:
+		result = run_with_cprofile(search, args.pstats) if args.pstats else search()
+	finally:
+		if profiler:
+			profiler.restore()
+
+	# the breakdown goes to stderr, so --json output stays machine-readable
+	if profiler:
+		print(profiler.report(result.nodes), file=sys.stderr)
+
+	if args.json:
+		print(json.dumps({**to_dict(result), 'bestmove': True}), flush=True)
+		return
+
+	best_move = move_to_uci(result.move) if result.move is not None else '(none)'
+	print(f'\nbest move {best_move}  score {result.score}  depth {result.depth}  '
+		f'{result.nodes} nodes in {result.time:.3f}s ({result.nps} nodes/s)')
+
+
+if __name__ == '__main__':
+	main()
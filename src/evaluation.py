@@ -0,0 +1,180 @@
+#########################################
+# static evaluation
+# material plus piece-square tables with a midgame and an
+# endgame score for every piece on every square, blended by
+# the game phase (the non-pawn material still on the board)
+# Board keeps running totals of these per color in make/undo,
+# so its evaluate() is O(1), while BitBoard sums them over
+# the squares
+#########################################
+
+from piece import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+
+# kings are left out, both sides always have one
+PIECE_VALUES = [0, 100, 320, 330, 500, 900, 0]
+
+# phase contributed by each piece type, the starting position has MAX_PHASE
+PHASE_WEIGHTS = [0, 0, 1, 1, 2, 4, 0]
+MAX_PHASE = 24
+
+
+#######################
+# PIECE-SQUARE TABLES #
+#######################
+
+
+# piece-square tables from white's point of view, listed a8 to h1
+# to match the board index order (simplified evaluation function)
+# these are the midgame tables, only pawns and kings differ in the endgame
+PAWN_TABLE = [
+	  0,   0,   0,   0,   0,   0,   0,   0,
+	 50,  50,  50,  50,  50,  50,  50,  50,
+	 10,  10,  20,  30,  30,  20,  10,  10,
+	  5,   5,  10,  25,  25,  10,   5,   5,
+	  0,   0,   0,  20,  20,   0,   0,   0,
+	  5,  -5, -10,   0,   0, -10,  -5,   5,
+	  5,  10,  10, -20, -20,  10,  10,   5,
+	  0,   0,   0,   0,   0,   0,   0,   0,
+]
+
+KNIGHT_TABLE = [
+	-50, -40, -30, -30, -30, -30, -40, -50,
+	-40, -20,   0,   0,   0,   0, -20, -40,
+	-30,   0,  10,  15,  15,  10,   0, -30,
+	-30,   5,  15,  20,  20,  15,   5, -30,
+	-30,   0,  15,  20,  20,  15,   0, -30,
+	-30,   5,  10,  15,  15,  10,   5, -30,
+	-40, -20,   0,   5,   5,   0, -20, -40,
+	-50, -40, -30, -30, -30, -30, -40, -50,
+]
+
+BISHOP_TABLE = [
+	-20, -10, -10, -10, -10, -10, -10, -20,
+	-10,   0,   0,   0,   0,   0,   0, -10,
+	-10,   0,   5,  10,  10,   5,   0, -10,
+	-10,   5,   5,  10,  10,   5,   5, -10,
+	-10,   0,  10,  10,  10,  10,   0, -10,
+	-10,  10,  10,  10,  10,  10,  10, -10,
+	-10,   5,   0,   0,   0,   0,   5, -10,
+	-20, -10, -10, -10, -10, -10, -10, -20,
+]
+
+ROOK_TABLE = [
+	  0,   0,   0,   0,   0,   0,   0,   0,
+	  5,  10,  10,  10,  10,  10,  10,   5,
+	 -5,   0,   0,   0,   0,   0,   0,  -5,
+	 -5,   0,   0,   0,   0,   0,   0,  -5,
+	 -5,   0,   0,   0,   0,   0,   0,  -5,
+	 -5,   0,   0,   0,   0,   0,   0,  -5,
+	 -5,   0,   0,   0,   0,   0,   0,  -5,
+	  0,   0,   0,   5,   5,   0,   0,   0,
+]
+
+QUEEN_TABLE = [
+	-20, -10, -10,  -5,  -5, -10, -10, -20,
+	-10,   0,   0,   0,   0,   0,   0, -10,
+	-10,   0,   5,   5,   5,   5,   0, -10,
+	 -5,   0,   5,   5,   5,   5,   0,  -5,
+	  0,   0,   5,   5,   5,   5,   0,  -5,
+	-10,   5,   5,   5,   5,   5,   0, -10,
+	-10,   0,   5,   0,   0,   0,   0, -10,
+	-20, -10, -10,  -5,  -5, -10, -10, -20,
+]
+
+KING_TABLE = [
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-30, -40, -40, -50, -50, -40, -40, -30,
+	-20, -30, -30, -40, -40, -30, -30, -20,
+	-10, -20, -20, -20, -20, -20, -20, -10,
+	 20,  20,   0,   0,   0,   0,  20,  20,
+	 20,  30,  10,   0,   0,  10,  30,  20,
+]
+
+# in the endgame pawns are worth more the closer they are to promotion
+PAWN_ENDGAME_TABLE = [
+	  0,   0,   0,   0,   0,   0,   0,   0,
+	 80,  80,  80,  80,  80,  80,  80,  80,
+	 50,  50,  50,  50,  50,  50,  50,  50,
+	 30,  30,  30,  30,  30,  30,  30,  30,
+	 15,  15,  15,  15,  15,  15,  15,  15,
+	  5,   5,   5,   5,   5,   5,   5,   5,
+	  0,   0,   0,   0,   0,   0,   0,   0,
+	  0,   0,   0,   0,   0,   0,   0,   0,
+]
+
+# and the king belongs in the centre
+KING_ENDGAME_TABLE = [
+	-50, -40, -30, -20, -20, -30, -40, -50,
+	-30, -20, -10,   0,   0, -10, -20, -30,
+	-30, -10,  20,  30,  30,  20, -10, -30,
+	-30, -10,  30,  40,  40,  30, -10, -30,
+	-30, -10,  30,  40,  40,  30, -10, -30,
+	-30, -10,  20,  30,  30,  20, -10, -30,
+	-30, -30,   0,   0,   0,   0, -30, -30,
+	-50, -30, -30, -30, -30, -30, -30, -50,
+]
+
+MIDGAME_TABLES = [None, PAWN_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_TABLE]
+ENDGAME_TABLES = [None, PAWN_ENDGAME_TABLE, KNIGHT_TABLE, BISHOP_TABLE, ROOK_TABLE, QUEEN_TABLE, KING_ENDGAME_TABLE]
+
+
+#####################
+# EVALUATION TABLES #
+#####################
+
+
+# indexed by piece code (then square), each from the point of view of the
+# piece's own color, so black's squares are mirrored vertically
+MATERIAL = [0] * 15
+PHASE = [0] * 15
+MIDGAME = [[0] * 64 for _ in range(15)]
+ENDGAME = [[0] * 64 for _ in range(15)]
+for piece_type in (PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING):
+	for color, flip in ((0, 0), (8, 56)):
+		MATERIAL[color | piece_type] = PIECE_VALUES[piece_type]
+		PHASE[color | piece_type] = PHASE_WEIGHTS[piece_type]
+		for index in range(64):
+			MIDGAME[color | piece_type][index] = MIDGAME_TABLES[piece_type][index ^ flip]
+			ENDGAME[color | piece_type][index] = ENDGAME_TABLES[piece_type][index ^ flip]
+
+# material + midgame score indexed by piece code, then square
+# positive for white, negative for black (used by batch.py)
+SCORES = [[0] * 64 for _ in range(15)]
+for code in range(15):
+	sign = -1 if code & 8 else 1
+	for index in range(64):
+		SCORES[code][index] = sign * (MATERIAL[code] + MIDGAME[code][index])
+
+
+########################
+# EVALUATION FUNCTIONS #
+########################
+
+
+# running totals of a position, each a list indexed by color >> 3
+def compute_totals(squares):
+	material, midgame, endgame, phase = [0, 0], [0, 0], [0, 0], [0, 0]
+	for index, code in enumerate(squares):
+		if code:
+			side = code >> 3
+			material[side] += MATERIAL[code]
+			midgame[side] += MIDGAME[code][index]
+			endgame[side] += ENDGAME[code][index]
+			phase[side] += PHASE[code]
+
+	return material, midgame, endgame, phase
+
+
+# score from the side to move's point of view
+# promotions can push the phase past MAX_PHASE, which still counts as a midgame
+def tapered_score(material, midgame, endgame, phase, turn):
+	us = 0 if turn == 'w' else 1
+	them = us ^ 1
+	phase = min(phase[0] + phase[1], MAX_PHASE)
+
+	material_score = material[us] - material[them]
+	midgame_score = material_score + midgame[us] - midgame[them]
+	endgame_score = material_score + endgame[us] - endgame[them]
+	return (midgame_score * phase + endgame_score * (MAX_PHASE - phase)) // MAX_PHASE
@@ -0,0 +1,109 @@
+#########################################
+# FEN (Forsyth-Edwards Notation) parsing and formatting
+# shared by Board and BitBoard, which each build their own
+# representation from the parsed fields
+# squares are listed rank 8 to rank 1, a-file to h-file,
+# which matches the board index order (0 = a8, 63 = h1)
+#########################################
+
+import re
+from move import index_to_square, square_to_index
+
+START_FEN = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1'
+
+FEN_RIGHTS = {'K': 'w_short', 'Q': 'w_long', 'k': 'b_short', 'q': 'b_long'}
+
+# king and rook home squares each castling right depends on
+CASTLING_SQUARES = {
+	'w_short': ((60, 'wk'), (63, 'wr')),
+	'w_long': ((60, 'wk'), (56, 'wr')),
+	'b_short': ((4, 'bk'), (7, 'br')),
+	'b_long': ((4, 'bk'), (0, 'br')),
+}
+
+# an en passant square is behind a pawn that just moved two squares, so it's on rank 3 or 6
+EN_PASSANT_PATTERN = re.compile(r'-|[a-h][36]')
+CLOCK_PATTERN = re.compile(r'[0-9]+')
+# anything past 100 is a draw anyway, this only keeps the clock well inside
+# the board's 32-bit undo stack however many moves follow
+MAX_HALFMOVE_CLOCK = 0xFFFF
+
+
+def parse_fen(fen):
+	fields = fen.split()
+
+	# the clocks are optional, as in EPD
+	if len(fields) == 4:
+		fields += ['0', '1']
+	if len(fields) != 6:
+		raise ValueError(f'invalid FEN: {fen}')
+
+	placement, turn, castling, en_passant, halfmove, fullmove = fields
+
+	rows = placement.split('/')
+	if len(rows) != 8:
+		raise ValueError(f'invalid FEN piece placement: {placement}')
+
+	symbols = []
+	for row in rows:
+		row_symbols = []
+		for char in row:
+			if char.isdigit():
+				row_symbols.extend(['00'] * int(char))
+			elif char.lower() in 'pnbrqk':
+				row_symbols.append(('w' if char.isupper() else 'b') + char.lower())
+			else:
+				raise ValueError(f'invalid FEN piece: {char}')
+
+		if len(row_symbols) != 8:
+			raise ValueError(f'invalid FEN rank: {row}')
+		symbols.extend(row_symbols)
+
+	for king in ('wk', 'bk'):
+		if symbols.count(king) != 1:
+			raise ValueError(f'FEN must have exactly one {king}: {fen}')
+
+	if turn not in ('w', 'b'):
+		raise ValueError(f'invalid FEN side to move: {turn}')
+
+	# rights are dropped if the king or rook has left its home square
+	castling_rights = {}
+	for char, right in FEN_RIGHTS.items():
+		castling_rights[right] = (char in castling and
+			all(symbols[index] == symbol for index, symbol in CASTLING_SQUARES[right]))
+
+	if not EN_PASSANT_PATTERN.fullmatch(en_passant):
+		raise ValueError(f'invalid FEN en passant square: {en_passant}')
+	ep_square = None if en_passant == '-' else square_to_index(en_passant)
+
+	if not CLOCK_PATTERN.fullmatch(halfmove) or int(halfmove) > MAX_HALFMOVE_CLOCK:
+		raise ValueError(f'invalid FEN halfmove clock: {halfmove}')
+	if not CLOCK_PATTERN.fullmatch(fullmove):
+		raise ValueError(f'invalid FEN fullmove number: {fullmove}')
+
+	return symbols, turn, castling_rights, ep_square, int(halfmove), int(fullmove)
+
+
+def format_fen(symbols, turn, castling_rights, ep_square, halfmove_clock, fullmove_number):
+	rows = []
+	for row in range(8):
+		s = ''
+		empty = 0
+		for symbol in symbols[row * 8:row * 8 + 8]:
+			if symbol == '00':
+				empty += 1
+				continue
+
+			if empty:
+				s += str(empty)
+				empty = 0
+			s += symbol[1].upper() if symbol[0] == 'w' else symbol[1]
+
+		if empty:
+			s += str(empty)
+		rows.append(s)
+
+	castling = ''.join(char for char, right in FEN_RIGHTS.items() if castling_rights[right]) or '-'
+	en_passant = '-' if ep_square is None else index_to_square(ep_square)
+
+	return f'{"/".join(rows)} {turn} {castling} {en_passant} {halfmove_clock} {fullmove_number}'
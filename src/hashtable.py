@@ -0,0 +1,154 @@
+#########################################
+# fixed-size hash tables keyed by zobrist position keys
+# entries live in flat arrays instead of Python objects so the
+# table size is bounded by the memory budget given in MB
+#########################################
+
+from array import array
+
+
+class PerftTable:
+	# each bucket holds two entries: the first is only replaced by a result
+	# of equal or greater depth, the second is always replaced
+	# an entry is a 64-bit key, a 64-bit node count and a 1-byte depth
+	ENTRY_BYTES = 8 + 8 + 1
+	BUCKET_BYTES = 2 * ENTRY_BYTES
+
+
+	def __init__(self, size_mb):
+		buckets = max(1, size_mb * 1024 * 1024 // PerftTable.BUCKET_BYTES)
+
+		# round down to a power of two so indexing is a mask
+		self.buckets = 1 << (buckets.bit_length() - 1)
+		self.mask = self.buckets - 1
+
+		slots = 2 * self.buckets
+		self.keys = array('Q', [0]) * slots
+		self.nodes = array('Q', [0]) * slots
+		self.depths = array('B', [0]) * slots
+
+		self.hits = 0
+		self.misses = 0
+		self.collisions = 0
+		self.stores = 0
+
+
+	def probe(self, key, depth):
+		slot = (key & self.mask) << 1
+		keys = self.keys
+		depths = self.depths
+
+		for i in (slot, slot + 1):
+			if keys[i] == key and depths[i] == depth:
+				self.hits += 1
+				return self.nodes[i]
+
+		self.misses += 1
+
+		# a different position (or depth) occupies the bucket
+		if depths[slot] or depths[slot + 1]:
+			self.collisions += 1
+
+		return None
+
+
+	def store(self, key, depth, nodes):
+		slot = (key & self.mask) << 1
+		self.stores += 1
+
+		# depth-preferred slot, otherwise fall back to the always-replace slot
+		if depth < self.depths[slot]:
+			slot += 1
+
+		self.keys[slot] = key
+		self.nodes[slot] = nodes
+		self.depths[slot] = depth
+
+
+	def counters(self):
+		return (self.hits, self.misses, self.collisions, self.stores)
+
+
+	def usage(self):
+		return 1 - self.depths.count(0) / len(self.depths)
+
+
+	def __repr__(self):
+		probes = self.hits + self.misses
+		hit_rate = self.hits / probes if probes else 0
+		return (f'{self.hits} hits, {self.misses} misses ({hit_rate:.1%} hit rate), '
+			f'{self.collisions} collisions, {self.stores} stores, {self.usage():.1%} full')
+
+
+# bound of a stored search score
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+class SearchTable:
+	# same bucket layout and replacement scheme as PerftTable
+	# an entry is a 64-bit key, a 32-bit score, a 16-bit packed best move,
+	# a 1-byte depth and a 1-byte bound
+	ENTRY_BYTES = 8 + 4 + 2 + 1 + 1
+	BUCKET_BYTES = 2 * ENTRY_BYTES
+
+
+	def __init__(self, size_mb):
+		buckets = max(1, size_mb * 1024 * 1024 // SearchTable.BUCKET_BYTES)
+
+		# round down to a power of two so indexing is a mask
+		self.buckets = 1 << (buckets.bit_length() - 1)
+		self.mask = self.buckets - 1
+		self.clear()
+
+
+	def clear(self):
+		slots = 2 * self.buckets
+		self.keys = array('Q', [0]) * slots
+		self.scores = array('i', [0]) * slots
+		self.moves = array('H', [0]) * slots
+		self.depths = array('B', [0]) * slots
+		self.bounds = array('B', [0]) * slots
+
+		self.hits = 0
+		self.misses = 0
+		self.stores = 0
+
+
+	# (depth, score, bound, best move) of the position, or None
+	def probe(self, key):
+		slot = (key & self.mask) << 1
+		keys = self.keys
+
+		for i in (slot, slot + 1):
+			if keys[i] == key and self.depths[i]:
+				self.hits += 1
+				return self.depths[i], self.scores[i], self.bounds[i], self.moves[i]
+
+		self.misses += 1
+		return None
+
+
+	def store(self, key, depth, score, bound, move):
+		slot = (key & self.mask) << 1
+		self.stores += 1
+
+		# depth-preferred slot, otherwise fall back to the always-replace slot
+		if depth < self.depths[slot] and self.keys[slot] != key:
+			slot += 1
+
+		self.keys[slot] = key
+		self.scores[slot] = score
+		self.moves[slot] = move
+		self.depths[slot] = depth
+		self.bounds[slot] = bound
+
+
+	def usage(self):
+		return 1 - self.depths.count(0) / len(self.depths)
+
+
+	def __repr__(self):
+		probes = self.hits + self.misses
+		hit_rate = self.hits / probes if probes else 0
+		return (f'{self.hits} hits, {self.misses} misses ({hit_rate:.1%} hit rate), '
+			f'{self.stores} stores, {self.usage():.1%} full')
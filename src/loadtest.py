@@ -0,0 +1,138 @@
+#########################################
+# load test for server.py
+# plays thousands of random games against a running server at
+# once, spread over a number of connections; every game holds
+# both seats and asks the server for its legal moves before each
+# move, so the server does all of the chess
+# prints the client-side latencies and the server's own metrics
+#
+# usage: python server.py &
+#        python loadtest.py --games 2000 --connections 50
+#########################################
+
+import argparse
+import asyncio
+import json
+import random
+import time
+from collections import deque
+
+
+class Connection:
+
+	def __init__(self, reader, writer):
+		self.reader = reader
+		self.writer = writer
+		# the server answers the commands of a connection in order, so
+		# every line read belongs to the oldest request still waiting
+		self.pending = deque()
+		self.latencies = []
+
+
+	@classmethod
+	async def open(cls, host, port):
+		reader, writer = await asyncio.open_connection(host, port, limit=1 << 16)
+		connection = cls(reader, writer)
+		asyncio.create_task(connection.read_replies())
+		return connection
+
+
+	async def read_replies(self):
+		while True:
+			line = await self.reader.readline()
+			if not line:
+				break
+
+			future, start = self.pending.popleft()
+			self.latencies.append(time.perf_counter() - start)
+			future.set_result(line.decode().split())
+
+		for future, _ in self.pending:
+			future.set_exception(ConnectionError('server closed the connection'))
+
+
+	# sends a command and returns the tokens of the reply
+	async def request(self, line):
+		future = asyncio.get_running_loop().create_future()
+		self.pending.append((future, time.perf_counter()))
+		self.writer.write(line.encode() + b'\n')
+
+		reply = await future
+		if reply[0] != 'ok':
+			raise RuntimeError(f'{line}: {" ".join(reply)}')
+		return reply[1:]
+
+
+	async def close(self):
+		self.writer.write(b'quit\n')
+		self.writer.close()
+		await self.writer.wait_closed()
+
+
+# plays random moves until the game ends or max_plies is reached, returns (status, plies)
+async def play_game(connection, max_plies, rng):
+	game_id = (await connection.request('new both'))[0]
+
+	status = 'ongoing'
+	plies = 0
+	while status == 'ongoing' and plies < max_plies:
+		moves = (await connection.request(f'moves {game_id}'))[1:]
+		uci = rng.choice(moves)
+		status = (await connection.request(f'move {game_id} {uci}'))[2]
+		plies += 1
+
+	return status, plies
+
+
+async def run(host, port, games, connections, concurrency, max_plies, seed):
+	rng = random.Random(seed)
+	pool = [await Connection.open(host, port) for _ in range(connections)]
+	# games are started as others finish, so at most this many are in progress at once
+	slots = asyncio.Semaphore(concurrency)
+	results = {}
+	total_plies = 0
+
+	async def worker(i):
+		nonlocal total_plies
+		async with slots:
+			status, plies = await play_game(pool[i % connections], max_plies, rng)
+		results[status] = results.get(status, 0) + 1
+		total_plies += plies
+
+	start = time.perf_counter()
+	await asyncio.gather(*(worker(i) for i in range(games)))
+	elapsed = time.perf_counter() - start
+
+	server_metrics = json.loads(' '.join(await pool[0].request('metrics')))
+	for connection in pool:
+		await connection.close()
+
+	latencies = sorted(latency for connection in pool for latency in connection.latencies)
+	percentile = lambda fraction: latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000
+
+	print(f'{games} games ({total_plies} moves) in {elapsed:.3f}s: '
+		f'{games / elapsed:.1f} games/s, {total_plies / elapsed:.1f} moves/s')
+	print('results: ' + ', '.join(f'{status} {count}' for status, count in sorted(results.items())))
+	print(f'round trip: p50 {percentile(0.5):.3f}ms, p99 {percentile(0.99):.3f}ms')
+	print(f'server: {json.dumps(server_metrics)}')
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Play many random games against server.py at once.')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8765)
+	parser.add_argument('--games', type=int, default=2000)
+	parser.add_argument('--connections', type=int, default=50)
+	parser.add_argument('--concurrency', type=int, default=None,
+		help='games in progress at once (default: all of them)')
+	parser.add_argument('--max-plies', type=int, default=200,
+		help='games still going after this many plies are abandoned (default: 200)')
+	parser.add_argument('--seed', type=int, default=None)
+	args = parser.parse_args()
+
+	asyncio.run(run(args.host, args.port, args.games, args.connections,
+		args.concurrency or args.games, args.max_plies, args.seed))
+
+
+if __name__ == '__main__':
+	main()
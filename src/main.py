@@ -1,5 +1,12 @@
+import os
+import sys
 import pygame
 from board import Board
+from bitboard import BitBoard
+from fen import START_FEN
+from piece import SYMBOLS, CODES
+from move import move_to_uci
+from computer import ComputerPlayer
 
 pygame.init()
 
@@ -10,6 +17,14 @@ BOARD_DIM = SQ_DIM * 8
 PADDING = 50
 FONT_SIZE = 20
 
+# screen regions redrawn outside of the board squares
+STATUS_RECT = pygame.Rect(0, 0, SCREEN_WIDTH, PADDING)
+CAPTURED_RECT = pygame.Rect(PADDING + BOARD_DIM + 10, PADDING, SCREEN_WIDTH - PADDING - BOARD_DIM - 10,
+	SCREEN_HEIGHT - PADDING)
+
+# how often (ms) the engine's progress is collected while it thinks
+ENGINE_POLL_MS = 50
+
 LIGHT = '#F5F5F5'
 DARK = '#2E2E38'
 INFO = '#7FD4F5'
@@ -18,19 +33,28 @@ DANGER = '#F06070'
 pygame.display.set_caption('Chess')
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 font = pygame.font.SysFont('comicsansms', FONT_SIZE)
+text_cache = {}
+
+# the window only wakes up for clicks, keys and window events
+pygame.event.set_blocked(pygame.MOUSEMOTION)
+
+# the static board (background, border, labels and squares) is rendered
+# once, and only the parts of the screen that changed are redrawn from it
+def render_board():
+	surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+	surface.fill(LIGHT)
 
-def draw_board():
 	# draw border
 	border = (PADDING, PADDING, BOARD_DIM, BOARD_DIM)
-	pygame.draw.rect(screen, DARK, border, 3)
+	pygame.draw.rect(surface, DARK, border, 3)
 
 	# ranks and files
 	for i in range(1, 9):
 		rank = (18, PADDING + SQ_DIM * (8 - i) + 15)
-		screen.blit(font.render(f'{i}', True, 'black'), rank)
+		surface.blit(render_text(f'{i}'), rank)
 
 		file = (PADDING + SQ_DIM * (i - 1) + 25, PADDING + BOARD_DIM + 5)
-		screen.blit(font.render(f'{chr(i + 96)}', True, 'black'), file)
+		surface.blit(render_text(f'{chr(i + 96)}'), file)
 
 	# checkerboard pattern
 	for row in range(8):
@@ -43,109 +67,238 @@ def draw_board():
 				sq_x += SQ_DIM
 
 			square = (sq_x, sq_y, SQ_DIM, SQ_DIM)
-			pygame.draw.rect(screen, DARK, square)
+			pygame.draw.rect(surface, DARK, square)
+
+	return surface
+
+
+# text surfaces are rendered once per distinct string
+# the engine info changes constantly, so the cache is emptied once it grows large
+def render_text(text):
+	if text not in text_cache:
+		if len(text_cache) > 256:
+			text_cache.clear()
+		text_cache[text] = font.render(text, True, 'black')
+
+	return text_cache[text]
 
 
-def draw_pieces():
-	for piece in b.board:
-		if piece.is_empty():
-			continue
+def square_rect(index):
+	row, col = index // 8, index % 8
+	return pygame.Rect(PADDING + col * SQ_DIM, PADDING + row * SQ_DIM, SQ_DIM, SQ_DIM)
 
-		row, col = piece.index // 8, piece.index % 8
-		p_x = PADDING + col * SQ_DIM
-		p_y = PADDING + row * SQ_DIM
-		screen.blit(piece_images[piece.symbol][0], (p_x, p_y))
 
-		# selected
-		if piece.index == selected or piece.index == selected_other_side:
-			outline = (p_x, p_y, SQ_DIM, SQ_DIM)
-			pygame.draw.rect(screen, INFO, outline, 3)
+# everything drawn on a square: (piece symbol, selected, move target, king in check)
+def square_state(index, targets, checked):
+	code = b.squares[index]
+	if not code:
+		return (None, False, index in targets, False)
 
+	return (SYMBOLS[code], index == selected or index == selected_other_side,
+		index in targets, index in checked)
 
-def draw_moves(from_index, valid_moves):
-	for move in valid_moves.get(from_index, []):
-		row, col = move.to_index // 8, move.to_index % 8
-		sq_x = PADDING + col * SQ_DIM
-		sq_y = PADDING + row * SQ_DIM
-		center = (sq_x + SQ_DIM // 2, sq_y + SQ_DIM // 2)
-		radius = 7
-		pygame.draw.circle(screen, INFO, center, radius)
 
+def draw_square(index, state):
+	symbol, is_selected, is_target, is_checked = state
+	rect = square_rect(index)
+	screen.blit(board_surface, rect, rect)
 
-def draw_captured_pieces():
-	for color in b.captured_pieces:
-		for i, piece in enumerate(sorted(b.captured_pieces[color])):
+	if symbol is not None:
+		screen.blit(piece_images[symbol][0], rect)
+	if is_selected:
+		pygame.draw.rect(screen, INFO, rect, 3)
+	if is_checked:
+		pygame.draw.rect(screen, DANGER, rect, 3)
+	if is_target:
+		pygame.draw.circle(screen, INFO, rect.center, 7)
+
+	return rect
+
+
+def captured_symbols():
+	captured_pieces = b.captured_pieces
+	return tuple(tuple(piece.symbol for piece in sorted(captured_pieces[color])) for color in ('w', 'b'))
+
+
+def draw_captured_pieces(captured):
+	screen.blit(board_surface, CAPTURED_RECT, CAPTURED_RECT)
+
+	for color, symbols in zip(('w', 'b'), captured):
+		for i, symbol in enumerate(symbols):
 			p_x = PADDING + BOARD_DIM + 20
 			p_y = PADDING + 30 * i
 
 			if color == 'b':
 				p_x += 40
 
-			screen.blit(piece_images[piece.symbol][1], (p_x, p_y))
+			screen.blit(piece_images[symbol][1], (p_x, p_y))
 
+	return CAPTURED_RECT
 
-def draw_check():
-	for color in b.checks:
-		if b.checks[color]:
-			king_index = b.king_index[color]
-			row, col = king_index // 8, king_index % 8
-			p_x = PADDING + col * SQ_DIM
-			p_y = PADDING + row * SQ_DIM
-			outline = (p_x, p_y, SQ_DIM, SQ_DIM)
-			pygame.draw.rect(screen, DANGER, outline, 3)
 
+# no moves can be made once the game is drawn by repetition or the fifty-move rule,
+# but a checkmate on the hundredth halfmove still wins
+def playable_moves():
+	moves = b.get_valid_moves(b.turn)
+	if moves and b.is_draw():
+		return {}
 
-b = Board()
+	return moves
+
+
+def status_text():
+	if not valid_moves:
+		if b.is_repetition(2):
+			return 'DRAW BY REPETITION!'
+		elif b.is_fifty_move_draw() and b.get_valid_moves(turn):
+			return 'DRAW BY THE FIFTY-MOVE RULE!'
+		elif turn == 'w' and b.checks['w']:
+			return 'CHECKMATE! BLACK WINS!'
+		elif turn == 'b' and b.checks['b']:
+			return 'CHECKMATE! WHITE WINS!'
+		else:
+			return "STALEMATE! IT'S A DRAW!"
+
+	# the engine isn't restarted after a failure, so the game waits here until a move is taken back
+	if computer.error:
+		return computer.error.upper()
+
+	if engine_info is None:
+		return ''
+
+	# shown from white's point of view
+	score = engine_info['score'] if computer_side == 'w' else -engine_info['score']
+	if abs(score) > 90000:
+		evaluation = 'mate'
+	else:
+		evaluation = f'{score / 100:+.2f}'
+
+	return f'thinking... depth {engine_info["depth"]}  {evaluation}  {engine_info["move"]}'
+
+
+def draw_status(text):
+	screen.blit(board_surface, STATUS_RECT, STATUS_RECT)
+
+	# game end text is centered over the board, engine info is aligned with its left edge
+	if text:
+		position = (180, 15) if not valid_moves else (PADDING, 15)
+		screen.blit(render_text(text), position)
+
+	return STATUS_RECT
+
+
+# compares what should be on screen with what was drawn last time and
+# redraws (and pushes to the display) only the regions that differ
+def render(full=False):
+	global drawn_squares, drawn_status, drawn_captured
+
+	if full:
+		screen.blit(board_surface, (0, 0))
+		drawn_squares = [None] * 64
+		drawn_status = None
+		drawn_captured = None
+
+	targets = {move.to_index for move in valid_moves.get(selected, [])} if selected is not None else set()
+	checked = {b.king_index[color] for color in b.checks if b.checks[color]}
+
+	rects = []
+	for index in range(64):
+		state = square_state(index, targets, checked)
+		if state != drawn_squares[index]:
+			rects.append(draw_square(index, state))
+			drawn_squares[index] = state
+
+	status = status_text()
+	if status != drawn_status:
+		rects.append(draw_status(status))
+		drawn_status = status
+
+	captured = captured_symbols()
+	if captured != drawn_captured:
+		rects.append(draw_captured_pieces(captured))
+		drawn_captured = captured
+
+	if full:
+		pygame.display.flip()
+	elif rects:
+		pygame.display.update(rects)
+
+
+# pass --bitboard to play on the bitboard backend
+# and --fen "<fen>" to start from a position other than the starting position
+fen = sys.argv[sys.argv.index('--fen') + 1] if '--fen' in sys.argv else START_FEN
+b = BitBoard(fen) if '--bitboard' in sys.argv else Board(fen)
+
+# pass --computer to play against the engine, which plays black
+# unless followed by w, --think <seconds> to change its time per move,
+# --book <file> to have it play from an opening book and --tablebase <directory>
+# to have it play covered endgames from the tables
+computer_side = None
+if '--computer' in sys.argv:
+	args = sys.argv[sys.argv.index('--computer') + 1:]
+	computer_side = 'w' if args and args[0] == 'w' else 'b'
+think_time = float(sys.argv[sys.argv.index('--think') + 1]) if '--think' in sys.argv else 3
+book = sys.argv[sys.argv.index('--book') + 1] if '--book' in sys.argv else None
+tablebase = sys.argv[sys.argv.index('--tablebase') + 1] if '--tablebase' in sys.argv else None
+if book and not os.path.isfile(book):
+	sys.exit(f'no opening book at {book}')
+if tablebase and not os.path.isdir(tablebase):
+	sys.exit(f'no tablebase directory at {tablebase}')
+computer = ComputerPlayer(think_time, book=book, tablebase=tablebase)
+# latest iteration streamed back by the engine while it thinks
+engine_info = None
 
 # load piece images
+# every piece is loaded, since a FEN position may be missing some
 piece_images = {}
-for piece in b.board:
-	if piece.is_empty():
-		continue
-
-	path = f'../images/{piece.symbol}.png'
+for symbol in CODES:
+	path = f'../images/{symbol}.png'
 	img = pygame.image.load(path)
 	img_normal = pygame.transform.smoothscale(img, (SQ_DIM, SQ_DIM))
 	img_sm = pygame.transform.smoothscale(img, (30, 30))
 
-	piece_images[piece.symbol] = (img_normal, img_sm)
+	piece_images[symbol] = (img_normal, img_sm)
 
+board_surface = render_board()
+drawn_squares = [None] * 64
+drawn_status = None
+drawn_captured = None
 
-turn = 'w'
-valid_moves = b.get_valid_moves(turn)
 
-timer = pygame.time.Clock()
-fps = 60
+turn = b.turn
+valid_moves = playable_moves()
+
 run = True
 selected = None
 selected_other_side = None
+render(full=True)
 while run:
-	timer.tick(fps)
-	screen.fill(LIGHT)
-
-	draw_board()
-	draw_pieces()
-	draw_captured_pieces()
-	draw_check()
-
-	if not valid_moves:
-		if turn == 'w' and b.checks['w']:
-			game_end_text = 'CHECKMATE! BLACK WINS!'
-		elif turn == 'b' and b.checks['b']:
-			game_end_text = 'CHECKMATE! WHITE WINS!'
-		else:
-			game_end_text = "STALEMATE! IT'S A DRAW!"
-
-		screen.blit(font.render(game_end_text, True, 'black'), (180, 15))
-
-	if selected is not None:
-		draw_moves(selected, valid_moves)
-
-	for event in pygame.event.get():
+	# sleep until something happens, but while the engine thinks
+	# wake up regularly to collect its progress
+	if turn == computer_side and valid_moves and not computer.error:
+		if not computer.thinking:
+			computer.start(fen, [move_to_uci(move) for move in b.moves])
+		events = [pygame.event.wait(ENGINE_POLL_MS)]
+
+		for message in computer.poll():
+			engine_info = message
+			if message.get('bestmove'):
+				b.make_move(b.parse_uci(message['move']))
+				turn = b.turn
+				valid_moves = playable_moves()
+				engine_info = None
+				selected = None
+	else:
+		events = [pygame.event.wait()]
+
+	full_redraw = False
+	for event in events + pygame.event.get():
 		if event.type == pygame.QUIT:
+			computer.cancel()
 			run = False
 
-		elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
+		# the board is locked while the engine thinks
+		elif event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and turn != computer_side:
 			col = (event.pos[0] - PADDING) // SQ_DIM
 			row = (event.pos[1] - PADDING) // SQ_DIM
 
@@ -165,15 +318,17 @@ while run:
 				else:
 					to_index = int(row * 8 + col)
 					is_valid_move = False
+					# promotions are generated queen first, so the first match is taken
 					for move in valid_moves.get(from_index, []):
 						if to_index == move.to_index:
 							is_valid_move = True
 							b.make_move(move)
-							turn = 'w' if turn == 'b' else 'b'
+							turn = b.turn
 							king_index = b.king_index[turn]
 							king = b.board[king_index]
-							valid_moves = b.get_valid_moves(turn)
+							valid_moves = playable_moves()
 							selected = None
+							break
 
 					if not is_valid_move:
 						if from_index == to_index:
@@ -187,15 +342,30 @@ while run:
 						else:
 							selected = None
 
+		# the window contents may have been lost while it was covered or minimized
+		elif event.type in (pygame.WINDOWEXPOSED, pygame.VIDEOEXPOSE):
+			full_redraw = True
+
 		elif event.type == pygame.KEYDOWN:
 			if event.key == pygame.K_LEFT:
 				if b.moves:
+					# cancel the search and take back the player's move, or take back
+					# both the engine's reply and the player's move so it's still the player's turn
+					if computer.thinking:
+						computer.cancel()
+						engine_info = None
+					elif computer_side is not None and turn != computer_side and len(b.moves) >= 2:
+						b.undo_move()
+
 					b.undo_move()
-					turn = 'w' if turn == 'b' else 'b'
-					valid_moves = b.get_valid_moves(turn)
+					turn = b.turn
+					valid_moves = playable_moves()
 					selected = None
 					selected_other_side = None
+					# a failed engine gets another try once the player has moved again
+					computer.error = None
 
-	pygame.display.flip()
+	if run:
+		render(full_redraw)
 
 pygame.quit()
\ No newline at end of file
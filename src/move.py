@@ -1,13 +1,85 @@
+from array import array
 
-class Move:
-	def __init__(self, from_index, to_index, piece, 
-		captured_piece=None, special_move=None):
-		self.from_index = from_index
-		self.to_index = to_index
-		self.piece = piece
-		self.captured_piece = captured_piece 
-		self.special_move = special_move
-		self.updated_castling_rights = []
+# moves are packed into 16-bit integers:
+#	bits 0-5   from index
+#	bits 6-11  to index
+#	bits 12-13 flag
+#	bits 14-15 promotion piece (only meaningful with the promotion flag)
+NORMAL, CASTLE, EN_PASSANT, PROMOTION = 0, 1, 2, 3
+PROMOTION_TYPES = 'nbrq'
+
+SPECIAL_MOVES = [None, 'castle', 'en_passant', 'promotion']
+
+
+def encode_move(from_index, to_index, flag=NORMAL, promotion=0):
+	return from_index | to_index << 6 | flag << 12 | promotion << 14
+
+
+def move_from(move):
+	return move & 63
+
+
+def move_to(move):
+	return move >> 6 & 63
+
+
+def move_flag(move):
+	return move >> 12 & 3
+
+
+def move_promotion(move):
+	return PROMOTION_TYPES[move >> 14]
+
+
+def move_list():
+	return array('H')
+
+
+# a packed move that also exposes the attribute interface of the old
+# Move objects, used by the GUI through get_valid_moves
+# being an int, it can be passed straight to make_move
+class Move(int):
+	__slots__ = ()
+
+	@property
+	def from_index(self):
+		return self & 63
+
+	@property
+	def to_index(self):
+		return self >> 6 & 63
+
+	@property
+	def special_move(self):
+		return SPECIAL_MOVES[self >> 12 & 3]
+
+	@property
+	def promotion(self):
+		if self >> 12 & 3 == PROMOTION:
+			return PROMOTION_TYPES[self >> 14]
+		return None
 
 	def __repr__(self):
 		return f'Move({self.from_index}, {self.to_index})'
+
+
+def index_to_square(index):
+	return f'{chr(index % 8 + 97)}{8 - index // 8}'
+
+
+def square_to_index(square):
+	return (8 - int(square[1])) * 8 + ord(square[0]) - 97
+
+
+# coordinate notation, e.g. e2e4 or e7e8q
+# castling moves are stored as king takes rook, but written as the king's two-square step
+def move_to_uci(move):
+	from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+	if flag == CASTLE:
+		to_index = from_index + 2 if to_index > from_index else from_index - 2
+
+	s = index_to_square(from_index) + index_to_square(to_index)
+	if flag == PROMOTION:
+		s += PROMOTION_TYPES[move >> 14]
+
+	return s
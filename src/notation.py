@@ -0,0 +1,148 @@
+#########################################
+# SAN and UCI move notation
+# conversions go through an index of the legal moves of the
+# position, built once per position (identified by its key)
+# and reused until a different position is looked up:
+#	(from, to, promotion) -> move     for UCI and GUI clicks
+#	(piece type, to) -> moves         for SAN and its disambiguation
+# used through the parse_san, parse_uci and to_san methods of
+# Board and BitBoard
+#########################################
+
+import re
+from piece import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING
+from move import Move, CASTLE, EN_PASSANT, PROMOTION, PROMOTION_TYPES, index_to_square, square_to_index
+
+SAN_PATTERN = re.compile(r'^([NBRQK])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQ]))?$')
+UCI_PATTERN = re.compile(r'^([a-h][1-8])([a-h][1-8])([nbrq])?$')
+
+SAN_PIECES = {'N': KNIGHT, 'B': BISHOP, 'R': ROOK, 'Q': QUEEN, 'K': KING}
+PIECE_LETTERS = {KNIGHT: 'N', BISHOP: 'B', ROOK: 'R', QUEEN: 'Q', KING: 'K'}
+CASTLING_SAN = {'O-O': 'O-O', '0-0': 'O-O', 'O-O-O': 'O-O-O', '0-0-0': 'O-O-O'}
+
+
+class MoveIndex:
+
+	def __init__(self, b):
+		self.key = b.key
+		# (from, to, promotion letter or None) -> move
+		self.coordinates = {}
+		# (piece type, to) -> moves, castling moves are under 'O-O' and 'O-O-O'
+		self.targets = {}
+
+		squares = b.squares
+		for move in b.generate_moves():
+			from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+			move = Move(move)
+
+			# castling can be given as the king's two-square step or as king takes rook
+			if flag == CASTLE:
+				king_to = from_index + 2 if to_index > from_index else from_index - 2
+				self.coordinates[(from_index, king_to, None)] = move
+				self.coordinates[(from_index, to_index, None)] = move
+				self.targets['O-O' if to_index > from_index else 'O-O-O'] = move
+				continue
+
+			promotion = PROMOTION_TYPES[move >> 14] if flag == PROMOTION else None
+			self.coordinates[(from_index, to_index, promotion)] = move
+			self.targets.setdefault((squares[from_index] & 7, to_index), []).append(move)
+
+
+def move_index(b):
+	index = b.move_index
+	if index is None or index.key != b.key:
+		index = b.move_index = MoveIndex(b)
+
+	return index
+
+
+def parse_uci(b, uci):
+	match = UCI_PATTERN.match(uci)
+	if not match:
+		raise ValueError(f'unparseable move: {uci}')
+
+	from_square, to_square, promotion = match.groups()
+	move = move_index(b).coordinates.get((square_to_index(from_square), square_to_index(to_square), promotion))
+	if move is None:
+		raise ValueError(f'illegal move: {uci}')
+
+	return move
+
+
+def parse_san(b, san):
+	index = move_index(b)
+	san = san.rstrip('+#!?')
+
+	if san in CASTLING_SAN:
+		move = index.targets.get(CASTLING_SAN[san])
+		if move is None:
+			raise ValueError(f'illegal move: {san}')
+		return move
+
+	match = SAN_PATTERN.match(san)
+	if not match:
+		raise ValueError(f'unparseable move: {san}')
+
+	piece, file, rank, to_square, promotion = match.groups()
+	piece_type = SAN_PIECES[piece] if piece else PAWN
+	promotion = promotion.lower() if promotion else None
+
+	matches = []
+	for move in index.targets.get((piece_type, square_to_index(to_square)), ()):
+		from_square = index_to_square(move & 63)
+		if (file and from_square[0] != file) or (rank and from_square[1] != rank):
+			continue
+		if move.promotion == promotion:
+			matches.append(move)
+
+	if not matches:
+		raise ValueError(f'illegal move: {san}')
+	if len(matches) > 1:
+		raise ValueError(f'ambiguous move: {san}')
+
+	return matches[0]
+
+
+def to_san(b, move):
+	from_index, to_index, flag = move & 63, move >> 6 & 63, move >> 12 & 3
+	squares = b.squares
+	piece_type = squares[from_index] & 7
+
+	if flag == CASTLE:
+		san = 'O-O' if to_index > from_index else 'O-O-O'
+	else:
+		is_capture = flag == EN_PASSANT or squares[to_index] != 0
+		to_square = index_to_square(to_index)
+
+		if piece_type == PAWN:
+			san = index_to_square(from_index)[0] + 'x' + to_square if is_capture else to_square
+			if flag == PROMOTION:
+				san += '=' + PROMOTION_TYPES[move >> 14].upper()
+		else:
+			san = PIECE_LETTERS[piece_type] + disambiguation(b, move) + ('x' if is_capture else '') + to_square
+
+	# check and mate suffixes
+	b.make_move(move)
+	if b.in_check(b.turn):
+		san += '+' if len(b.generate_moves()) else '#'
+	b.undo_move()
+
+	return san
+
+
+# file, rank or both of the from square, when another piece
+# of the same type can move to the same square
+def disambiguation(b, move):
+	from_index, to_index = move & 63, move >> 6 & 63
+	others = [other & 63 for other in move_index(b).targets.get((b.squares[from_index] & 7, to_index), ())
+		if other & 63 != from_index]
+	if not others:
+		return ''
+
+	from_square = index_to_square(from_index)
+	if all(index_to_square(other)[0] != from_square[0] for other in others):
+		return from_square[0]
+	if all(index_to_square(other)[1] != from_square[1] for other in others):
+		return from_square[1]
+
+	return from_square
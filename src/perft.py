@@ -2,36 +2,253 @@
 # ---- used for testing move generation ----
 # perft function makes moves and unmakes every possible
 # move in a given position and counts the number of possible
-# moves at a given depth 
+# moves at a given depth
 	# depth = 1 --> first move (white
 	# depth = 2 --> second move (black)
 	# depth = 3 --> third move (white)
 	# ...
 # the number of moves is compared to a consensus of perft values
 # among chess programmers
+#
+# usage: python perft.py 5 --workers 8 --moves e2e4 e7e5
+#        python perft.py 4 --fen "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq -"
+#        python perft.py 4 --profile --pstats perft.prof   (per-method breakdown, cProfile dump)
+#        python perft.py 3 --verify   (check move generation against the reference at every node)
+# root moves (or root move + reply pairs with --split 2) are
+# distributed across a process pool and counted separately,
+# so the output doubles as a "divide" for debugging
 #########################################
 
+import argparse
+import os
+import sys
 import time
+from concurrent.futures import ProcessPoolExecutor
 from board import Board
+from bitboard import BitBoard
+from hashtable import PerftTable
+from move import move_to_uci
+from fen import START_FEN
+from profiling import board_profiler, run_with_cprofile
 
-def perft(depth, b, turn='w'):
+BACKENDS = {'board': Board, 'bitboard': BitBoard}
+
+
+def perft(depth, b):
+	if depth == 0:
+		return 1
+
+	valid_moves = b.generate_moves()
+	nodes = 0
+	for move in valid_moves:
+		b.make_move(move)
+		nodes += perft(depth - 1, b)
+		b.undo_move()
+
+	return nodes
+
+
+# same as perft, but the moves of every node are checked against the old make/undo
+# legality filter, on a debug board that also checks its incremental key and evaluation
+def perft_verified(depth, b):
+	if depth == 0:
+		return 1
+
+	valid_moves = b.generate_moves()
+	reference = b.generate_moves_reference(b.turn)
+	if sorted(valid_moves) != sorted(reference):
+		missing = ' '.join(move_to_uci(move) for move in set(reference) - set(valid_moves))
+		extra = ' '.join(move_to_uci(move) for move in set(valid_moves) - set(reference))
+		raise AssertionError(f'move generation differs from the reference in {b.to_fen()} '
+			f'(missing: {missing or "-"}, extra: {extra or "-"})')
+
+	nodes = 0
+	for move in valid_moves:
+		b.make_move(move)
+		nodes += perft_verified(depth - 1, b)
+		b.undo_move()
+
+	return nodes
+
+
+# same as perft, but subtree counts are cached by (position key, depth)
+def perft_hashed(depth, b, table):
 	if depth == 0:
 		return 1
 
-	valid_moves = b.get_valid_moves(turn)
+	nodes = table.probe(b.key, depth)
+	if nodes is not None:
+		return nodes
+
+	valid_moves = b.generate_moves()
 	nodes = 0
-	for move, move_list in valid_moves.items():
-		for move in move_list:
-			b.make_move(move)
-			nodes += perft(depth - 1, b, turn = 'w' if turn == 'b' else 'b')
-			b.undo_move()
+	for move in valid_moves:
+		b.make_move(move)
+		nodes += perft_hashed(depth - 1, b, table)
+		b.undo_move()
 
+	table.store(b.key, depth, nodes)
 	return nodes
 
 
-b = Board()
-depth = 3
-start = time.time()
-nodes = perft(depth, b)
-end = time.time()
-print(f'{nodes} nodes generated at depth {depth} in {end - start}s')
+##################
+# POSITION SETUP #
+##################
+
+
+# positions are passed to workers as a FEN and a list of moves from it,
+# so every worker can rebuild its own board
+def setup_position(backend, fen, moves, debug=False):
+	b = BACKENDS[backend](fen, debug)
+	for uci in moves:
+		b.make_move(b.parse_uci(uci))
+
+	return b
+
+
+##################
+# WORKER METHODS #
+##################
+
+
+# each worker process keeps its own hash table across tasks
+table = None
+
+def init_worker(hash_mb):
+	global table
+	table = PerftTable(hash_mb) if hash_mb else None
+
+
+# returns the node count and the hash table counters accumulated by this task
+def count_nodes(backend, fen, moves, depth, verify=False):
+	if verify:
+		return perft_verified(depth, setup_position(backend, fen, moves, debug=True)), (0, 0, 0, 0)
+
+	b = setup_position(backend, fen, moves)
+	if table is None:
+		return perft(depth, b), (0, 0, 0, 0)
+
+	before = table.counters()
+	nodes = perft_hashed(depth, b, table)
+	return nodes, tuple(after - prev for after, prev in zip(table.counters(), before))
+
+
+def split_tasks(backend, fen, moves, depth, split):
+	b = setup_position(backend, fen, moves)
+
+	# (root move, moves to replay in the worker, remaining depth)
+	tasks = []
+	for move in b.generate_moves():
+		root = move_to_uci(move)
+		if split == 1 or depth < 3:
+			tasks.append((root, moves + [root], depth - 1))
+			continue
+
+		b.make_move(move)
+		replies = b.generate_moves()
+		b.undo_move()
+
+		for reply in replies:
+			tasks.append((root, moves + [root, move_to_uci(reply)], depth - 2))
+
+		# root moves without replies still have to show up in the divide
+		if not replies:
+			tasks.append((root, moves + [root], depth - 1))
+
+	return tasks
+
+
+def run(depth, moves=(), backend='board', workers=1, split=1, hash_mb=0, fen=START_FEN, verify=False):
+	moves = list(moves)
+	tasks = split_tasks(backend, fen, moves, depth, split)
+	divide = {root: 0 for root, _, _ in tasks}
+	counters = [0, 0, 0, 0]
+
+	def collect(root, result):
+		nodes, task_counters = result
+		divide[root] += nodes
+		for i, count in enumerate(task_counters):
+			counters[i] += count
+
+	if workers == 1:
+		init_worker(hash_mb)
+		for root, task_moves, task_depth in tasks:
+			collect(root, count_nodes(backend, fen, task_moves, task_depth, verify))
+	else:
+		with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(hash_mb,)) as pool:
+			futures = [(root, pool.submit(count_nodes, backend, fen, task_moves, task_depth, verify))
+				for root, task_moves, task_depth in tasks]
+			for root, future in futures:
+				collect(root, future.result())
+
+	return divide, counters
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Count leaf nodes of the move generation tree.')
+	parser.add_argument('depth', type=int, nargs='?', default=3)
+	parser.add_argument('--fen', default=START_FEN,
+		help='position to start from (default: the starting position)')
+	parser.add_argument('--moves', nargs='*', default=[],
+		help='moves from the starting position (or --fen) in coordinate notation, e.g. e2e4 e7e5')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(),
+		help='number of worker processes (default: all cores)')
+	parser.add_argument('--split', type=int, choices=(1, 2), default=1,
+		help='distribute root moves (1) or root move + reply pairs (2) for better load balance')
+	parser.add_argument('--backend', choices=BACKENDS, default='board')
+	parser.add_argument('--hash', type=int, default=0, metavar='MB',
+		help='per-worker hash table size in MB (default: off)')
+	parser.add_argument('--profile', action='store_true',
+		help='count calls, time and allocations per board method and node (runs in a single process)')
+	parser.add_argument('--pstats', metavar='FILE',
+		help='run under cProfile and dump the stats to FILE (runs in a single process)')
+	parser.add_argument('--verify', action='store_true',
+		help='check the moves of every node against the reference generator, with debug checks on '
+			'(board backend only, no hash table)')
+	args = parser.parse_args()
+
+	if args.depth < 1:
+		parser.error('depth must be at least 1')
+	if args.verify and (args.backend != 'board' or args.hash):
+		parser.error('--verify needs the board backend and no hash table')
+
+	# instrumentation only sees the calls made in this process
+	workers = 1 if args.profile or args.pstats else args.workers
+	profiler = board_profiler(BACKENDS[args.backend]) if args.profile else None
+
+	def count():
+		return run(args.depth, args.moves, args.backend, workers, args.split, args.hash, args.fen, args.verify)
+
+	start = time.time()
+	try:
+		divide, counters = run_with_cprofile(count, args.pstats) if args.pstats else count()
+	except ValueError as e:
+		parser.error(str(e))
+	except AssertionError as e:
+		sys.exit(f'verification failed: {e}')
+	finally:
+		if profiler:
+			profiler.restore()
+	end = time.time()
+
+	for root in sorted(divide):
+		print(f'{root}: {divide[root]}')
+
+	nodes = sum(divide.values())
+	elapsed = end - start
+	print(f'\n{nodes} nodes generated at depth {args.depth} in {elapsed:.3f}s '
+		f'({nodes / elapsed:.0f} nodes/s)')
+
+	if args.hash:
+		hits, misses, collisions, stores = counters
+		probes = hits + misses
+		hit_rate = hits / probes if probes else 0
+		print(f'hash table: {hits} hits, {misses} misses ({hit_rate:.1%} hit rate), '
+			f'{collisions} collisions, {stores} stores')
+
+	if profiler:
+		print('\n' + profiler.report(nodes))
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,271 @@
+#########################################
+# streaming PGN reader and writer, and game replay validator
+# games are read one at a time from plain (memory-mapped) or
+# gzip-compressed files, so files of any size can be processed
+# every game is replayed move by move from its SAN and games
+# with unparseable or illegal moves are reported
+#
+# usage: python pgn.py games.pgn.gz --workers 8
+#        python pgn.py games.pgn --index games.jsonl
+# with --workers, games are sent to a process pool in chunks
+# and results come back in the order of the file
+#########################################
+
+import argparse
+import gzip
+import json
+import mmap
+import os
+import re
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from fen import START_FEN
+
+TAG_PATTERN = re.compile(r'\[(\w+)\s+"(.*)"\]')
+# comments, variation brackets, NAGs and everything else separated by whitespace
+TOKEN_PATTERN = re.compile(r'\{[^}]*\}|;[^\n]*|\$\d+|[()]|[^\s(){};]+')
+MOVE_NUMBER_PATTERN = re.compile(r'^\d+\.+')
+
+RESULTS = {'1-0', '0-1', '1/2-1/2', '*'}
+# tokens that are neither moves nor skipped by the token pattern
+IGNORED_TOKENS = RESULTS | {'e.p.'}
+
+
+###################
+# READING METHODS #
+###################
+
+
+# yields the decoded lines of a file without reading it whole
+def read_lines(path):
+	if path.endswith('.gz'):
+		with gzip.open(path, 'rb') as f:
+			for line in f:
+				yield line.decode('utf-8', 'replace')
+		return
+
+	with open(path, 'rb') as f:
+		# empty files can't be memory-mapped
+		if os.fstat(f.fileno()).st_size == 0:
+			return
+
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+			for line in iter(mm.readline, b''):
+				yield line.decode('utf-8', 'replace')
+
+
+# whether a {} comment is still open at the end of the line
+# ; starts a comment running to the end of the line, in which braces don't count
+def comment_open(line, in_comment):
+	position = 0
+	while True:
+		if in_comment:
+			end = line.find('}', position)
+			if end < 0:
+				return True
+			in_comment = False
+			position = end + 1
+		else:
+			start = line.find('{', position)
+			semicolon = line.find(';', position)
+			if start < 0 or 0 <= semicolon < start:
+				return False
+			in_comment = True
+			position = start + 1
+
+
+# yields (headers, movetext) for every game in the file
+def read_games(path):
+	headers = {}
+	movetext = []
+	# comments can span lines, and a line of one starting with [ (like [%clk 0:01:00]) isn't a tag
+	in_comment = False
+
+	for line in read_lines(path):
+		line = line.strip()
+		match = None if in_comment else TAG_PATTERN.fullmatch(line)
+
+		if match:
+			# a tag after movetext starts the next game
+			if movetext:
+				yield headers, '\n'.join(movetext)
+				headers, movetext = {}, []
+
+			headers[match.group(1)] = match.group(2)
+
+		# lines starting with % are escaped
+		elif line and (in_comment or not line.startswith('%')):
+			movetext.append(line)
+			in_comment = comment_open(line, in_comment)
+
+	if headers or movetext:
+		yield headers, '\n'.join(movetext)
+
+
+# SAN moves of the main line, without move numbers, comments, variations or the result
+def parse_movetext(movetext):
+	sans = []
+	depth = 0
+
+	for token in TOKEN_PATTERN.findall(movetext):
+		if token == '(':
+			depth += 1
+		elif token == ')':
+			depth -= 1
+		elif depth or token[0] in '{;$' or token in IGNORED_TOKENS:
+			continue
+		else:
+			# move numbers can be attached to the move, as in 1.e4
+			token = MOVE_NUMBER_PATTERN.sub('', token)
+			if token:
+				sans.append(token)
+
+	return sans
+
+
+###################
+# WRITING METHODS #
+###################
+
+
+# PGN text of a game, with the seven tag roster first and the movetext wrapped at 80 columns
+# games starting from another position should have FEN and SetUp headers and pass its turn and move number
+def format_game(headers, sans, turn='w', move_number=1):
+	roster = ('Event', 'Site', 'Date', 'Round', 'White', 'Black', 'Result')
+	tags = [(name, headers.get(name, '?' if name != 'Result' else '*')) for name in roster]
+	tags += [(name, value) for name, value in headers.items() if name not in roster]
+	lines = [f'[{name} "{value}"]' for name, value in tags]
+
+	tokens = []
+	for san in sans:
+		if turn == 'w':
+			tokens.append(f'{move_number}.')
+		elif not tokens:
+			tokens.append(f'{move_number}...')
+
+		tokens.append(san)
+		if turn == 'b':
+			move_number += 1
+		turn = 'b' if turn == 'w' else 'w'
+
+	tokens.append(headers.get('Result', '*'))
+
+	line = ''
+	movetext = []
+	for token in tokens:
+		if line and len(line) + len(token) >= 80:
+			movetext.append(line)
+			line = ''
+		line = f'{line} {token}' if line else token
+	movetext.append(line)
+
+	return '\n'.join(lines) + '\n\n' + '\n'.join(movetext) + '\n'
+
+
+######################
+# VALIDATION METHODS #
+######################
+
+
+# replays a game and returns the number of plies played, the final
+# position and the error that stopped the replay (None if it's legal)
+def replay_game(headers, movetext, backend='board'):
+	from perft import BACKENDS
+
+	try:
+		b = BACKENDS[backend](headers.get('FEN', START_FEN))
+	except ValueError as e:
+		return {'plies': 0, 'error': str(e), 'fen': None}
+
+	plies = 0
+	for san in parse_movetext(movetext):
+		try:
+			move = b.parse_san(san)
+		except ValueError as e:
+			return {'plies': plies, 'error': f'ply {plies + 1}: {e}', 'fen': b.to_fen()}
+
+		b.make_move(move)
+		plies += 1
+
+	return {'plies': plies, 'error': None, 'fen': b.to_fen()}
+
+
+# games are (game number, headers, movetext)
+def validate_chunk(games, backend='board'):
+	return [(number, headers, replay_game(headers, movetext, backend))
+		for number, headers, movetext in games]
+
+
+def chunk_games(path, chunk_size):
+	chunk = []
+	for number, (headers, movetext) in enumerate(read_games(path), 1):
+		chunk.append((number, headers, movetext))
+		if len(chunk) == chunk_size:
+			yield chunk
+			chunk = []
+
+	if chunk:
+		yield chunk
+
+
+# yields (game number, headers, result) in file order
+# at most two chunks per worker are in flight, so memory use
+# doesn't depend on the size of the file
+def validate(path, workers=1, chunk_size=256, backend='board'):
+	if workers == 1:
+		for chunk in chunk_games(path, chunk_size):
+			yield from validate_chunk(chunk, backend)
+		return
+
+	with ProcessPoolExecutor(workers) as pool:
+		pending = deque()
+		for chunk in chunk_games(path, chunk_size):
+			pending.append(pool.submit(validate_chunk, chunk, backend))
+			if len(pending) >= 2 * workers:
+				yield from pending.popleft().result()
+
+		while pending:
+			yield from pending.popleft().result()
+
+
+def main():
+	from perft import BACKENDS
+
+	parser = argparse.ArgumentParser(description='Replay every game of a PGN file and report illegal games.')
+	parser.add_argument('path', help='PGN file, optionally gzip-compressed (.gz)')
+	parser.add_argument('--workers', type=int, default=os.cpu_count(),
+		help='number of worker processes (default: all cores)')
+	parser.add_argument('--chunk', type=int, default=256, help='games per task sent to a worker (default: 256)')
+	parser.add_argument('--backend', choices=BACKENDS, default='board')
+	parser.add_argument('--index', metavar='FILE',
+		help='write a JSON line per game with its headers, plies, final position and error')
+	args = parser.parse_args()
+
+	start = time.time()
+	games = invalid = plies = 0
+	index = open(args.index, 'w') if args.index else None
+
+	try:
+		for number, headers, result in validate(args.path, args.workers, args.chunk, args.backend):
+			games += 1
+			plies += result['plies']
+
+			if result['error']:
+				invalid += 1
+				players = f'{headers.get("White", "?")} - {headers.get("Black", "?")}'
+				print(f'game {number} ({players}): {result["error"]}')
+
+			if index:
+				index.write(json.dumps({'game': number, 'headers': headers, **result}) + '\n')
+	finally:
+		if index:
+			index.close()
+
+	elapsed = time.time() - start
+	rate = games / elapsed if elapsed else 0
+	print(f'\n{games} games ({invalid} invalid), {plies} plies in {elapsed:.3f}s ({rate:.0f} games/s)')
+
+
+if __name__ == '__main__':
+	main()
@@ -1,4 +1,17 @@
 
+# integer piece codes shared by the integer-based board representations
+# code = color | type, 0 is an empty square
+EMPTY = 0
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = 1, 2, 3, 4, 5, 6
+WHITE, BLACK = 0, 8
+
+SYMBOLS = [
+	'00', 'wp', 'wn', 'wb', 'wr', 'wq', 'wk', '00',
+	'00', 'bp', 'bn', 'bb', 'br', 'bq', 'bk',
+]
+CODES = {symbol: code for code, symbol in enumerate(SYMBOLS) if symbol != '00'}
+
+
 class Piece:
 
 	def __init__(self, p_color, p_type, p_index, p_symbol):
@@ -7,6 +20,14 @@ class Piece:
 		self.index = p_index
 		self.symbol = p_symbol
 
+	@classmethod
+	def from_code(cls, code, index):
+		if code == EMPTY:
+			return cls('0', '0', index, '00')
+
+		symbol = SYMBOLS[code]
+		return cls(symbol[0], symbol[1], index, symbol)
+
 	def is_white(self):
 		return self.color == 'w'
 
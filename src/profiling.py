@@ -0,0 +1,146 @@
+#########################################
+# opt-in instrumentation of the board classes
+# the methods of a class are swapped for wrappers that count
+# calls and time them, and object creation of classes like
+# Move and Piece is counted, until restore() puts the original
+# methods back, so nothing is paid when profiling is off
+# times are cumulative, so a method's time includes the time
+# of the methods it calls (make_move includes castle)
+#
+# used by perft.py and engine.py with --profile, which also
+# take --pstats FILE to run under cProfile and dump the stats
+#########################################
+
+import cProfile
+import pstats
+import sys
+import time
+import types
+from move import Move
+from piece import Piece
+
+
+class Profiler:
+
+	def __init__(self):
+		# name -> [calls, nanoseconds]
+		self.stats = {}
+		# class name -> objects created
+		self.allocations = {}
+		# (class, attribute, original value or None if it wasn't in the class dict)
+		self.patches = []
+
+
+	def __enter__(self):
+		return self
+
+
+	def __exit__(self, *exc_info):
+		self.restore()
+
+
+	def patch(self, cls, name, value):
+		self.patches.append((cls, name, cls.__dict__.get(name)))
+		setattr(cls, name, value)
+
+
+	# wraps the methods (and properties) defined by the class, or only the given names
+	def instrument(self, cls, names=None):
+		if names is None:
+			names = [name for name in cls.__dict__ if not name.startswith('__')]
+
+		for name in names:
+			attribute = cls.__dict__[name]
+			label = f'{cls.__name__}.{name}'
+
+			if isinstance(attribute, property):
+				self.patch(cls, name, property(self.wrap(label, attribute.fget), attribute.fset, attribute.fdel))
+			elif isinstance(attribute, types.FunctionType):
+				self.patch(cls, name, self.wrap(label, attribute))
+
+
+	def wrap(self, label, function):
+		entry = self.stats[label] = [0, 0]
+		clock = time.perf_counter_ns
+
+		def wrapper(*args, **kwargs):
+			start = clock()
+			try:
+				return function(*args, **kwargs)
+			finally:
+				entry[0] += 1
+				entry[1] += clock() - start
+
+		return wrapper
+
+
+	def count_allocations(self, cls):
+		self.allocations[cls.__name__] = 0
+		allocations = self.allocations
+		name = cls.__name__
+
+		# Move is an int, so it's created in __new__ rather than __init__
+		if '__init__' in cls.__dict__:
+			original = cls.__init__
+
+			def __init__(instance, *args, **kwargs):
+				allocations[name] += 1
+				original(instance, *args, **kwargs)
+
+			self.patch(cls, '__init__', __init__)
+		else:
+			original = cls.__new__
+
+			def __new__(cls, *args):
+				allocations[name] += 1
+				return original(cls, *args)
+
+			self.patch(cls, '__new__', __new__)
+
+
+	def restore(self):
+		for cls, name, original in reversed(self.patches):
+			if original is None:
+				delattr(cls, name)
+			else:
+				setattr(cls, name, original)
+
+		self.patches = []
+
+
+	# calls per node, total time and time per call of every method that was called,
+	# most expensive first, then the allocations
+	def report(self, nodes):
+		nodes = max(nodes, 1)
+		lines = [f'{"method":<36}{"calls":>12}{"per node":>10}{"total ms":>11}{"us/call":>9}']
+
+		for label, (calls, nanoseconds) in sorted(self.stats.items(), key=lambda item: -item[1][1]):
+			if calls:
+				lines.append(f'{label:<36}{calls:>12}{calls / nodes:>10.2f}{nanoseconds / 1e6:>11.1f}'
+					f'{nanoseconds / calls / 1e3:>9.2f}')
+
+		allocations = ', '.join(f'{name} {count} ({count / nodes:.2f} per node)'
+			for name, count in self.allocations.items())
+		lines.append(f'\nallocations: {allocations}')
+
+		return '\n'.join(lines)
+
+
+# profiler for a board class and the Move and Piece objects it creates
+def board_profiler(board_class):
+	profiler = Profiler()
+	profiler.instrument(board_class)
+	profiler.count_allocations(Move)
+	profiler.count_allocations(Piece)
+	return profiler
+
+
+# runs the function under cProfile, dumps the stats to the path,
+# prints the most expensive functions to stderr and returns the function's result
+def run_with_cprofile(function, path, limit=15):
+	profile = cProfile.Profile()
+	result = profile.runcall(function)
+	profile.dump_stats(path)
+
+	pstats.Stats(path, stream=sys.stderr).sort_stats('tottime').print_stats(limit)
+	return result
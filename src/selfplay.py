@@ -0,0 +1,342 @@
+#########################################
+# self-play match runner
+# plays games between two players on a process pool and writes
+# the results, game lengths, games/s and time per move as JSON,
+# and the games themselves as PGN if asked
+# a player is a function choose(b, moves) returning one of the
+# legal moves of the board, given as a spec:
+#	random                     uniformly random legal moves
+#	engine:depth=3             the engine searching to a depth
+#	engine:time=0.1,hash=16    or for a time (nodes=... also works)
+#	module:function            any other chooser
+# games come in pairs playing the same random opening with the
+# colors swapped, and each worker builds its own players, so the
+# only traffic between processes is the game results
+#
+# usage: python selfplay.py random engine:depth=2 --games 200 --workers 8
+#        python selfplay.py engine:depth=3 engine:depth=2 --opening-plies 8 --output match.json --pgn match.pgn
+#########################################
+
+import argparse
+import importlib
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from board import Board
+from engine import Engine
+from fen import START_FEN
+from move import move_to_uci
+from pgn import format_game
+
+PLAYERS = ('first', 'second')
+RESULT_POINTS = {'1-0': 1, '0-1': 0, '1/2-1/2': 0.5}
+
+# players of the worker process, built once by init_worker
+worker_players = None
+worker_settings = None
+
+
+##################
+# PLAYER METHODS #
+##################
+
+
+def random_player(rng=random):
+	def choose(b, moves):
+		return rng.choice(moves)
+
+	return choose
+
+
+def engine_player(depth=None, time_limit=None, node_limit=None, hash_mb=16):
+	engine = Engine(hash_mb)
+	depth = depth or (2 if time_limit is None and node_limit is None else 64)
+
+	def choose(b, moves):
+		# the search works on the game's own board, so it sees the earlier positions as repetitions
+		return engine.search(b, depth, time_limit, node_limit).move
+
+	choose.new_game = engine.new_game
+	return choose
+
+
+# chooser for a spec, see the top of the file
+def make_player(spec):
+	if spec == 'random':
+		return random_player()
+
+	name, _, options = spec.partition(':')
+	if name == 'engine':
+		settings = dict(option.split('=') for option in options.split(',') if option)
+		return engine_player(
+			int(settings['depth']) if 'depth' in settings else None,
+			float(settings['time']) if 'time' in settings else None,
+			int(settings['nodes']) if 'nodes' in settings else None,
+			int(settings.get('hash', 16)))
+
+	if not options:
+		raise ValueError(f'unknown player: {spec}')
+	return getattr(importlib.import_module(name), options)
+
+
+################
+# GAME METHODS #
+################
+
+
+def init_worker(specs, settings):
+	global worker_players, worker_settings
+	worker_players = {player: make_player(spec) for player, spec in zip(PLAYERS, specs)}
+	worker_settings = settings
+
+
+# game i plays opening i // 2, with the first player white in even games and black in odd ones
+def play_game(game):
+	settings = worker_settings
+	b = Board(settings['fen'])
+	white, black = PLAYERS if game % 2 == 0 else PLAYERS[::-1]
+	sides = {'w': white, 'b': black}
+
+	for choose in worker_players.values():
+		if hasattr(choose, 'new_game'):
+			choose.new_game()
+
+	# random players draw from the random module, seeded per game so that
+	# the games don't depend on the number of workers
+	random.seed(f'{settings["seed"]}:{game}')
+	opening_rng = random.Random(f'{settings["seed"]}:opening:{game // 2}')
+	opening = []
+	sans = []
+	move_times = {player: [] for player in PLAYERS}
+	start = time.perf_counter()
+
+	while True:
+		valid_moves = b.get_valid_moves()
+		moves = [move for piece_moves in valid_moves.values() for move in piece_moves]
+
+		# adjudication, as in the GUI
+		if not moves:
+			if b.checks[b.turn]:
+				result = '0-1' if b.turn == 'w' else '1-0'
+				termination = 'checkmate'
+			else:
+				result, termination = '1/2-1/2', 'stalemate'
+			break
+		if b.is_repetition(2):
+			result, termination = '1/2-1/2', 'repetition'
+			break
+		if b.is_fifty_move_draw():
+			result, termination = '1/2-1/2', 'fifty-move'
+			break
+		if b.ply >= settings['max_plies']:
+			result, termination = '1/2-1/2', 'max plies'
+			break
+
+		if b.ply < settings['opening_plies']:
+			move = opening_rng.choice(moves)
+			opening.append(move_to_uci(move))
+		else:
+			player = sides[b.turn]
+			move_start = time.perf_counter()
+			move = worker_players[player](b, moves)
+			move_times[player].append(time.perf_counter() - move_start)
+
+			if move not in moves:
+				result = '0-1' if b.turn == 'w' else '1-0'
+				termination = f'illegal move by {player}'
+				break
+
+		if settings['pgn']:
+			sans.append(b.to_san(move))
+		b.make_move(move)
+
+	return {
+		'game': game + 1,
+		'white': white,
+		'black': black,
+		'result': result,
+		'termination': termination,
+		'plies': b.ply,
+		'opening': opening,
+		'time': time.perf_counter() - start,
+		'move_times': move_times,
+		'sans': sans,
+	}
+
+
+# yields the game results in game order
+def run_match(specs, games, workers=1, settings=None):
+	settings = {'fen': START_FEN, 'seed': 0, 'opening_plies': 8, 'max_plies': 400, 'pgn': False, **(settings or {})}
+
+	if workers == 1:
+		init_worker(specs, settings)
+		yield from map(play_game, range(games))
+		return
+
+	# large chunks keep the pool's overhead down, small ones keep the workers evenly loaded
+	chunk_size = max(1, games // (workers * 8))
+	with ProcessPoolExecutor(workers, initializer=init_worker, initargs=(specs, settings)) as pool:
+		yield from pool.map(play_game, range(games), chunksize=chunk_size)
+
+
+###################
+# SUMMARY METHODS #
+###################
+
+
+def percentile(values, fraction):
+	return values[min(int(fraction * len(values)), len(values) - 1)] if values else 0
+
+
+def timing_summary(times):
+	times = sorted(times)
+	return {
+		'moves': len(times),
+		'mean_ms': round(1000 * sum(times) / len(times), 3) if times else 0,
+		'p50_ms': round(1000 * percentile(times, 0.5), 3),
+		'p99_ms': round(1000 * percentile(times, 0.99), 3),
+		'max_ms': round(1000 * times[-1], 3) if times else 0,
+	}
+
+
+# elo difference of the first player implied by its score, None when it won or lost every game
+def elo_difference(score):
+	if score <= 0 or score >= 1:
+		return None
+	return round(-400 * math.log10(1 / score - 1), 1)
+
+
+def summarize(specs, results, elapsed, settings):
+	wins = draws = losses = 0
+	for game in results:
+		points = RESULT_POINTS.get(game['result'], 0.5)
+		if game['white'] != 'first':
+			points = 1 - points
+
+		if points == 1:
+			wins += 1
+		elif points == 0:
+			losses += 1
+		else:
+			draws += 1
+
+	score = (wins + draws / 2) / len(results) if results else 0
+	lengths = [game['plies'] for game in results]
+
+	return {
+		'players': dict(zip(PLAYERS, specs)),
+		'settings': settings,
+		'games': len(results),
+		'elapsed': round(elapsed, 3),
+		'games_per_sec': round(len(results) / elapsed, 2) if elapsed else 0,
+		'score': {'first_wins': wins, 'draws': draws, 'second_wins': losses,
+			'first_score': round(score, 4), 'elo': elo_difference(score)},
+		'terminations': dict(Counter(game['termination'] for game in results)),
+		'length': {
+			'mean': round(sum(lengths) / len(lengths), 1) if lengths else 0,
+			'min': min(lengths, default=0),
+			'max': max(lengths, default=0),
+		},
+		'move_time': {player: timing_summary([t for game in results for t in game['move_times'][player]])
+			for player in PLAYERS},
+		'results': [{
+			'game': game['game'],
+			'white': specs[PLAYERS.index(game['white'])],
+			'black': specs[PLAYERS.index(game['black'])],
+			'result': game['result'],
+			'termination': game['termination'],
+			'plies': game['plies'],
+			'opening': game['opening'],
+			'time': round(game['time'], 4),
+			'mean_move_ms': {player: round(1000 * sum(times) / len(times), 3) if times else 0
+				for player, times in game['move_times'].items()},
+		} for game in results],
+	}
+
+
+def game_pgn(specs, game, fen):
+	headers = {
+		'Event': 'Self-play',
+		'Site': '?',
+		'Date': time.strftime('%Y.%m.%d'),
+		'Round': str(game['game']),
+		'White': specs[PLAYERS.index(game['white'])],
+		'Black': specs[PLAYERS.index(game['black'])],
+		'Result': game['result'],
+		'Termination': game['termination'],
+		'PlyCount': str(game['plies']),
+	}
+
+	if fen == START_FEN:
+		return format_game(headers, game['sans'])
+
+	fields = fen.split()
+	headers.update(FEN=fen, SetUp='1')
+	return format_game(headers, game['sans'], fields[1], int(fields[5]) if len(fields) > 5 else 1)
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Play games between two players on a process pool.')
+	parser.add_argument('first', help='first player: random, engine:depth=N, engine:time=S or module:function')
+	parser.add_argument('second', help='second player, in the same form')
+	parser.add_argument('--games', type=int, default=100)
+	parser.add_argument('--workers', type=int, default=os.cpu_count(),
+		help='number of worker processes (default: all cores)')
+	parser.add_argument('--fen', default=START_FEN, help='position every game starts from')
+	parser.add_argument('--opening-plies', type=int, default=8,
+		help='random plies played before the players take over (default: 8)')
+	parser.add_argument('--max-plies', type=int, default=400,
+		help='games still going after this many plies are drawn (default: 400)')
+	parser.add_argument('--seed', type=int, default=0, help='seed of the openings and random players')
+	parser.add_argument('--output', metavar='FILE', help='write the results as JSON (default: stdout)')
+	parser.add_argument('--pgn', metavar='FILE', help='write the games as PGN')
+	args = parser.parse_args()
+
+	specs = (args.first, args.second)
+	try:
+		Board(args.fen)
+		for spec in specs:
+			make_player(spec)
+	except (ValueError, KeyError, ImportError, AttributeError) as e:
+		parser.error(str(e))
+
+	settings = {
+		'fen': args.fen,
+		'seed': args.seed,
+		'opening_plies': args.opening_plies,
+		'max_plies': args.max_plies,
+		'pgn': bool(args.pgn),
+	}
+
+	start = time.time()
+	results = []
+	pgn = open(args.pgn, 'w') if args.pgn else None
+	try:
+		for game in run_match(specs, args.games, args.workers, settings):
+			results.append(game)
+			if pgn:
+				pgn.write(game_pgn(specs, game, args.fen) + '\n')
+	finally:
+		if pgn:
+			pgn.close()
+
+	summary = summarize(specs, results, time.time() - start, {**settings, 'workers': args.workers})
+	output = json.dumps(summary, indent=2)
+
+	if args.output:
+		with open(args.output, 'w') as f:
+			f.write(output + '\n')
+
+		score = summary['score']
+		print(f'{summary["games"]} games in {summary["elapsed"]:.3f}s ({summary["games_per_sec"]} games/s): '
+			f'{args.first} +{score["first_wins"]} ={score["draws"]} -{score["second_wins"]} {args.second}')
+	else:
+		print(output)
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,307 @@
+#########################################
+# multi-game server
+# hosts many human vs human games at once over a line protocol
+# on a TCP socket, keeping one Board per game the way main.py
+# keeps one for its window
+# the legal moves of every game are generated once per move and
+# cached, so validating a move is a dictionary lookup
+# generation that turns out slow for a game is moved off the event
+# loop onto a thread pool, so other games keep being served
+#
+# protocol (one command per line, replies start with ok or error):
+#	new [w|b|both] [fen <fen>]   ok <id> <seats> <fen>
+#	join <id>                    ok <id> <color> <fen>   (opponent gets: joined <id>)
+#	moves <id>                   ok <id> <uci> ...
+#	move <id> <uci>              ok <id> <uci> <status>  (opponent gets: moved <id> <uci> <status>)
+#	fen <id>                     ok <id> <fen>
+#	metrics                      ok <json>
+#	quit
+# status is ongoing, checkmate, stalemate, repetition or fifty-move
+#
+# usage: python server.py --port 8765
+#        python loadtest.py --games 2000   (simulated games against it)
+#########################################
+
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from board import Board
+from fen import START_FEN
+from move import move_to_uci
+
+# move generation slower than this (seconds) is done on the thread pool for that game from then on
+OFFLOAD_THRESHOLD = 0.002
+# validation latencies kept for the percentiles
+LATENCY_SAMPLES = 10000
+# moves/s is measured over this many seconds
+RATE_WINDOW = 10
+
+
+class GameSession:
+
+	def __init__(self, game_id, fen=START_FEN):
+		self.id = game_id
+		self.b = Board(fen)
+		# color -> writer of the connection holding the seat
+		self.seats = {'w': None, 'b': None}
+		self.lock = asyncio.Lock()
+		self.slow = False
+		self.refresh()
+
+
+	# caches the legal moves of the position by UCI string and works out the game status
+	def refresh(self):
+		start = time.perf_counter()
+		valid_moves = self.b.get_valid_moves()
+		self.legal_moves = {move_to_uci(move): move for moves in valid_moves.values() for move in moves}
+
+		if not self.legal_moves:
+			self.status = 'checkmate' if self.b.in_check(self.b.turn) else 'stalemate'
+		elif self.b.is_repetition(2):
+			self.status = 'repetition'
+		elif self.b.is_fifty_move_draw():
+			self.status = 'fifty-move'
+		else:
+			self.status = 'ongoing'
+
+		self.slow = time.perf_counter() - start > OFFLOAD_THRESHOLD
+
+
+	def opponents(self, writer):
+		return {seat for seat in self.seats.values() if seat is not None and seat is not writer}
+
+
+class GameServer:
+
+	def __init__(self, workers=4):
+		self.games = {}
+		self.ids = itertools.count(1)
+		self.executor = ThreadPoolExecutor(workers)
+
+		self.started = time.time()
+		self.connections = 0
+		self.games_started = 0
+		self.games_finished = 0
+		self.moves = 0
+		self.move_times = deque()
+		self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+
+	async def handle_connection(self, reader, writer):
+		self.connections += 1
+		try:
+			while True:
+				line = await reader.readline()
+				if not line:
+					break
+
+				reply = await self.handle(line.decode().split(), writer)
+				if reply is None:
+					break
+
+				writer.write(reply.encode() + b'\n')
+				# only wait on the socket when the client isn't keeping up
+				if writer.transport.get_write_buffer_size() > 1 << 16:
+					await writer.drain()
+		except ConnectionError:
+			pass
+		finally:
+			self.connections -= 1
+			self.leave_all(writer)
+			writer.close()
+
+
+	# returns the reply line, or None to close the connection
+	async def handle(self, tokens, writer):
+		if not tokens:
+			return 'error empty command'
+
+		command, args = tokens[0], tokens[1:]
+		if command == 'quit':
+			return None
+		if command == 'metrics':
+			return 'ok ' + json.dumps(self.metrics())
+		if command == 'new':
+			return self.new_game(args, writer)
+
+		if not args:
+			return f'error {command} needs a game id'
+		session = self.games.get(args[0])
+		if session is None:
+			return f'error no game {args[0]}'
+
+		if command == 'move' and len(args) == 2:
+			return await self.move(session, args[1], writer)
+
+		# the board and its cached moves are only read while no move is being made,
+		# which may be generating the next moves on the thread pool
+		async with session.lock:
+			if command == 'join':
+				return self.join(session, writer)
+			if command == 'moves':
+				return f'ok {session.id} ' + ' '.join(session.legal_moves)
+			if command == 'fen':
+				return f'ok {session.id} {session.b.to_fen()}'
+
+		return f'error unknown command: {" ".join(tokens)}'
+
+
+	def new_game(self, args, writer):
+		seats = 'w'
+		if args and args[0] in ('w', 'b', 'both'):
+			seats = args[0]
+			args = args[1:]
+
+		fen = START_FEN
+		if args:
+			if args[0] != 'fen':
+				return 'error usage: new [w|b|both] [fen <fen>]'
+			fen = ' '.join(args[1:])
+
+		try:
+			session = GameSession(str(next(self.ids)), fen)
+		except ValueError as e:
+			return f'error {e}'
+
+		for color in ('w', 'b') if seats == 'both' else (seats,):
+			session.seats[color] = writer
+
+		self.games[session.id] = session
+		self.games_started += 1
+		return f'ok {session.id} {seats} {session.b.to_fen()}'
+
+
+	def join(self, session, writer):
+		for color, seat in session.seats.items():
+			if seat is None:
+				session.seats[color] = writer
+				self.notify(session, writer, f'joined {session.id}')
+				return f'ok {session.id} {color} {session.b.to_fen()}'
+
+		return f'error game {session.id} is full'
+
+
+	async def move(self, session, uci, writer):
+		start = time.perf_counter()
+
+		# moves of a game are handled one at a time, even while its generation is on the thread pool
+		async with session.lock:
+			if session.status != 'ongoing':
+				return f'error game {session.id} is over ({session.status})'
+			if session.seats[session.b.turn] is not writer:
+				return f'error not your move in game {session.id}'
+
+			move = session.legal_moves.get(uci)
+			if move is None:
+				return f'error illegal move {uci}'
+
+			session.b.make_move(move)
+			if session.slow:
+				await asyncio.get_running_loop().run_in_executor(self.executor, session.refresh)
+			else:
+				session.refresh()
+
+			status = session.status
+			result = f'{session.id} {uci} {status}'
+
+		now = time.perf_counter()
+		self.latencies.append(now - start)
+		self.moves += 1
+		self.move_times.append(now)
+
+		self.notify(session, writer, f'moved {result}')
+
+		if status != 'ongoing':
+			self.finish(session)
+
+		return f'ok {result}'
+
+
+	def notify(self, session, writer, line):
+		for opponent in session.opponents(writer):
+			opponent.write(line.encode() + b'\n')
+
+
+	# the players may have left while the last move was being made, which already dropped the game
+	def finish(self, session):
+		if self.games.pop(session.id, None) is not None:
+			self.games_finished += 1
+
+
+	# a disconnected player gives up their seats, and games nobody is left in are dropped
+	def leave_all(self, writer):
+		for session in list(self.games.values()):
+			for color, seat in session.seats.items():
+				if seat is writer:
+					session.seats[color] = None
+
+			if not any(session.seats.values()):
+				del self.games[session.id]
+
+
+	def metrics(self):
+		now = time.perf_counter()
+		while self.move_times and self.move_times[0] < now - RATE_WINDOW:
+			self.move_times.popleft()
+
+		latencies = sorted(self.latencies)
+
+		def percentile(fraction):
+			if not latencies:
+				return 0
+			return round(latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000, 3)
+
+		uptime = time.time() - self.started
+		return {
+			'connections': self.connections,
+			'games_active': len(self.games),
+			'games_started': self.games_started,
+			'games_finished': self.games_finished,
+			'moves': self.moves,
+			'moves_per_sec': round(len(self.move_times) / min(RATE_WINDOW, uptime or 1), 1),
+			'validation_p50_ms': percentile(0.5),
+			'validation_p99_ms': percentile(0.99),
+			'uptime': round(uptime, 1),
+		}
+
+
+	async def log_metrics(self, interval):
+		while True:
+			await asyncio.sleep(interval)
+			print(json.dumps(self.metrics()), flush=True)
+
+
+async def serve(host, port, workers, metrics_interval):
+	game_server = GameServer(workers)
+	server = await asyncio.start_server(game_server.handle_connection, host, port, limit=1 << 16)
+	print(f'serving on {host}:{port}', flush=True)
+
+	if metrics_interval:
+		asyncio.create_task(game_server.log_metrics(metrics_interval))
+
+	async with server:
+		await server.serve_forever()
+
+
+def main():
+	parser = argparse.ArgumentParser(description='Host many games at once over a line protocol.')
+	parser.add_argument('--host', default='127.0.0.1')
+	parser.add_argument('--port', type=int, default=8765)
+	parser.add_argument('--workers', type=int, default=4,
+		help='threads for games whose move generation is slow (default: 4)')
+	parser.add_argument('--metrics-interval', type=float, default=10, metavar='SECONDS',
+		help='print metrics as JSON this often, 0 to turn off (default: 10)')
+	args = parser.parse_args()
+
+	try:
+		asyncio.run(serve(args.host, args.port, args.workers, args.metrics_interval))
+	except KeyboardInterrupt:
+		pass
+
+
+if __name__ == '__main__':
+	main()
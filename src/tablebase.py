@@ -0,0 +1,454 @@
+#########################################
+# endgame tablebases
+# king + piece vs king endgames (KQK, KRK and KPK) are solved
+# by retrograde analysis: every legal placement is enumerated,
+# its moves are generated with Board, and results are worked
+# backwards from the checkmates, giving win/draw/loss and the
+# distance to mate in plies with best play
+# KBK and KNK are always draws and need no table
+#
+# a table stores one byte per position, indexed by side to move
+# and the squares of the stronger side's king, its piece and the
+# other king, after a symmetry of the board has moved the stronger
+# king into a1-d1-d4 (a-d files with a pawn)
+# tables are read through mmap, so a probe is an index computation
+# and a byte read, and processes probing the same tables share
+# them through the page cache
+#
+# usage: python tablebase.py generate KQK KRK KPK --directory tables
+#        python tablebase.py probe --fen "8/8/8/4k3/8/8/8/4K2Q w - - 0 1"
+#########################################
+
+import argparse
+import itertools
+import mmap
+import os
+import time
+from board import Board, KING_MASKS, BITS
+from fen import FEN_RIGHTS, format_fen
+from piece import PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING, SYMBOLS
+
+# value bytes, from the side to move's point of view:
+#	0          draw
+#	1 to 127   wins, mates in that many plies
+#	128 + n    loses, is mated in n plies (128 is checkmate)
+#	255        not a legal position
+DRAW = 0
+LOSS = 128
+ILLEGAL = 255
+
+SIGNATURES = {'KQK': QUEEN, 'KRK': ROOK, 'KPK': PAWN}
+# endgames that can't be won
+DRAWN_TYPES = (KNIGHT, BISHOP)
+
+NO_CASTLING = {right: False for right in FEN_RIGHTS.values()}
+
+
+#####################
+# POSITION INDEXING #
+#####################
+
+
+def transform(index, flip_file, flip_rank, swap):
+	row, col = divmod(index, 8)
+	if flip_file:
+		col = 7 - col
+	if flip_rank:
+		row = 7 - row
+	if swap:
+		row, col = col, row
+	return row * 8 + col
+
+
+# the 8 symmetries of the board, as square -> square tables
+SYMMETRIES = [[transform(index, *flags) for index in range(64)]
+	for flags in itertools.product((False, True), repeat=3)]
+# with pawns, only mirroring the files keeps the rules the same
+PAWN_SYMMETRIES = SYMMETRIES[:1] + [SYMMETRIES[4]]
+
+
+def canonical_squares(in_region, symmetries):
+	# regions the stronger king is moved into, listed a8 to h1
+	squares = [index for index in range(64) if in_region(index // 8, index % 8)]
+	slots = {square: slot for slot, square in enumerate(squares)}
+
+	# for every king square, the first symmetry that moves it into the region
+	king_symmetries = [next(symmetry for symmetry in symmetries if symmetry[index] in slots)
+		for index in range(64)]
+
+	return squares, slots, king_symmetries
+
+
+# a1-d1-d4 triangle (row 7 is the first rank)
+KING_SQUARES, KING_SLOTS, KING_SYMMETRIES = canonical_squares(
+	lambda row, col: col <= 3 and 7 - row <= col, SYMMETRIES)
+PAWN_KING_SQUARES, PAWN_KING_SLOTS, PAWN_KING_SYMMETRIES = canonical_squares(
+	lambda row, col: col <= 3, PAWN_SYMMETRIES)
+
+
+def table_size(piece_type):
+	squares = PAWN_KING_SQUARES if piece_type == PAWN else KING_SQUARES
+	return 2 * len(squares) * 64 * 64
+
+
+# side is 0 with the stronger side to move, 1 otherwise
+# squares are from the stronger side's point of view, as if it were white
+def position_index(piece_type, side, strong_king, piece, weak_king):
+	if piece_type == PAWN:
+		slots, symmetry = PAWN_KING_SLOTS, PAWN_KING_SYMMETRIES[strong_king]
+	else:
+		slots, symmetry = KING_SLOTS, KING_SYMMETRIES[strong_king]
+
+	return ((side * len(slots) + slots[symmetry[strong_king]]) * 64 + symmetry[piece]) * 64 + symmetry[weak_king]
+
+
+def index_position(piece_type, index):
+	squares = PAWN_KING_SQUARES if piece_type == PAWN else KING_SQUARES
+	index, weak_king = divmod(index, 64)
+	index, piece = divmod(index, 64)
+	side, slot = divmod(index, len(squares))
+	return side, squares[slot], piece, weak_king
+
+
+# value of a position for the side to move as (1 win / 0 draw / -1 loss, plies to mate)
+def decode_value(value):
+	if value == DRAW:
+		return 0, 0
+	if value < LOSS:
+		return 1, value
+	return -1, value - LOSS
+
+
+####################
+# TABLE GENERATION #
+####################
+
+
+# board for a position of the table, None if it isn't legal
+def position_board(piece_type, side, strong_king, piece, weak_king):
+	if len({strong_king, piece, weak_king}) < 3 or KING_MASKS[strong_king] & BITS[weak_king]:
+		return None
+	if piece_type == PAWN and piece // 8 in (0, 7):
+		return None
+
+	symbols = ['00'] * 64
+	symbols[strong_king] = 'wk'
+	symbols[piece] = SYMBOLS[piece_type]
+	symbols[weak_king] = 'bk'
+	b = Board(format_fen(symbols, 'wb'[side], NO_CASTLING, None, 0, 1))
+
+	# the side that just moved can't be in check
+	if b.in_check('wb'[side ^ 1]):
+		return None
+
+	return b
+
+
+# plays every move of every legal position and records the positions they lead to
+# moves that leave the table (captures and promotions) are looked up right away
+def generate_moves(piece_type, tables):
+	size = table_size(piece_type)
+	children = [None] * size
+	exits = [None] * size
+	in_check = bytearray(size)
+
+	for index in range(size):
+		side, strong_king, piece, weak_king = index_position(piece_type, index)
+		b = position_board(piece_type, side, strong_king, piece, weak_king)
+		if b is None:
+			continue
+
+		children[index] = []
+		exits[index] = []
+		in_check[index] = b.in_check(b.turn)
+
+		for move in b.generate_moves():
+			b.make_move(move)
+			strong_pieces = b.piece_lists[0]
+
+			# the piece was captured
+			if len(strong_pieces) == 1:
+				exits[index].append(DRAW)
+			else:
+				piece_index = strong_pieces[0] if strong_pieces[1] == b.king_index['w'] else strong_pieces[1]
+				child_type = b.squares[piece_index] & 7
+
+				if child_type == piece_type:
+					children[index].append(position_index(piece_type, side ^ 1, b.king_index['w'],
+						piece_index, b.king_index['b']))
+				# promotion
+				elif child_type in DRAWN_TYPES:
+					exits[index].append(DRAW)
+				else:
+					exits[index].append(tables[child_type][position_index(child_type, side ^ 1,
+						b.king_index['w'], piece_index, b.king_index['b'])])
+
+			b.undo_move()
+
+	return children, exits, in_check
+
+
+# retrograde analysis: positions are resolved in order of their distance
+# to mate, so the first time a position is reached is with its shortest win,
+# and a losing position is resolved once all of its moves lead to wins
+# for the opponent, at the distance of the longest of them
+def solve(children, exits, in_check):
+	size = len(children)
+	values = bytearray([ILLEGAL]) * size
+	resolved = bytearray(size)
+	remaining = [0] * size
+	parents = [[] for _ in range(size)]
+
+	# events per distance: (index, True) resolves a win, (index, False) is
+	# one of its moves leading to a win for the opponent (a loss once there are
+	# no others) and (index, None) is a resolved loss to pass on to its parents
+	events = [[] for _ in range(LOSS)]
+	for index in range(size):
+		if children[index] is None:
+			continue
+
+		values[index] = DRAW
+		remaining[index] = len(children[index]) + len(exits[index])
+		for child in children[index]:
+			parents[child].append(index)
+
+		if remaining[index] == 0:
+			resolved[index] = True
+			# checkmates are the first lost positions
+			if in_check[index]:
+				values[index] = LOSS
+				events[0].append((index, None))
+			continue
+
+		for value in exits[index]:
+			if value == DRAW:
+				continue
+			wdl, plies = decode_value(value)
+			if wdl < 0:
+				events[plies + 1].append((index, True))
+			else:
+				events[plies].append((index, False))
+
+	for plies in range(LOSS - 1):
+		i = 0
+		level = events[plies]
+		while i < len(level):
+			index, event = level[i]
+			i += 1
+
+			if event is None:
+				# lost at this distance, every parent wins one ply later
+				for parent in parents[index]:
+					if not resolved[parent]:
+						events[plies + 1].append((parent, True))
+				continue
+
+			if resolved[index]:
+				continue
+
+			if event:
+				resolved[index] = True
+				values[index] = plies
+				# won at this distance, parents have one fewer move that doesn't lose
+				for parent in parents[index]:
+					if not resolved[parent]:
+						level.append((parent, False))
+			else:
+				remaining[index] -= 1
+				if remaining[index] == 0:
+					resolved[index] = True
+					values[index] = LOSS + plies + 1
+					events[plies + 1].append((index, None))
+
+	return values
+
+
+def table_path(directory, signature):
+	return os.path.join(directory, f'{signature}.tb')
+
+
+# generates the table for a signature and the ones it promotes into,
+# tables already in the directory are reused
+def generate(signature, directory, tables=None, verbose=False):
+	if tables is None:
+		tables = {}
+
+	piece_type = SIGNATURES[signature]
+	if piece_type in tables:
+		return tables[piece_type]
+
+	path = table_path(directory, signature)
+	if os.path.exists(path):
+		with open(path, 'rb') as f:
+			tables[piece_type] = f.read()
+		return tables[piece_type]
+
+	# pawns promote into queens and rooks
+	if piece_type == PAWN:
+		for promoted in ('KQK', 'KRK'):
+			generate(promoted, directory, tables, verbose)
+
+	start = time.time()
+	values = solve(*generate_moves(piece_type, tables))
+
+	os.makedirs(directory, exist_ok=True)
+	with open(path, 'wb') as f:
+		f.write(values)
+
+	if verbose:
+		legal = sum(value != ILLEGAL for value in values)
+		wins = sum(value != ILLEGAL and 0 < value < LOSS for value in values)
+		longest = max(value for value in values if value != ILLEGAL and 0 < value < LOSS)
+		print(f'{signature}: {legal} positions, {wins} won, longest mate {longest} plies '
+			f'({time.time() - start:.1f}s) -> {path}')
+
+	tables[piece_type] = values
+	return values
+
+
+#################
+# TABLE PROBING #
+#################
+
+
+class Tablebase:
+
+	def __init__(self, directory='tables'):
+		self.directory = directory
+		self.files = {}
+		self.tables = {}
+
+
+	# pickled as its directory, so worker processes map the tables again
+	# and share their pages rather than copying them
+	def __reduce__(self):
+		return Tablebase, (self.directory,)
+
+
+	def close(self):
+		for table in self.tables.values():
+			if table is not None:
+				table.close()
+		for f in self.files.values():
+			f.close()
+
+		self.files = {}
+		self.tables = {}
+
+
+	# tables are mapped the first time they're needed, None if there's no file
+	def table(self, piece_type):
+		if piece_type not in self.tables:
+			signature = 'K' + SYMBOLS[piece_type][1].upper() + 'K'
+			path = table_path(self.directory, signature)
+
+			if os.path.exists(path):
+				self.files[piece_type] = open(path, 'rb')
+				self.tables[piece_type] = mmap.mmap(self.files[piece_type].fileno(), 0, access=mmap.ACCESS_READ)
+			else:
+				self.tables[piece_type] = None
+
+		return self.tables[piece_type]
+
+
+	# (1 win / 0 draw / -1 loss, plies to mate) for the side to move,
+	# None if the position isn't covered by a table
+	# works with both Board and BitBoard
+	def probe(self, b):
+		pieces = [(index, code) for index, code in enumerate(b.squares) if code & 7 != KING and code]
+		if len(pieces) > 1:
+			return None
+		if not pieces:
+			return 0, 0
+
+		piece, code = pieces[0]
+		piece_type = code & 7
+		if piece_type in DRAWN_TYPES:
+			return 0, 0
+
+		table = self.table(piece_type)
+		if table is None:
+			return None
+
+		# tables are stored with white as the stronger side, so with black
+		# as the stronger side the board is mirrored vertically
+		strong, weak = ('w', 'b') if code < 8 else ('b', 'w')
+		flip = 0 if strong == 'w' else 56
+		side = 0 if b.turn == strong else 1
+		index = position_index(piece_type, side, b.king_index[strong] ^ flip, piece ^ flip, b.king_index[weak] ^ flip)
+
+		value = table[index]
+		if value == ILLEGAL:
+			return None
+		return decode_value(value)
+
+
+	# (move, wdl, plies) of the move with the best result: the fastest win,
+	# a draw, or the slowest loss, None if the position isn't covered
+	def best_move(self, b):
+		if self.probe(b) is None:
+			return None
+
+		best = None
+		best_rank = None
+		for move in b.generate_moves():
+			b.make_move(move)
+			result = self.probe(b)
+			b.undo_move()
+
+			if result is None:
+				continue
+
+			# the child's result is from the opponent's point of view
+			wdl, plies = -result[0], result[1] + 1
+			rank = (wdl, -plies if wdl > 0 else plies)
+			if best_rank is None or rank > best_rank:
+				best = (move, wdl, plies if wdl else 0)
+				best_rank = rank
+
+		return best
+
+
+def main():
+	from move import move_to_uci
+
+	parser = argparse.ArgumentParser(description='Generate or probe endgame tablebases.')
+	commands = parser.add_subparsers(dest='command', required=True)
+
+	generate_parser = commands.add_parser('generate', help='solve endgames and write their tables')
+	generate_parser.add_argument('signatures', nargs='+', choices=SIGNATURES)
+	generate_parser.add_argument('--directory', default='tables')
+
+	probe_parser = commands.add_parser('probe', help='look up a position and its best move')
+	probe_parser.add_argument('--fen', required=True)
+	probe_parser.add_argument('--directory', default='tables')
+	args = parser.parse_args()
+
+	if args.command == 'generate':
+		tables = {}
+		for signature in args.signatures:
+			generate(signature, args.directory, tables, verbose=True)
+		return
+
+	try:
+		b = Board(args.fen)
+	except ValueError as e:
+		parser.error(str(e))
+
+	tablebase = Tablebase(args.directory)
+	result = tablebase.probe(b)
+	if result is None:
+		print('position not covered by the tables')
+		return
+
+	wdl, plies = result
+	print(['loss', 'draw', 'win'][wdl + 1] + (f' (mate in {plies} plies)' if wdl else ''))
+
+	best = tablebase.best_move(b)
+	if best is not None:
+		print(f'best move {move_to_uci(best[0])}')
+	tablebase.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,274 @@
+#########################################
+# UCI (Universal Chess Interface) front-end
+# lets tournament managers and analysis GUIs run the engine
+# the main thread reads commands while searches run on a
+# worker thread, so stop, isready and quit are answered within
+# milliseconds even in the middle of a search
+#
+# supported: uci, isready, ucinewgame, setoption, position
+# (startpos / fen, moves), go (wtime, btime, winc, binc,
+# movestogo, movetime, depth, nodes, infinite), stop, quit
+#
+# usage: python uci.py   (then point the GUI at it)
+#########################################
+
+import sys
+import threading
+from engine import Engine, MATE, MATE_BOUND, MAX_PLY
+from fen import START_FEN
+from move import move_to_uci
+from perft import setup_position
+
+ENGINE_NAME = 'Python Chess'
+ENGINE_AUTHOR = 'farhadzaidi'
+
+# (type, default, min, max); Threads is accepted for compatibility,
+# the search itself is single-threaded
+OPTIONS = {
+	'Hash': ('spin', 16, 1, 1024),
+	'Threads': ('spin', 1, 1, 1),
+	'Move Overhead': ('spin', 50, 0, 5000),
+	'BookFile': ('string', '', None, None),
+	'TablebasePath': ('string', '', None, None),
+}
+
+# with no movestogo, the remaining time is spread over this many moves
+DEFAULT_MOVES_TO_GO = 30
+
+
+# seconds to spend on a move, None for no limit
+# clock values are in milliseconds, as in the go command
+def allocate_time(params, turn, overhead_ms):
+	if 'movetime' in params:
+		return max(params['movetime'] - overhead_ms, 1) / 1000
+
+	time_left = params.get('wtime' if turn == 'w' else 'btime')
+	if time_left is None:
+		return None
+
+	increment = params.get('winc' if turn == 'w' else 'binc', 0)
+	moves_to_go = params.get('movestogo', DEFAULT_MOVES_TO_GO)
+
+	# never plan to use more than half of what's left, and keep the overhead in reserve
+	budget = time_left / max(moves_to_go, 1) + increment * 3 // 4
+	budget = min(budget, time_left / 2, time_left - overhead_ms)
+	return max(budget, 1) / 1000
+
+
+def format_score(score):
+	if score > MATE_BOUND:
+		return f'mate {(MATE - score + 1) // 2}'
+	if score < -MATE_BOUND:
+		return f'mate -{(MATE + score) // 2}'
+	return f'cp {score}'
+
+
+class UCI:
+
+	def __init__(self, output=sys.stdout):
+		self.output = output
+		self.output_lock = threading.Lock()
+		self.options = {name: option[1] for name, option in OPTIONS.items()}
+		self.engine = Engine(self.options['Hash'])
+		self.fen = START_FEN
+		self.moves = []
+
+		self.search_thread = None
+		# set by stop (or quit), an infinite search only reports its move once it's set
+		self.stop_requested = threading.Event()
+
+
+	def send(self, line):
+		with self.output_lock:
+			self.output.write(line + '\n')
+			self.output.flush()
+
+
+	# returns False once the engine should exit
+	def handle(self, line):
+		tokens = line.split()
+		if not tokens:
+			return True
+
+		command, args = tokens[0], tokens[1:]
+		if command == 'uci':
+			self.send(f'id name {ENGINE_NAME}')
+			self.send(f'id author {ENGINE_AUTHOR}')
+			for name, (kind, default, low, high) in OPTIONS.items():
+				if kind == 'spin':
+					self.send(f'option name {name} type spin default {default} min {low} max {high}')
+				else:
+					self.send(f'option name {name} type string default <empty>')
+			self.send('uciok')
+		elif command == 'isready':
+			self.send('readyok')
+		elif command == 'ucinewgame':
+			self.stop()
+			self.engine.new_game()
+		elif command == 'setoption':
+			self.set_option(args)
+		elif command == 'position':
+			self.set_position(args)
+		elif command == 'go':
+			self.go(args)
+		elif command == 'stop':
+			self.stop()
+		elif command == 'quit':
+			self.stop()
+			return False
+		else:
+			self.send(f'info string unknown command: {command}')
+
+		return True
+
+
+	def set_option(self, args):
+		# setoption name <name with spaces> [value <value>]
+		if 'name' not in args:
+			return
+		name_end = args.index('value') if 'value' in args else len(args)
+		name = ' '.join(args[args.index('name') + 1:name_end])
+		value = ' '.join(args[name_end + 1:])
+
+		if name not in OPTIONS:
+			self.send(f'info string unknown option: {name}')
+			return
+
+		kind, _, low, high = OPTIONS[name]
+		if kind == 'spin':
+			try:
+				value = min(max(int(value), low), high)
+			except ValueError:
+				self.send(f'info string invalid value for {name}: {value}')
+				return
+		elif value == '<empty>':
+			value = ''
+
+		self.options[name] = value
+		if name == 'Hash':
+			self.stop()
+			self.engine = Engine(value)
+
+
+	def set_position(self, args):
+		# position startpos|fen <fen> [moves <move> ...]
+		moves_start = args.index('moves') if 'moves' in args else len(args)
+		if args and args[0] == 'startpos':
+			fen = START_FEN
+		elif args and args[0] == 'fen':
+			fen = ' '.join(args[1:moves_start])
+		else:
+			self.send('info string invalid position command')
+			return
+
+		moves = args[moves_start + 1:]
+		try:
+			setup_position('board', fen, moves)
+		except ValueError as e:
+			self.send(f'info string invalid position: {e}')
+			return
+
+		self.fen = fen
+		self.moves = moves
+
+
+	def go(self, args):
+		# a search still running is ended (and reports its move) first
+		self.stop()
+
+		params = {}
+		infinite = False
+		for i, token in enumerate(args):
+			if token == 'infinite':
+				infinite = True
+			elif token in ('wtime', 'btime', 'winc', 'binc', 'movestogo', 'movetime', 'depth', 'nodes'):
+				try:
+					params[token] = int(args[i + 1])
+				except (IndexError, ValueError):
+					self.send(f'info string invalid value for {token}')
+					return
+
+		# each search gets its own board, so a position command during a search can't touch it
+		b = setup_position('board', self.fen, self.moves)
+		time_limit = None if infinite else allocate_time(params, b.turn, self.options['Move Overhead'])
+
+		self.stop_requested.clear()
+		self.search_thread = threading.Thread(target=self.search,
+			args=(b, params.get('depth', MAX_PLY), time_limit, params.get('nodes'), infinite), daemon=True)
+		self.search_thread.start()
+
+
+	def search(self, b, depth, time_limit, node_limit, infinite):
+		move = self.prepared_move(b)
+
+		if move is None:
+			result = self.engine.search(b, depth, time_limit, node_limit, self.report)
+			move = result.move
+
+		# the move of an infinite search is only reported after stop
+		if infinite:
+			self.stop_requested.wait()
+
+		self.send(f'bestmove {move_to_uci(move) if move is not None else "0000"}')
+
+
+	# book or tablebase move, if the options point at them and they cover the position
+	def prepared_move(self, b):
+		if self.options['BookFile']:
+			from book import OpeningBook
+
+			book = OpeningBook(self.options['BookFile'])
+			move = book.choose(b)
+			book.close()
+			if move is not None:
+				self.send('info string book move')
+				return move
+
+		if self.options['TablebasePath']:
+			from tablebase import Tablebase
+
+			tablebase = Tablebase(self.options['TablebasePath'])
+			best = tablebase.best_move(b)
+			tablebase.close()
+			if best is not None:
+				move, wdl, plies = best
+				score = wdl * (MATE - plies) if wdl else 0
+				self.send('info string tablebase move')
+				self.send(f'info score {format_score(score)} pv {move_to_uci(move)}')
+				return move
+
+		return None
+
+
+	def report(self, result):
+		pv = ' '.join(move_to_uci(move) for move in result.pv)
+		self.send(f'info depth {result.depth} score {format_score(result.score)} nodes {result.nodes} '
+			f'nps {result.nps} time {round(result.time * 1000)} pv {pv}')
+
+
+	def stop(self):
+		self.stop_requested.set()
+
+		# repeated until the thread ends, in case it hadn't started searching yet
+		while self.search_thread is not None and self.search_thread.is_alive():
+			self.engine.stop()
+			self.search_thread.join(0.001)
+
+		self.search_thread = None
+
+
+def main():
+	# the search thread only gets the interpreter between bytecodes, so
+	# switching more often keeps replies to stop and isready quick
+	sys.setswitchinterval(0.001)
+
+	uci = UCI()
+	for line in sys.stdin:
+		if not uci.handle(line):
+			break
+
+	uci.stop()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,33 @@
+#########################################
+# zobrist keys for hashing positions
+# a position key is the xor of one random 64-bit number
+# for every (piece, square) pair on the board, every castling
+# right still available, the en passant file (if any) and
+# the side to move (if black)
+# keys are seeded so they are identical across runs and processes
+#########################################
+
+import random
+from piece import SYMBOLS
+
+_random = random.Random(0x5EED)
+
+def _key():
+	return _random.getrandbits(64)
+
+
+# indexed by piece code, then square
+PIECE_KEYS = [[_key() for _ in range(64)] for _ in SYMBOLS]
+
+CASTLING_KEYS = {right: _key() for right in ('w_short', 'w_long', 'b_short', 'b_long')}
+
+# indexed by a castling rights bitmask (w_short = 1, w_long = 2, b_short = 4, b_long = 8)
+CASTLING_MASK_KEYS = [0] * 16
+for mask in range(16):
+	for bit, right in enumerate(('w_short', 'w_long', 'b_short', 'b_long')):
+		if mask & (1 << bit):
+			CASTLING_MASK_KEYS[mask] ^= CASTLING_KEYS[right]
+
+EN_PASSANT_KEYS = [_key() for _ in range(8)]
+
+SIDE_KEY = _key()